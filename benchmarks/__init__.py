@@ -0,0 +1 @@
+"""Ad-hoc performance benchmarks. Run with ``python -m benchmarks.<name>``."""
@@ -0,0 +1,48 @@
+"""Compare N single ``store.buy`` requests against one batched checkout.
+
+Usage: ``python -m benchmarks.batch_purchase [N] [STOCK]``
+"""
+import sys
+
+from benchmarks.common import create_user, login, make_app, report, timed
+
+
+def _create_product(app, stock):
+    from godweb.extensions import db
+    from godweb.inventory import store_file_inventory
+    from godweb.models import Product
+    with app.app_context():
+        product = Product(name='Bench product', price=1, inventory_file='bench.txt')
+        db.session.add(product)
+        db.session.flush()
+        store_file_inventory(product, '\n'.join(f'acct{i}@example.com|pw{i}' for i in range(stock)))
+        db.session.commit()
+        return product.id
+
+
+def main(quantity=50, stock=20000):
+    app = make_app()
+    create_user(app, balance=quantity * 4)
+    single_id = _create_product(app, stock)
+    batch_id = _create_product(app, stock)
+
+    client = app.test_client()
+    login(client)
+
+    results = {}
+    with timed(f'{quantity} x single buy', results):
+        for _ in range(quantity):
+            client.post(f'/store/{single_id}/buy', data={'quantity': 1})
+    with timed(f'1 x batched buy (quantity={quantity})', results):
+        client.post(f'/store/{batch_id}/buy', data={'quantity': quantity})
+
+    from godweb.models import Order
+    with app.app_context():
+        assert Order.query.filter_by(product_id=single_id).count() == quantity
+        assert Order.query.filter_by(product_id=batch_id).count() == quantity
+
+    report(results, baseline=f'{quantity} x single buy')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
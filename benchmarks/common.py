@@ -0,0 +1,49 @@
+"""Helpers shared by the benchmark scripts."""
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+
+def make_app(database_url=None):
+    """Build an app against a throwaway SQLite DB (or ``database_url``)."""
+    workdir = tempfile.mkdtemp(prefix='godweb-bench-')
+    os.environ.setdefault('SECRET_KEY', 'bench-secret-key')
+    os.environ['DATABASE_URL'] = database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from godweb.app import create_app
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, UPLOAD_FOLDER=workdir)
+    return app
+
+
+def create_user(app, email='bench@example.com', balance=0, role='user', password='bench-pass'):
+    from godweb.extensions import db
+    from godweb.models import User
+    with app.app_context():
+        user = User(username=email.split('@')[0], email=email, role=role,
+                    recovery_number='0000', godcoin_balance=balance)
+        user.set_password(password)
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def login(client, email='bench@example.com', password='bench-pass'):
+    resp = client.post('/auth/login', data={'email': email, 'password': password})
+    assert resp.status_code == 302, 'benchmark login failed'
+
+
+@contextmanager
+def timed(label, results):
+    start = time.perf_counter()
+    yield
+    results[label] = time.perf_counter() - start
+
+
+def report(results, baseline=None):
+    for label, seconds in results.items():
+        line = f'{label:<40} {seconds * 1000:10.1f} ms'
+        if baseline and label != baseline and results.get(label):
+            line += f'   ({results[baseline] / results[label]:.1f}x vs {baseline})'
+        print(line)
@@ -0,0 +1,119 @@
+"""Per-worker memory and time-to-first-request, with and without ``preload_app``.
+
+Usage: ``python -m benchmarks.gunicorn_boot [WORKERS]``
+
+Starts gunicorn with ``godweb.gunicorn_conf`` twice (``PRELOAD_APP=0`` then
+``1``) against the same throwaway SQLite DB and reports:
+
+* time from spawning gunicorn to the first 200 response;
+* latency of the first request to each of a few pages (cold template compile);
+* average RSS and PSS per worker after those requests (Linux only: read from
+  ``/proc/<pid>/smaps_rollup``). PSS divides shared pages between the
+  processes sharing them, so it is the number that shows copy-on-write sharing.
+"""
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+PAGES = ['/', '/blog/', '/store/', '/about', '/auth/login', '/auth/register']
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _get(url):
+    start = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=10) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def _children(pid):
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as fh:
+                fields = fh.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return children
+
+
+def _memory_kb(pid):
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as fh:
+        for line in fh:
+            name, _, rest = line.partition(':')
+            if name in ('Rss', 'Pss'):
+                values[name] = int(rest.split()[0])
+    return values
+
+
+def measure(preload, workers, database_url):
+    port = _free_port()
+    env = dict(
+        os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers), PRELOAD_APP='1' if preload else '0',
+        DATABASE_URL=database_url, SECRET_KEY='bench-secret-key', CACHE_TYPE='simple',
+    )
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'python:godweb.gunicorn_conf', 'godweb.app:app'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f'http://127.0.0.1:{port}'
+    try:
+        while True:
+            try:
+                _get(base + '/')
+                break
+            except OSError:
+                if process.poll() is not None:
+                    raise RuntimeError('gunicorn exited during startup')
+                time.sleep(0.01)
+        ttfr = time.perf_counter() - started
+        time.sleep(2)  # let every worker finish booting
+        first = {page: _get(base + page) for page in PAGES}
+        for _ in range(5 * workers):
+            for page in PAGES:
+                _get(base + page)
+        memory = [_memory_kb(pid) for pid in _children(process.pid)]
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return {
+        'ttfr_ms': ttfr * 1000,
+        'first_page_ms': sum(first.values()) / len(first) * 1000,
+        'rss_mb': sum(m['Rss'] for m in memory) / len(memory) / 1024,
+        'pss_mb': sum(m['Pss'] for m in memory) / len(memory) / 1024,
+        'workers': len(memory),
+    }
+
+
+def main(workers=4):
+    workdir = tempfile.mkdtemp(prefix='godweb-bench-')
+    database_url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    # Migrate once up front, like the release phase.
+    subprocess.run([sys.executable, '-m', 'godweb.migrations'], check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                   env=dict(os.environ, DATABASE_URL=database_url, SECRET_KEY='bench-secret-key'))
+    print(f"{'':<12}{'first 200':>12}{'1st page':>12}{'RSS/worker':>14}{'PSS/worker':>14}")
+    for preload in (False, True):
+        result = measure(preload, workers, database_url)
+        label = 'preload' if preload else 'no preload'
+        print(f"{label:<12}{result['ttfr_ms']:>10.0f}ms{result['first_page_ms']:>10.1f}ms"
+              f"{result['rss_mb']:>12.1f}MB{result['pss_mb']:>12.1f}MB   ({result['workers']} workers)")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,84 @@
+"""Legacy per-notification read rows vs the per-user watermark state.
+
+Usage: ``python -m benchmarks.notification_reads [USERS] [NOTIFICATIONS] [LEGACY_SAMPLE]``
+
+Read state is built for USERS users (default 100k) over NOTIFICATIONS
+notifications (default 500). Materializing the legacy table for all of them
+would mean USERS x NOTIFICATIONS rows, so legacy rows are created for the
+first LEGACY_SAMPLE users only and the full-size row count is reported.
+"""
+import random
+import sys
+
+from sqlalchemy import insert
+
+from benchmarks.common import make_app, report, timed
+
+
+def main(users=100_000, notifications=500, legacy_sample=1_000):
+    app = make_app()
+    from godweb.extensions import db
+    from godweb.models import Notification, NotificationRead, NotificationReadState, User
+    from godweb.notifications import (
+        encode_read_ids, latest_notifications, load_read_state, migrate_notification_reads,
+    )
+
+    rng = random.Random(42)
+    with app.app_context():
+        rows = [{'username': f'u{i}', 'email': f'u{i}@example.com', 'password_hash': 'x'} for i in range(users)]
+        for start in range(0, users, 10_000):
+            db.session.execute(insert(User), rows[start:start + 10_000])
+        db.session.execute(insert(Notification), [
+            {'content': f'notification {i}', 'created_by': 1} for i in range(notifications)
+        ])
+        db.session.commit()
+
+        # Legacy: every sampled user has read a random ~90% of the notifications.
+        legacy_rows = []
+        for user_id in range(1, legacy_sample + 1):
+            for notification_id in range(1, notifications + 1):
+                if rng.random() < 0.9:
+                    legacy_rows.append({'user_id': user_id, 'notification_id': notification_id})
+        for start in range(0, len(legacy_rows), 50_000):
+            db.session.execute(insert(NotificationRead), legacy_rows[start:start + 50_000])
+        db.session.commit()
+
+        results = {}
+        probe_users = [rng.randint(1, legacy_sample) for _ in range(500)]
+        with timed('legacy navbar x500 requests', results):
+            for user_id in probe_users:
+                latest_notifications()
+                {row.notification_id for row in NotificationRead.query.filter_by(user_id=user_id)}
+                db.session.expunge_all()
+
+        migration = {}
+        with timed(f'migrate {legacy_sample} users', migration):
+            migrate_notification_reads()
+            db.session.commit()
+
+        # Remaining users get a watermark with a few out-of-order reads.
+        state_rows = [
+            {'user_id': user_id, 'last_read_id': notifications - 20,
+             'read_ids': encode_read_ids(rng.sample(range(notifications - 19, notifications + 1), 3))}
+            for user_id in range(legacy_sample + 1, users + 1)
+        ]
+        for start in range(0, len(state_rows), 10_000):
+            db.session.execute(insert(NotificationReadState), state_rows[start:start + 10_000])
+        db.session.commit()
+
+        probe_users = [rng.randint(1, users) for _ in range(500)]
+        with timed('watermark navbar x500 requests', results):
+            for user_id in probe_users:
+                notifications_list = latest_notifications()
+                state = load_read_state(user_id)
+                sum(1 for item in notifications_list if not state.is_read(item.id))
+                db.session.expunge_all()
+
+        report(results, baseline='legacy navbar x500 requests')
+        report(migration)
+        print(f'legacy rows at full size (~90% read): {int(users * notifications * 0.9):,}')
+        print(f'read-state rows:                      {NotificationReadState.query.count():,}')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:4]))
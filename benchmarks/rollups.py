@@ -0,0 +1,80 @@
+"""Rollup backfill: one upsert per order vs batched GROUP BY upserts.
+
+Usage: ``python -m benchmarks.rollups [ORDERS] [BATCH_SIZE]``
+
+Seeds ORDERS orders (default 100k) spread over a year and 200 products, then
+times a row-at-a-time backfill (one ``INSERT ... ON CONFLICT`` per order and
+rollup table, as a per-event pipeline would do) against
+``godweb.rollups.refresh_rollups`` with BATCH_SIZE rows per batch
+(default 10k), and the analytics report read from the rollups against
+``GROUP BY`` over ``orders``.
+"""
+import random
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from benchmarks.common import create_user, make_app, report, timed
+
+
+def main(orders=100_000, batch_size=10_000):
+    app = make_app()
+    user_id = create_user(app)
+    from godweb.extensions import db
+    from godweb.models import Order, Product
+    from godweb.models import DailyProductStats, DailyStats
+    from godweb.rollups import _upsert_add, daily_series, rebuild_rollups, top_products
+
+    rng = random.Random(7)
+    start = datetime(2024, 1, 1)
+    with app.app_context():
+        db.session.execute(insert(Product), [{'name': f'Product {i}', 'price': 10 + i} for i in range(200)])
+        for offset in range(0, orders, 50_000):
+            db.session.execute(insert(Order), [
+                {
+                    'user_id': user_id,
+                    'product_id': rng.randint(1, 200),
+                    'account_info': 'x',
+                    'price': rng.randint(10, 210),
+                    'created_at': start + timedelta(seconds=rng.randint(0, 365 * 86400)),
+                }
+                for _ in range(min(50_000, orders - offset))
+            ])
+        db.session.commit()
+
+        results = {}
+        with timed('row-at-a-time backfill', results):
+            query = select(Order.created_at, Order.product_id, Order.price).execution_options(yield_per=10_000)
+            for created_at, product_id, price in db.session.execute(query).all():
+                day = created_at.date()
+                _upsert_add(DailyStats, ['day'], [{'day': day, 'orders': 1, 'sales_godcoin': price}])
+                _upsert_add(DailyProductStats, ['day', 'product_id'],
+                            [{'day': day, 'product_id': product_id, 'units': 1, 'revenue': price}])
+            db.session.commit()
+        with timed(f'batched backfill ({batch_size} rows/batch)', results):
+            batches = rebuild_rollups(batch_size=batch_size)
+        report(results, baseline='row-at-a-time backfill')
+        print(f'batches: {batches}')
+
+        reads = {}
+        since = (start + timedelta(days=275)).date()
+        with timed('90-day report from orders', reads):
+            day = func.date(Order.created_at)
+            db.session.execute(
+                select(day, func.count(), func.sum(Order.price))
+                .where(Order.created_at >= since).group_by(day)
+            ).all()
+            db.session.execute(
+                select(Order.product_id, func.count(), func.sum(Order.price))
+                .where(Order.created_at >= since).group_by(Order.product_id)
+                .order_by(func.sum(Order.price).desc()).limit(10)
+            ).all()
+        with timed('90-day report from rollups', reads):
+            daily_series(90, today=(start + timedelta(days=364)).date())
+            top_products(since)
+        report(reads, baseline='90-day report from orders')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
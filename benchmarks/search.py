@@ -0,0 +1,83 @@
+"""LIKE scans vs the full-text search index over a large blog.
+
+Usage: ``python -m benchmarks.search [POSTS] [QUERIES]``
+
+Builds POSTS posts (default 100k) of generated Vietnamese-like text and times
+QUERIES searches (default 50) with the old ``lower(x) LIKE '%q%'`` filter,
+the SQLite FTS5 index and the in-memory fallback index. Index build times
+are reported separately from query latency.
+"""
+import random
+import sys
+
+from sqlalchemy import func, insert
+
+from benchmarks.common import create_user, make_app, report, timed
+
+ONSETS = ['b', 'c', 'ch', 'd', 'đ', 'g', 'h', 'kh', 'l', 'm', 'n', 'ng', 'nh', 'ph', 'qu', 'r', 's', 't', 'th', 'tr', 'v', 'x']
+RHYMES = ['a', 'à', 'á', 'ả', 'ã', 'ạ', 'ai', 'ào', 'ăn', 'ân', 'em', 'ênh', 'inh', 'oa', 'oàn', 'ôi', 'ơn', 'uy', 'ưa', 'ương']
+
+
+def _vocabulary(rng, size=4000):
+    syllables = [onset + rhyme for onset in ONSETS for rhyme in RHYMES]
+    words = sorted({f'{rng.choice(syllables)} {rng.choice(syllables)}' for _ in range(size)})
+    rng.shuffle(words)
+    return words
+
+
+def _sentence(rng, words, length):
+    # Zipf-like: low indexes are common words, the tail is rare.
+    return ' '.join(words[min(int(rng.paretovariate(1.0)) - 1, len(words) - 1)] for _ in range(length))
+
+
+def main(posts=100_000, queries=50):
+    app = make_app()
+    author_id = create_user(app)
+    from godweb.extensions import db
+    from godweb.models import Post
+    from godweb.search import MemorySearchBackend, rebuild_search_index, search_ids, tokenize
+
+    rng = random.Random(42)
+    words = _vocabulary(rng)
+    with app.app_context():
+        for start in range(0, posts, 10_000):
+            db.session.execute(insert(Post), [
+                {'title': _sentence(rng, words, 6), 'content': _sentence(rng, words, 120), 'author_id': author_id}
+                for _ in range(min(10_000, posts - start))
+            ])
+        db.session.commit()
+
+        # Mid-frequency words, like a real search term: neither stopwords nor typos.
+        terms = [words[rng.randint(20, 200)] for _ in range(queries)]
+        build = {}
+        results = {}
+
+        # The old blog.index search: COUNT(*) for the pager plus the first page.
+        with timed(f'LIKE scan x{queries}', results):
+            for term in terms:
+                needle = term.lower()
+                query = Post.query.with_entities(Post.id).filter(
+                    func.lower(Post.title).contains(needle) | func.lower(Post.content).contains(needle)
+                )
+                query.count()
+                query.limit(9).all()
+
+        with timed('fts5 build', build):
+            rebuild_search_index('post')
+        with timed(f'fts5 x{queries}', results):
+            for term in terms:
+                search_ids('post', term)
+
+        app.extensions['search'] = MemorySearchBackend(app.extensions['cache'])
+        with timed('memory build', build):
+            app.extensions['search'].search('post', tokenize('tai'), 1)
+        with timed(f'memory x{queries}', results):
+            for term in terms:
+                search_ids('post', term)
+
+        report(results, baseline=f'LIKE scan x{queries}')
+        report(build)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,49 @@
+"""Worker cold start: ``create_app()`` with boot-time migrations vs a version check.
+
+Usage: ``python -m benchmarks.startup [PRODUCTS] [RUNS]``
+
+Seeds PRODUCTS products (default 10k) with inventory rows, then times
+``create_app()`` RUNS times (default 5) on a database whose
+``schema_version`` was cleared -- every boot re-runs all migrations, which is
+what each gunicorn worker used to do -- against a database at the current
+version, where a worker only reads the version number.
+"""
+import sys
+
+from sqlalchemy import insert
+
+from benchmarks.common import make_app, report, timed
+
+
+def main(products=10_000, runs=5):
+    app = make_app()
+    from godweb.app import create_app
+    from godweb.extensions import db
+    from godweb.models import Product, ProductInventoryAccount, SchemaVersion
+
+    with app.app_context():
+        db.session.execute(insert(Product), [
+            {'name': f'Product {i}', 'price': 10, 'stock': 1, 'inventory_file': f'inventory_{i}.txt'}
+            for i in range(products)
+        ])
+        db.session.execute(insert(ProductInventoryAccount), [
+            {'product_id': i + 1, 'filename': 'line_000001', 'content': f'user{i}:pass'}
+            for i in range(products)
+        ])
+        db.session.commit()
+
+    results = {}
+    with timed(f'boot-time migrations x{runs}', results):
+        for _ in range(runs):
+            with app.app_context():
+                SchemaVersion.query.delete()
+                db.session.commit()
+            create_app()
+    with timed(f'version check x{runs}', results):
+        for _ in range(runs):
+            create_app()
+    report(results, baseline=f'boot-time migrations x{runs}')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
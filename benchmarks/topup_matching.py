@@ -0,0 +1,69 @@
+"""Statement import: per-topup approval vs matching + bulk approval.
+
+Usage: ``python -m benchmarks.topup_matching [LINES]``
+
+Seeds 2 x LINES pending topups (default 50k lines) over 5,000 users. The
+first half is approved one row at a time the way ``admin.approve_topup``
+used to (load the topup, credit, commit); the second half is matched from a
+LINES-line statement CSV with ``godweb.topups.match_statement`` and approved
+in one transaction with ``approve_topups``.
+"""
+import io
+import random
+import sys
+
+from sqlalchemy import insert
+
+from benchmarks.common import make_app, report, timed
+
+USERS = 5_000
+
+
+def main(lines=50_000):
+    app = make_app()
+    from godweb.extensions import db
+    from godweb.models import Topup, User
+    from godweb.topups import approve_topups, match_statement
+    from godweb.wallet import credit
+
+    rng = random.Random(3)
+    with app.app_context():
+        db.session.execute(insert(User), [
+            {'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': 'x',
+             'recovery_number': '0000', 'godcoin_balance': 0}
+            for i in range(USERS)
+        ])
+        user_ids = [row[0] for row in db.session.query(User.id)]
+        amounts = [rng.choice((10_000, 20_000, 50_000, 100_000, 200_000)) for _ in range(2 * lines)]
+        owners = [rng.choice(user_ids) for _ in range(2 * lines)]
+        db.session.execute(insert(Topup), [
+            {'user_id': user_id, 'amount': amount, 'godcoin_amount': amount // 1000, 'method': 'bank'}
+            for user_id, amount in zip(owners, amounts)
+        ])
+        db.session.commit()
+        topup_ids = [row[0] for row in db.session.query(Topup.id).order_by(Topup.id)]
+
+        statement = io.StringIO()
+        statement.write('Mã GD,Số tiền,Nội dung\n')
+        for i in range(lines, 2 * lines):
+            statement.write(f'FT{i},"{amounts[i]:,}",MBVCB.{i}.GOD{owners[i]} chuyen tien\n')
+        statement_bytes = statement.getvalue().encode('utf-8')
+
+        results = {}
+        with timed(f'one-at-a-time approve ({lines} topups)', results):
+            for topup_id in topup_ids[:lines]:
+                topup = db.session.get(Topup, topup_id)
+                topup.status = 'approved'
+                credit(topup.user_id, topup.godcoin_amount, 'topup', f'Nạp GodCoin qua {topup.method.upper()}')
+                db.session.commit()
+        with timed(f'match {lines}-line statement', results):
+            matched = match_statement(io.BytesIO(statement_bytes))
+        with timed(f'bulk approve {len(matched.matched)} topups', results):
+            approve_topups([topup_id for _, topup_id in matched.matched])
+            db.session.commit()
+        report(results, baseline=f'one-at-a-time approve ({lines} topups)')
+        print(f'matched {len(matched.matched)}, unmatched {len(matched.unmatched)}')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
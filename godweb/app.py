@@ -4,7 +4,6 @@ import secrets
 import time
 from urllib.parse import urlparse
 from flask import Flask, url_for, request, abort
-from sqlalchemy import inspect, text
 from flask_login import current_user
 from werkzeug.middleware.proxy_fix import ProxyFix
 from godweb.extensions import db, login_manager, csrf
@@ -98,6 +97,49 @@ def create_app():
     app.config['REMEMBER_COOKIE_SAMESITE'] = 'Lax'
     app.config['REMEMBER_COOKIE_SECURE'] = is_prod_like
     app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024  # 10 MB
+    # Filesystem cache is shared by all workers on the dyno; dev/tests stay in-process.
+    app.config['CACHE_TYPE'] = os.environ.get('CACHE_TYPE', 'filesystem' if is_prod_like else 'simple')
+    app.config['CACHE_DIR'] = os.environ.get('CACHE_DIR', '/tmp/godweb-cache')
+    app.config['CACHE_THRESHOLD'] = int(os.environ.get('CACHE_THRESHOLD', 2000))
+    # Compiled-template cache shared by all workers; filled at build time by
+    # `python -m godweb.templating`. Empty disables it (dev/tests).
+    from godweb.templating import DEFAULT_CACHE_DIR
+    app.config['JINJA_CACHE_DIR'] = os.environ.get('JINJA_CACHE_DIR', DEFAULT_CACHE_DIR if is_prod_like else '')
+    # Anonymous full-page microcache for home/store/blog, in seconds; off (0)
+    # outside production so local edits show up immediately.
+    app.config['PAGE_CACHE_TTL'] = float(os.environ.get('PAGE_CACHE_TTL', 5 if is_prod_like else 0))
+    # Buffered blog view counts are flushed after this many views or seconds.
+    app.config['VIEW_COUNTER_FLUSH_THRESHOLD'] = int(os.environ.get('VIEW_COUNTER_FLUSH_THRESHOLD', 50))
+    app.config['VIEW_COUNTER_FLUSH_INTERVAL'] = float(os.environ.get('VIEW_COUNTER_FLUSH_INTERVAL', 10))
+    # Live event stream: poll cadence, per-connection lifetime (clients reconnect
+    # transparently), keepalive comment interval, outbox retention and how long
+    # a subscriber keeps re-reading recent rows for late commits, in seconds.
+    app.config['SSE_POLL_INTERVAL'] = float(os.environ.get('SSE_POLL_INTERVAL', 1))
+    app.config['SSE_MAX_DURATION'] = float(os.environ.get('SSE_MAX_DURATION', 300))
+    app.config['SSE_KEEPALIVE'] = float(os.environ.get('SSE_KEEPALIVE', 15))
+    app.config['SSE_EVENT_RETENTION'] = int(os.environ.get('SSE_EVENT_RETENTION', 3600))
+    app.config['SSE_SETTLE_SECONDS'] = float(os.environ.get('SSE_SETTLE_SECONDS', 5))
+    # Open streams per worker; half of gunicorn's 16 threads, the rest serve pages.
+    app.config['SSE_MAX_STREAMS'] = int(os.environ.get('SSE_MAX_STREAMS', 8))
+    # Reconnect delay (ms) suggested to clients turned away at the stream cap.
+    app.config['SSE_BUSY_RETRY'] = int(os.environ.get('SSE_BUSY_RETRY', 30000))
+    # Search index: 'auto' (FTS5 on SQLite, tsvector on Postgres), or 'memory'.
+    app.config['SEARCH_BACKEND'] = os.environ.get('SEARCH_BACKEND', 'auto')
+    # Per-request SQL/template timing + Server-Timing header; off unless opted in.
+    app.config['PERF_INSTRUMENTATION'] = os.environ.get('PERF_INSTRUMENTATION', '0') == '1'
+    app.config['PERF_LOG'] = os.environ.get('PERF_LOG', '0') == '1'
+    app.config['PERF_SLOW_STATEMENTS'] = int(os.environ.get('PERF_SLOW_STATEMENTS', 3))
+    app.config['PERF_PUBLISH_INTERVAL'] = float(os.environ.get('PERF_PUBLISH_INTERVAL', 10))
+    # Dashboard counters are recounted from scratch at most this often.
+    app.config['STATS_RECONCILE_INTERVAL'] = int(os.environ.get('STATS_RECONCILE_INTERVAL', 3600))
+    # Analytics rollups: rows younger than the settle window wait for the next run;
+    # each analytics page load folds in at most this many batches per source.
+    app.config['ROLLUP_SETTLE_SECONDS'] = int(os.environ.get('ROLLUP_SETTLE_SECONDS', 5))
+    app.config['ROLLUP_REFRESH_BATCHES'] = int(os.environ.get('ROLLUP_REFRESH_BATCHES', 5))
+    # What a worker does when the database is behind the code: 'migrate' (under
+    # the migration lock), 'check' (refuse to start) or 'off'. On Heroku the
+    # release phase has already migrated, so workers only read the version.
+    app.config['SCHEMA_ON_BOOT'] = os.environ.get('SCHEMA_ON_BOOT', 'migrate')
 
     # Create upload folder if not exists
     if not os.path.exists(app.config['UPLOAD_FOLDER']):
@@ -110,6 +152,19 @@ def create_app():
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Vui lòng đăng nhập để tiếp tục.'
 
+    from godweb.cache import init_cache
+    from godweb.view_counter import init_view_counter
+    from godweb.events import init_event_broker
+    from godweb.instrumentation import init_instrumentation
+    from godweb.templating import init_templating
+    from godweb.page_cache import init_page_cache
+    init_cache(app)
+    init_view_counter(app)
+    init_event_broker(app)
+    init_instrumentation(app)
+    init_templating(app)
+    init_page_cache(app)
+
     # Add custom Jinja2 filter for image URLs
     @app.template_filter('image_url')
     def image_url_filter(image_path):
@@ -127,30 +182,11 @@ def create_app():
         if not current_user.is_authenticated:
             return {'navbar_notifications': [], 'unread_notification_count': 0}
 
-        from godweb.models import Notification, NotificationRead
-
-        notifications = Notification.query.order_by(Notification.created_at.desc()).limit(12).all()
-        if not notifications:
-            return {'navbar_notifications': [], 'unread_notification_count': 0}
-
-        read_ids = {
-            row.notification_id
-            for row in NotificationRead.query.filter_by(user_id=current_user.id).all()
-        }
-
-        navbar_notifications = []
-        unread_count = 0
-        for item in notifications:
-            is_read = item.id in read_ids
-            if not is_read:
-                unread_count += 1
-            navbar_notifications.append({
-                'id': item.id,
-                'content': item.content,
-                'created_at': item.created_at,
-                'is_read': is_read
-            })
+        from godweb.notifications import navbar_payload
 
+        # Served from the shared cache; invalidated by admin create/delete and
+        # by the user's own read_notification calls.
+        navbar_notifications, unread_count = navbar_payload(current_user.id)
         return {
             'navbar_notifications': navbar_notifications,
             'unread_notification_count': unread_count
@@ -203,96 +239,44 @@ def create_app():
     app.register_blueprint(profile_bp, url_prefix='/profile')
     app.register_blueprint(admin_bp, url_prefix='/admin')
 
-    # Create database tables
     with app.app_context():
-        db.create_all()
+        # Schema changes run once per deploy (`python -m godweb.migrations`);
+        # a worker only reads the version number here.
+        from godweb.migrations import check_schema
+        schema_ready = check_schema(app)
 
-        def safe_add_column(sql):
-            try:
-                db.session.execute(text(sql))
-                db.session.commit()
-            except Exception as exc:
-                db.session.rollback()
-                # Gunicorn multi-worker boot can race on ALTER TABLE; ignore duplicate-column errors.
-                message = str(exc).lower()
-                if 'duplicate column name' not in message and 'already exists' not in message:
-                    raise
-
-        inspector = inspect(db.engine)
-        if 'users' in inspector.get_table_names():
-            columns = [column['name'] for column in inspector.get_columns('users')]
-            if 'recovery_number' not in columns:
-                safe_add_column('ALTER TABLE users ADD COLUMN recovery_number VARCHAR(20)')
-
-        if 'products' in inspector.get_table_names():
-            product_columns = [column['name'] for column in inspector.get_columns('products')]
-            if 'parse_mode' not in product_columns:
-                safe_add_column("ALTER TABLE products ADD COLUMN parse_mode VARCHAR(20) DEFAULT 'line'")
-            if 'inventory_type' not in product_columns:
-                safe_add_column("ALTER TABLE products ADD COLUMN inventory_type VARCHAR(20) DEFAULT 'file'")
-            if 'inventory_folder_path' not in product_columns:
-                safe_add_column("ALTER TABLE products ADD COLUMN inventory_folder_path VARCHAR(255)")
-            if 'inventory_data' not in product_columns:
-                safe_add_column("ALTER TABLE products ADD COLUMN inventory_data TEXT")
-            db.session.execute(text("UPDATE products SET parse_mode = 'line' WHERE parse_mode IS NULL"))
-            db.session.execute(text("UPDATE products SET inventory_type = 'file' WHERE inventory_type IS NULL"))
-            db.session.commit()
-
-        # Rescue any legacy filesystem inventory into the database BEFORE Heroku
-        # ephemeral storage wipes it on the next dyno restart. Idempotent.
+        from godweb.search import MemorySearchBackend, init_search
         try:
-            from godweb.models import Product, ProductInventoryAccount
-            from godweb.utils import list_inventory_folder_files, read_inventory_folder_account
-            upload_folder = app.config.get('UPLOAD_FOLDER')
-            if upload_folder and os.path.isdir(upload_folder):
-                for product in Product.query.all():
-                    inv_type = getattr(product, 'inventory_type', 'file') or 'file'
-                    if inv_type == 'folder':
-                        existing_count = ProductInventoryAccount.query.filter_by(product_id=product.id).count()
-                        if existing_count == 0 and getattr(product, 'inventory_folder_path', None):
-                            folder_path = os.path.join(upload_folder, product.inventory_folder_path)
-                            if os.path.isdir(folder_path):
-                                for fname in list_inventory_folder_files(folder_path):
-                                    try:
-                                        content = read_inventory_folder_account(folder_path, fname)
-                                    except OSError:
-                                        continue
-                                    db.session.add(ProductInventoryAccount(
-                                        product_id=product.id,
-                                        filename=fname,
-                                        content=content,
-                                    ))
-                                product.stock = ProductInventoryAccount.query.filter_by(product_id=product.id).count()
-                    else:
-                        if not getattr(product, 'inventory_data', None) and product.inventory_file:
-                            filepath = os.path.join(upload_folder, product.inventory_file)
-                            if os.path.isfile(filepath):
-                                try:
-                                    with open(filepath, 'r', encoding='utf-8', errors='replace') as fh:
-                                        product.inventory_data = fh.read()
-                                except OSError:
-                                    pass
-                db.session.commit()
+            init_search(app)
         except Exception as exc:
             db.session.rollback()
-            app.logger.warning('Inventory rescue migration skipped: %s', exc)
+            app.logger.warning('Search index unavailable, using in-memory index: %s', exc)
+            app.extensions['search'] = MemorySearchBackend(app.extensions['cache'])
 
         from godweb.models import User
         # Bootstrap an admin only when explicit env vars are supplied. This
         # avoids shipping a known admin@godweb.com / admin123 account.
         admin_email = os.environ.get('ADMIN_EMAIL')
         admin_password = os.environ.get('ADMIN_PASSWORD')
-        if admin_email and admin_password:
+        if schema_ready and admin_email and admin_password:
             existing_admin = User.query.filter_by(email=admin_email).first()
             if not existing_admin:
                 admin = User(
                     username=os.environ.get('ADMIN_USERNAME', 'admin'),
                     email=admin_email,
                     role='admin',
-                    godcoin_balance=int(os.environ.get('ADMIN_INITIAL_GODCOIN', '0') or 0),
+                    godcoin_balance=0,
                 )
                 admin.set_password(admin_password)
                 db.session.add(admin)
+                db.session.flush()
+                from godweb.stats import bump_stats
+                bump_stats(users=1)
+                initial_godcoin = int(os.environ.get('ADMIN_INITIAL_GODCOIN', '0') or 0)
+                if initial_godcoin > 0:
+                    # Through the wallet so the ledger accounts for the opening balance.
+                    from godweb.wallet import credit
+                    credit(admin.id, initial_godcoin, 'admin_add', 'Số dư ban đầu')
                 db.session.commit()
 
     return app
@@ -0,0 +1,91 @@
+"""Cold-boot import profile: ``python -m godweb.bootprofile [TOP]``.
+
+Imports ``godweb.app`` (which builds the app, as a gunicorn worker does) in a
+fresh interpreter under ``python -X importtime`` and reports:
+
+* the wall time of that import;
+* the TOP modules (default 25) by cumulative import time, with their own
+  ("self") time;
+* self time summed per top-level package, so "SQLAlchemy vs Flask vs our
+  code" is visible at a glance.
+
+Modules loaded by interpreter startup (``site`` and friends) are excluded.
+``godweb.app``'s own self time includes ``create_app()``, i.e. the schema
+version check and search backend setup, not just module bodies.
+
+Heavy optional dependencies (cloudinary, zipfile) are imported on first use;
+if one of them shows up here, something started importing it eagerly again.
+"""
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+MARKER = '--godweb-bootprofile--'
+
+_CHILD = f"""
+import sys, time
+sys.stderr.write({MARKER!r} + '\\n')
+start = time.perf_counter()
+import {{target}}
+sys.stderr.write({MARKER!r} + ' %f\\n' % (time.perf_counter() - start))
+"""
+
+
+def profile_imports(target='godweb.app', env=None):
+    """Import ``target`` in a new interpreter under ``-X importtime``.
+
+    Returns ``(wall_seconds, entries)`` where entries are
+    ``(module, self_us, cumulative_us, depth)`` tuples in completion order,
+    covering only modules imported by ``target``.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _CHILD.format(target=target)],
+        env=dict(os.environ, **(env or {})), capture_output=True, text=True,
+    )
+    if result.returncode:
+        raise RuntimeError(f'importing {target} failed:\n{result.stderr}')
+
+    wall = None
+    entries = []
+    recording = False
+    for line in result.stderr.splitlines():
+        if line.startswith(MARKER):
+            rest = line[len(MARKER):].strip()
+            if rest:
+                wall = float(rest)
+                break
+            recording = True
+            continue
+        if not recording or not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the column header
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(fields[0]), int(fields[1]), depth))
+    return wall, entries
+
+
+def package_totals(entries):
+    """Self time in microseconds summed per top-level package, largest first."""
+    totals = defaultdict(int)
+    for name, self_us, _, _ in entries:
+        totals[name.split('.', 1)[0]] += self_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def main(top=25):
+    wall, entries = profile_imports()
+    print(f'import godweb.app: {wall * 1000:.0f} ms, {len(entries)} modules\n')
+    print(f"{'self ms':>9}{'cumul ms':>10}  module")
+    for name, self_us, cumulative_us, depth in sorted(entries, key=lambda e: e[2], reverse=True)[:top]:
+        print(f'{self_us / 1000:>9.1f}{cumulative_us / 1000:>10.1f}  {"  " * depth}{name}')
+    print(f"\n{'self ms':>9}  package")
+    for package, self_us in package_totals(entries)[:top]:
+        print(f'{self_us / 1000:>9.1f}  {package}')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
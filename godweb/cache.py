@@ -0,0 +1,201 @@
+"""Small key/value cache shared by the gunicorn workers of one dyno.
+
+Two backends, picked by ``create_app``:
+
+* ``SimpleCache`` -- per-process dict; the default for local dev and tests.
+* ``FileSystemCache`` -- one pickle file per key under ``CACHE_DIR``. Every
+  worker on the dyno sees the same entries, the same way the fallback
+  ``SECRET_KEY`` file is shared, without adding a Redis dependency.
+
+Keys are namespaced by the database URI so apps pointed at different
+databases never read each other's entries. Values must be picklable; cache
+plain data (dicts, tuples), never ORM instances.
+
+Both backends hold at most ``CACHE_THRESHOLD`` entries. Once over it, a
+sweep drops expired entries (e.g. pages of purged generations) and then
+those closest to expiry; entries stored without a timeout are kept.
+"""
+import abc
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+
+class BaseCache(abc.ABC):
+    def __init__(self, namespace='', default_timeout=300, threshold=2000):
+        self.namespace = namespace
+        self.default_timeout = default_timeout
+        self.threshold = threshold
+
+    def _key(self, key):
+        return f'{self.namespace}:{key}'
+
+    def _expires_at(self, timeout):
+        timeout = self.default_timeout if timeout is None else timeout
+        return time.time() + timeout if timeout else 0
+
+    @abc.abstractmethod
+    def get(self, key):
+        pass
+
+    @abc.abstractmethod
+    def set(self, key, value, timeout=None):
+        pass
+
+    @abc.abstractmethod
+    def delete(self, key):
+        pass
+
+    def get_or_set(self, key, factory, timeout=None):
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.set(key, value, timeout)
+        return value
+
+    def _evictions(self, expiries):
+        """Keys to drop from ``{key: expires_at}`` to get back under the threshold."""
+        now = time.time()
+        expired = [key for key, expires_at in expiries.items() if expires_at and expires_at < now]
+        excess = len(expiries) - len(expired) - self.threshold
+        if excess <= 0:
+            return expired
+        live = sorted((expires_at, key) for key, expires_at in expiries.items() if expires_at >= now)
+        return expired + [key for _, key in live[:excess]]
+
+
+class SimpleCache(BaseCache):
+    """Per-process cache; entries are not visible to other workers."""
+
+    def __init__(self, namespace='', default_timeout=300, threshold=2000):
+        super().__init__(namespace, default_timeout, threshold)
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(self._key(key))
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at and expires_at < time.time():
+            self.delete(key)
+            return None
+        return value
+
+    def set(self, key, value, timeout=None):
+        with self._lock:
+            self._entries[self._key(key)] = (self._expires_at(timeout), value)
+            if len(self._entries) > self.threshold:
+                expiries = {name: entry[0] for name, entry in self._entries.items()}
+                for name in self._evictions(expiries):
+                    del self._entries[name]
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(self._key(key), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class FileSystemCache(BaseCache):
+    """Cache stored as files, shared by every process that uses ``directory``.
+
+    Each file holds two pickles, the expiry time and then the value, so the
+    sweep reads only the former. The directory is counted every
+    ``SWEEP_EVERY`` writes of a process, not on each one.
+    """
+
+    SWEEP_EVERY = 100
+
+    def __init__(self, directory, namespace='', default_timeout=300, threshold=2000):
+        super().__init__(namespace, default_timeout, threshold)
+        self.directory = directory
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha1(self._key(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest)
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as fh:
+                expires_at = pickle.load(fh)
+                value = pickle.load(fh)
+        except (OSError, EOFError, pickle.PickleError, ValueError):
+            return None
+        if expires_at and expires_at < time.time():
+            self.delete(key)
+            return None
+        return value
+
+    def set(self, key, value, timeout=None):
+        # Write-then-rename so concurrent readers never see a partial file.
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                pickle.dump(self._expires_at(timeout), fh, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        self._writes += 1
+        if self._writes % self.SWEEP_EVERY == 0:
+            self.sweep()
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def sweep(self):
+        """Delete expired files, then the soonest-expiring ones past the threshold."""
+        try:
+            names = [name for name in os.listdir(self.directory) if not name.startswith('.tmp-')]
+        except OSError:
+            return
+        if len(names) <= self.threshold:
+            return
+        expiries = {}
+        for name in names:
+            try:
+                with open(os.path.join(self.directory, name), 'rb') as fh:
+                    expires_at = pickle.load(fh)
+            except (OSError, EOFError, pickle.PickleError, ValueError):
+                continue
+            expiries[name] = expires_at
+        for name in self._evictions(expiries):
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+
+def init_cache(app):
+    """Attach the configured cache to ``app.extensions['cache']``."""
+    namespace = hashlib.sha1(app.config['SQLALCHEMY_DATABASE_URI'].encode('utf-8')).hexdigest()[:12]
+    timeout = app.config.get('CACHE_DEFAULT_TIMEOUT', 300)
+    threshold = app.config.get('CACHE_THRESHOLD', 2000)
+    if app.config.get('CACHE_TYPE') == 'filesystem':
+        cache = FileSystemCache(
+            app.config['CACHE_DIR'], namespace=namespace, default_timeout=timeout, threshold=threshold,
+        )
+    else:
+        cache = SimpleCache(namespace=namespace, default_timeout=timeout, threshold=threshold)
+    app.extensions['cache'] = cache
+    return cache
+
+
+def get_cache():
+    from flask import current_app
+    return current_app.extensions['cache']
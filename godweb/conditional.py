@@ -0,0 +1,78 @@
+"""Conditional GET (ETag / Last-Modified) for the catalog and blog pages.
+
+A page's validator is built from what it shows, not from the rendered HTML:
+``(max(updated_at), count)`` of the rows behind it -- one aggregate query --
+plus a hash of the visitor's own state (account, balance, navbar
+notifications). If the browser (or a CDN) presents a matching
+``If-None-Match``/``If-Modified-Since``, ``conditional_page`` answers
+``304 Not Modified`` without rendering the template at all.
+
+The ETag is weak: two renders of the same data may differ byte-wise (CSRF
+tokens, the live view count), and that is fine for revalidation. Responses
+carry ``Cache-Control: no-cache`` (``private`` for logged-in visitors) and
+``Vary: Cookie`` so every reuse is revalidated and nobody is shown another
+visitor's navbar; views that must never be stored (locked premium posts)
+still override ``Cache-Control`` afterwards.
+"""
+import hashlib
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import func, select
+
+from godweb.extensions import db
+
+
+def user_state():
+    """Token for the per-visitor parts of a page (navbar, balance, buy forms)."""
+    if not current_user.is_authenticated:
+        return 'anon'
+    from godweb.notifications import navbar_payload
+
+    # Served from the shared cache; no query in the steady state.
+    notifications, unread = navbar_payload(current_user.id)
+    return (
+        f'{current_user.id}:{current_user.username}:{current_user.role}:{current_user.godcoin_balance}:'
+        f'{unread}:{",".join(str(item["id"]) for item in notifications)}'
+    )
+
+
+def table_version(column, *criteria):
+    """``(max(column), count)`` over the rows matching ``criteria``: one aggregate query."""
+    statement = select(func.max(column), func.count())
+    if criteria:
+        statement = statement.where(*criteria)
+    else:
+        statement = statement.select_from(column.table)
+    return tuple(db.session.execute(statement).one())
+
+
+def make_etag(*parts):
+    raw = '|'.join(str(part) for part in (*parts, user_state()))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        # HTTP dates have whole-second resolution.
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def conditional_page(etag, last_modified, render):
+    """Return 304 when the request's validators match, else ``render()``; both tagged.
+
+    Pending flash messages always render: the page is about to show them.
+    """
+    if request.method in ('GET', 'HEAD') and not session.get('_flashes') and _not_modified(etag, last_modified):
+        response = current_app.response_class(status=304)
+    else:
+        response = make_response(render())
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache' if current_user.is_authenticated else 'no-cache'
+    response.vary.add('Cookie')
+    return response
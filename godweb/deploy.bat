@@ -24,7 +24,7 @@ git push heroku main
 
 echo.
 echo [4/4] Running database migrations on Heroku...
-heroku run python migrate_pin.py -a godexroleplay
+heroku run python -m godweb.migrations -a godexroleplay
 
 echo.
 echo ========================================
@@ -33,7 +33,7 @@ git push heroku main
 # Step 4: Run migrations
 Write-Host ""
 Write-Host "[4/4] Running database migrations on Heroku..." -ForegroundColor Yellow
-& 'C:\Program Files\heroku\bin\heroku.cmd' run python migrate_pin.py -a godexroleplay
+& 'C:\Program Files\heroku\bin\heroku.cmd' run python -m godweb.migrations -a godexroleplay
 
 Write-Host ""
 Write-Host "========================================" -ForegroundColor Green
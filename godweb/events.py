@@ -0,0 +1,202 @@
+"""Server-Sent Events for notifications and live stock counts.
+
+Publishers write a ``ServerEvent`` row inside their own transaction
+(``publish``), so an event exists exactly when the change it describes was
+committed -- no matter which gunicorn worker or dyno handled the request.
+
+Each worker runs one ``EventBroker`` poller thread, started on the first
+``/events`` subscriber. It reads new rows once per ``SSE_POLL_INTERVAL`` and
+fans them out to per-connection queues, so N open streams cost one query per
+interval instead of N.
+
+Ids are assigned at insert, not at commit, so a slow transaction can commit id
+41 after id 42 was already delivered. A subscription's watermark therefore only
+moves past rows older than ``SSE_SETTLE_SECONDS``; younger rows are re-read on
+every poll and deduplicated by id, so a late commit is still sent.
+
+Stream generators only block on their queue and never hold a DB connection;
+under gunicorn's ``gthread`` worker (see the Procfile) an open stream occupies
+one thread, not a whole worker. ``SSE_MAX_STREAMS`` caps the streams per worker
+so they cannot take every thread; past it ``subscribe`` refuses and ``/events``
+answers 503 with a ``retry:`` hint.
+"""
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, select
+
+from godweb.extensions import db
+from godweb.models import ServerEvent
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_CHANNEL = 'global'
+# Events fetched per poll; a reconnecting client catches up over several polls.
+POLL_BATCH_SIZE = 500
+PRUNE_EVERY = 300  # seconds between retention sweeps
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def publish(event, data, channel=GLOBAL_CHANNEL):
+    """Queue ``event`` for stream subscribers of ``channel``. Caller commits."""
+    db.session.add(ServerEvent(channel=channel, event=event, data=json.dumps(data)))
+
+
+def publish_stock(product):
+    publish('stock', {'product_id': product.id, 'stock': product.stock or 0})
+
+
+def latest_event_id():
+    return db.session.query(func.max(ServerEvent.id)).scalar() or 0
+
+
+def format_sse(event_id, event, data):
+    return f'id: {event_id}\nevent: {event}\ndata: {data}\n\n'
+
+
+class Subscription:
+    def __init__(self, channels, last_id):
+        self.channels = frozenset(channels)
+        self.last_id = last_id
+        # Ids above ``last_id`` already delivered (rows still inside the settle window).
+        self.sent = set()
+        self.queue = queue.Queue()
+
+
+class EventBroker:
+    def __init__(self, app, poll_interval=1.0, retention=3600, settle=5, max_streams=None):
+        self.app = app
+        self.max_streams = max_streams
+        self.poll_interval = poll_interval
+        self.settle = settle
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._thread = None
+        self._last_prune = 0.0
+
+    def subscribe(self, channels, last_id):
+        """Register a stream that wants events of ``channels`` after ``last_id``.
+
+        Returns ``None`` when the worker already serves ``max_streams`` streams.
+        """
+        subscription = Subscription(channels, last_id)
+        with self._lock:
+            if self.max_streams is not None and len(self._subscribers) >= self.max_streams:
+                return None
+            self._subscribers.add(subscription)
+            # Started lazily so the thread lives in the worker, not a preloaded master.
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='godweb-events', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                # Exit when idle; the next subscriber starts a fresh thread.
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            try:
+                self.poll()
+            except Exception:
+                logger.exception('Polling server events failed')
+            time.sleep(self.poll_interval)
+
+    def poll(self):
+        """Deliver new events to every subscriber. Returns the number fetched."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return 0
+
+        channels = set().union(*(sub.channels for sub in subscribers))
+        after_id = min(sub.last_id for sub in subscribers)
+        with self.app.app_context():
+            rows = db.session.execute(
+                select(ServerEvent.id, ServerEvent.channel, ServerEvent.event, ServerEvent.data,
+                       ServerEvent.created_at)
+                .where(ServerEvent.id > after_id, ServerEvent.channel.in_(channels))
+                .order_by(ServerEvent.id)
+                .limit(POLL_BATCH_SIZE)
+            ).all()
+            self._prune()
+
+        # Rows older than this are assumed to have every lower id committed.
+        cutoff = datetime.utcnow() - timedelta(seconds=self.settle)
+        for sub in subscribers:
+            settled = True
+            for row in rows:
+                if row.id <= sub.last_id:
+                    continue
+                if row.channel in sub.channels and row.id not in sub.sent:
+                    sub.queue.put(format_sse(row.id, row.event, row.data))
+                    sub.sent.add(row.id)
+                # Only the contiguous settled prefix moves the watermark.
+                settled = settled and row.created_at <= cutoff
+                if settled:
+                    sub.last_id = row.id
+            sub.sent = {event_id for event_id in sub.sent if event_id > sub.last_id}
+        return len(rows)
+
+    def _prune(self):
+        now = time.monotonic()
+        if now - self._last_prune < PRUNE_EVERY:
+            return
+        self._last_prune = now
+        cutoff = datetime.utcnow() - timedelta(seconds=self.retention)
+        db.session.execute(delete(ServerEvent).where(ServerEvent.created_at < cutoff))
+        db.session.commit()
+
+    def stream(self, subscription, keepalive=15.0, max_duration=300.0, retry_ms=3000):
+        """Yield SSE frames for ``subscription`` until ``max_duration`` elapses.
+
+        Ending the response periodically frees the thread; the browser's
+        EventSource reconnects with ``Last-Event-ID`` and misses nothing.
+        """
+        deadline = time.monotonic() + max_duration
+        try:
+            # Sent immediately so proxies see response bytes right away.
+            yield f'retry: {retry_ms}\n\n'
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    yield subscription.queue.get(timeout=min(keepalive, remaining))
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+        finally:
+            self.unsubscribe(subscription)
+
+
+def init_event_broker(app):
+    broker = EventBroker(
+        app,
+        poll_interval=app.config.get('SSE_POLL_INTERVAL', 1.0),
+        retention=app.config.get('SSE_EVENT_RETENTION', 3600),
+        settle=app.config.get('SSE_SETTLE_SECONDS', 5),
+        max_streams=app.config.get('SSE_MAX_STREAMS'),
+    )
+    app.extensions['event_broker'] = broker
+    return broker
+
+
+def get_event_broker(app):
+    return app.extensions['event_broker']
@@ -0,0 +1,132 @@
+"""Bulk GodCoin grants from a CSV upload (promotions).
+
+The file has one ``user_id,amount[,description]`` row per grant; a header
+row is optional. The whole file is validated first: every user id is
+checked against one prefetched set of existing ids, and any bad row rejects
+the batch so a promotion is never half-applied. A valid batch is credited
+with ``godweb.wallet.credit_many``: one ``UPDATE ... FROM (VALUES ...)`` per
+1,000 users and one bulk INSERT of the ledger rows.
+
+Each applied file is recorded in ``grant_batches`` under its SHA-256, which
+is unique. The batch row is written before the credits, in the same
+transaction, so a retried or concurrent upload of the same file fails on
+the constraint and credits nothing twice.
+"""
+import csv
+import hashlib
+import io
+import re
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from godweb.extensions import db
+from godweb.models import GrantBatch, User
+from godweb.wallet import credit_many
+
+DEFAULT_DESCRIPTION = 'Khuyến mãi GodCoin'
+# Keeps IN lists well under every engine's bound-parameter limit.
+_CHUNK = 1000
+# Errors listed back to the admin; the count is always exact.
+MAX_REPORTED_ERRORS = 200
+# Largest grant a single row may carry; a typo must not mint a fortune.
+MAX_GRANT_AMOUNT = 1_000_000
+# User ids are 64-bit integers at most; larger ones cannot even be bound in a query.
+MAX_USER_ID = 2 ** 63 - 1
+# Plain ASCII digits only: int() would also take '1_000', ' +5' or '٣'.
+_DIGITS = re.compile(r'[0-9]+')
+
+
+class GrantResult:
+    """Outcome of one upload: ``status`` is ``applied``, ``invalid`` or ``duplicate``."""
+
+    def __init__(self, status, batch=None, errors=None, error_count=0):
+        self.status = status
+        self.batch = batch
+        self.errors = errors or []  # (line number, message)
+        self.error_count = error_count
+
+
+def _parse_int(value):
+    return int(value) if _DIGITS.fullmatch(value) else None
+
+
+def parse_grants(text):
+    """``[(line number, user_id, amount, description)]`` and ``[(line number, error)]``."""
+    grants, errors = [], []
+    for line_number, row in enumerate(csv.reader(io.StringIO(text)), start=1):
+        cells = [cell.strip() for cell in row]
+        if not any(cells):
+            continue
+        if line_number == 1 and _parse_int(cells[0]) is None:
+            continue  # header
+        if len(cells) < 2:
+            errors.append((line_number, 'Thiếu số lượng GodCoin'))
+            continue
+        user_id = _parse_int(cells[0])
+        if user_id is None or not 0 < user_id <= MAX_USER_ID:
+            errors.append((line_number, f'User ID không hợp lệ: {cells[0]}'))
+            continue
+        amount = _parse_int(cells[1])
+        if amount is None or amount <= 0:
+            errors.append((line_number, f'Số GodCoin không hợp lệ: {cells[1]}'))
+            continue
+        if amount > MAX_GRANT_AMOUNT:
+            errors.append((line_number, f'Số GodCoin vượt quá giới hạn {MAX_GRANT_AMOUNT:,}: {cells[1]}'))
+            continue
+        description = (cells[2] if len(cells) > 2 and cells[2] else DEFAULT_DESCRIPTION)[:255]
+        grants.append((line_number, user_id, amount, description))
+    return grants, errors
+
+
+def _existing_user_ids(user_ids):
+    ids = sorted(user_ids)
+    existing = set()
+    for offset in range(0, len(ids), _CHUNK):
+        existing.update(db.session.execute(
+            select(User.id).where(User.id.in_(ids[offset:offset + _CHUNK]))
+        ).scalars())
+    return existing
+
+
+def apply_grant_file(data, filename=None, admin_id=None):
+    """Validate and apply one uploaded grant file (``bytes``). Commits on success."""
+    digest = hashlib.sha256(data).hexdigest()
+    existing = GrantBatch.query.filter_by(digest=digest).first()
+    if existing is not None:
+        return GrantResult('duplicate', batch=existing)
+
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return GrantResult('invalid', errors=[(0, 'File phải là CSV mã hoá UTF-8')], error_count=1)
+    grants, errors = parse_grants(text)
+    known = _existing_user_ids({user_id for _, user_id, _, _ in grants})
+    errors.extend(
+        (line_number, f'Không tìm thấy người dùng #{user_id}')
+        for line_number, user_id, _, _ in grants if user_id not in known
+    )
+    if not grants and not errors:
+        errors.append((0, 'File không có dòng nào'))
+    if errors:
+        errors.sort()
+        return GrantResult('invalid', errors=errors[:MAX_REPORTED_ERRORS], error_count=len(errors))
+
+    batch = GrantBatch(
+        digest=digest, filename=filename, admin_id=admin_id, rows=len(grants),
+        users=len({user_id for _, user_id, _, _ in grants}),
+        total=sum(amount for _, _, amount, _ in grants),
+    )
+    try:
+        db.session.add(batch)
+        db.session.flush()  # claims the digest before any balance moves
+        credit_many([(user_id, amount, description) for _, user_id, amount, description in grants], 'admin_add')
+        db.session.commit()
+    except IntegrityError:
+        # The same file was applied concurrently.
+        db.session.rollback()
+        return GrantResult('duplicate', batch=GrantBatch.query.filter_by(digest=digest).first())
+    except Exception:
+        db.session.rollback()
+        raise
+    return GrantResult('applied', batch=batch)
@@ -0,0 +1,109 @@
+"""Gunicorn settings for GodWeb (``gunicorn -c python:godweb.gunicorn_conf godweb.app:app``).
+
+With ``preload_app`` the master imports Flask, SQLAlchemy and every blueprint
+once, builds the app (schema check, search backend), compiles all templates,
+renders the hot pages once (``godweb.templating``) and freezes the GC so those
+pages stay shared copy-on-write between workers; forking a worker then costs
+no imports and no DB round trips.
+
+Fork safety: the master closes its pooled DB connections before forking and
+each worker disposes the inherited pool (``post_fork``) so no socket is ever
+shared between processes. Everything else that holds state is per process by
+design: the view counter buffer is flushed on ``worker_exit``, the SSE poller
+thread starts lazily inside a worker, and instrumentation keys by pid.
+
+Environment:
+
+* ``WEB_CONCURRENCY`` -- workers (Heroku sets it from the dyno size).
+* ``GUNICORN_WORKER_CLASS`` -- ``gthread`` (default) or ``gevent``. SSE
+  streams hold a worker thread each for up to ``SSE_MAX_DURATION``; with
+  gthread size ``GUNICORN_THREADS`` for that. ``gevent`` is used only when
+  installed, otherwise we fall back to gthread.
+* ``GUNICORN_THREADS`` -- threads per gthread worker (default 16). At most
+  ``SSE_MAX_STREAMS`` (default 8) of them serve event streams at a time.
+* ``PRELOAD_APP`` -- ``1`` (default) or ``0``.
+"""
+import gc
+import importlib.util
+import logging
+import multiprocessing
+import os
+import sys
+
+logger = logging.getLogger('gunicorn.error')
+
+
+def _worker_class():
+    requested = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+    if requested == 'gevent' and importlib.util.find_spec('gevent') is None:
+        logger.warning('GUNICORN_WORKER_CLASS=gevent but gevent is not installed; using gthread')
+        return 'gthread'
+    return requested
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', min(2 * multiprocessing.cpu_count() + 1, 4)))
+worker_class = _worker_class()
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+if worker_class == 'gevent':
+    worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+preload_app = os.environ.get('PRELOAD_APP', '1') == '1'
+# Heroku's router gives up after 30 s; SSE responses stream well past that, so
+# the timeout only guards against a worker that stops heartbeating.
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 20))
+keepalive = 5
+accesslog = '-' if os.environ.get('GUNICORN_ACCESS_LOG', '0') == '1' else None
+
+
+def _app():
+    from godweb.app import app
+    return app
+
+
+def _dispose_engines(close):
+    from godweb.extensions import db
+    with _app().app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    from godweb.templating import warm_pages, warm_templates
+    loaded = warm_templates(_app())
+    warm_pages(_app())
+    # Connections opened while booting must not leak into the children.
+    _dispose_engines(close=True)
+    # Objects created so far live for the life of the process; keeping them
+    # out of the collector stops GC passes from dirtying shared pages.
+    gc.collect()
+    gc.freeze()
+    server.log.info('Preloaded app: %d templates compiled, %d objects frozen', loaded, gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    if not server.cfg.preload_app:
+        return
+    # Belt and braces: drop any pooled connection inherited from the master
+    # without closing it (the socket belongs to the parent).
+    _dispose_engines(close=False)
+
+
+def post_worker_init(worker):
+    if worker.cfg.preload_app:
+        return
+    from godweb.templating import warm_pages, warm_templates
+    warm_templates(_app())
+    warm_pages(_app())
+
+
+def worker_exit(server, worker):
+    # Buffered blog view counts would otherwise be lost on restart/scale-down.
+    module = sys.modules.get('godweb.app')
+    if module is None:
+        return  # the worker died before loading the app
+    flushed = module.app.extensions['view_counter'].flush()
+    if flushed:
+        server.log.info('Flushed buffered views for %d posts on worker exit', flushed)
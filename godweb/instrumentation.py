@@ -0,0 +1,243 @@
+"""Opt-in per-request performance instrumentation.
+
+Enabled with ``PERF_INSTRUMENTATION=1``. Every request then records its SQL
+query count, total DB time, template render time and slowest statements (via
+SQLAlchemy engine events and Flask template signals), and answers with a
+``Server-Timing`` header that browser dev tools display next to the request.
+``PERF_LOG=1`` also writes one JSON line per request to the ``godweb.perf``
+logger.
+
+Per-endpoint totals are kept in process memory and published to the shared
+app cache every ``PERF_PUBLISH_INTERVAL`` seconds, so the admin performance
+page can merge the numbers of every worker on the dyno.
+
+When disabled nothing is registered at all: no engine listeners, no request
+hooks and no signal receivers, so the cost is zero.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+
+from godweb.extensions import db
+
+logger = logging.getLogger('godweb.perf')
+
+WORKERS_KEY = 'perf:workers'
+RESET_KEY = 'perf:reset'
+# Snapshots older than this belong to workers that have exited.
+WORKER_TTL = 600
+STATEMENT_PREVIEW = 300
+
+
+class RequestStats:
+    __slots__ = ('started', 'queries', 'db_time', 'template_time', 'slowest', 'template_depth', 'template_started')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.slowest = []  # [(seconds, statement)], longest first
+        self.template_depth = 0
+        self.template_started = 0.0
+
+
+def _empty_totals():
+    return {'requests': 0, 'total_ms': 0.0, 'db_ms': 0.0, 'template_ms': 0.0,
+            'queries': 0, 'max_ms': 0.0, 'max_queries': 0}
+
+
+class Instrumentation:
+    def __init__(self, app, slow_statements=3, log=False, publish_interval=10.0):
+        self.app = app
+        self.slow_statements = slow_statements
+        self.log = log
+        self.publish_interval = publish_interval
+        self._lock = threading.Lock()
+        self._totals = defaultdict(_empty_totals)
+        self._last_publish = time.monotonic()
+        self._reset_token = None
+
+    # -- hooks --------------------------------------------------------------
+
+    def install(self):
+        with self.app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        before_render_template.connect(self._before_render, self.app)
+        template_rendered.connect(self._after_render, self.app)
+        self.app.before_request(self._start_request)
+        self.app.after_request(self._finish_request)
+
+    # The start time rides on the statement's execution context, which is
+    # dropped with it; a statement that fails (no after_cursor_execute) leaves
+    # nothing behind on the connection.
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.perf_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, 'perf_started', None)
+        stats = g.get('perf_stats') if has_request_context() else None
+        if started is None or stats is None:
+            return
+        elapsed = time.perf_counter() - started
+        stats.queries += 1
+        stats.db_time += elapsed
+        slowest = stats.slowest
+        if len(slowest) < self.slow_statements or elapsed > slowest[-1][0]:
+            slowest.append((elapsed, statement[:STATEMENT_PREVIEW]))
+            slowest.sort(key=lambda item: item[0], reverse=True)
+            del slowest[self.slow_statements:]
+
+    def _before_render(self, sender, template, context, **extra):
+        stats = g.get('perf_stats') if has_request_context() else None
+        if stats is None:
+            return
+        if stats.template_depth == 0:
+            stats.template_started = time.perf_counter()
+        stats.template_depth += 1
+
+    def _after_render(self, sender, template, context, **extra):
+        stats = g.get('perf_stats') if has_request_context() else None
+        if stats is None or not stats.template_depth:
+            return
+        stats.template_depth -= 1
+        if stats.template_depth == 0:
+            stats.template_time += time.perf_counter() - stats.template_started
+
+    def _start_request(self):
+        g.perf_stats = RequestStats()
+
+    def _finish_request(self, response):
+        stats = g.pop('perf_stats', None)
+        if stats is None:
+            return response
+        total_ms = (time.perf_counter() - stats.started) * 1000
+        db_ms = stats.db_time * 1000
+        template_ms = stats.template_time * 1000
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={db_ms:.1f};desc="{stats.queries} queries", '
+            f'tpl;dur={template_ms:.1f};desc="templates", '
+            f'app;dur={total_ms:.1f};desc="total"',
+        )
+        endpoint = request.endpoint or '<unmatched>'
+        self._record(endpoint, total_ms, db_ms, template_ms, stats.queries)
+        if self.log:
+            logger.info(json.dumps({
+                'endpoint': endpoint,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'total_ms': round(total_ms, 2),
+                'db_ms': round(db_ms, 2),
+                'template_ms': round(template_ms, 2),
+                'queries': stats.queries,
+                'slowest': [{'ms': round(seconds * 1000, 2), 'sql': sql} for seconds, sql in stats.slowest],
+            }, ensure_ascii=False))
+        return response
+
+    # -- aggregation --------------------------------------------------------
+
+    def _record(self, endpoint, total_ms, db_ms, template_ms, queries):
+        with self._lock:
+            totals = self._totals[endpoint]
+            totals['requests'] += 1
+            totals['total_ms'] += total_ms
+            totals['db_ms'] += db_ms
+            totals['template_ms'] += template_ms
+            totals['queries'] += queries
+            totals['max_ms'] = max(totals['max_ms'], total_ms)
+            totals['max_queries'] = max(totals['max_queries'], queries)
+            due = time.monotonic() - self._last_publish >= self.publish_interval
+        if due:
+            self.publish()
+
+    def snapshot(self):
+        with self._lock:
+            return {endpoint: dict(totals) for endpoint, totals in self._totals.items()}
+
+    def publish(self):
+        """Store this worker's totals in the shared cache for the admin page."""
+        cache = self.app.extensions['cache']
+        pid = os.getpid()
+        reset_token = cache.get(RESET_KEY)
+        with self._lock:
+            self._last_publish = time.monotonic()
+            if reset_token != self._reset_token:
+                # Another worker reset the stats; drop what was counted before that.
+                self._reset_token = reset_token
+                self._totals.clear()
+        cache.set(f'perf:stats:{pid}', self.snapshot(), timeout=WORKER_TTL)
+        workers = cache.get(WORKERS_KEY) or {}
+        workers[pid] = time.time()
+        cache.set(WORKERS_KEY, workers, timeout=0)
+
+    def endpoint_stats(self):
+        """Per-endpoint totals merged across live workers, busiest endpoint first."""
+        self.publish()
+        cache = self.app.extensions['cache']
+        now = time.time()
+        merged = defaultdict(_empty_totals)
+        workers = cache.get(WORKERS_KEY) or {}
+        for pid, seen in workers.items():
+            if now - seen > WORKER_TTL:
+                continue
+            for endpoint, totals in (cache.get(f'perf:stats:{pid}') or {}).items():
+                target = merged[endpoint]
+                for key in ('requests', 'total_ms', 'db_ms', 'template_ms', 'queries'):
+                    target[key] += totals[key]
+                target['max_ms'] = max(target['max_ms'], totals['max_ms'])
+                target['max_queries'] = max(target['max_queries'], totals['max_queries'])
+
+        rows = []
+        for endpoint, totals in merged.items():
+            count = totals['requests'] or 1
+            rows.append({
+                'endpoint': endpoint,
+                'requests': totals['requests'],
+                'avg_ms': totals['total_ms'] / count,
+                'avg_db_ms': totals['db_ms'] / count,
+                'avg_template_ms': totals['template_ms'] / count,
+                'avg_queries': totals['queries'] / count,
+                'max_ms': totals['max_ms'],
+                'max_queries': totals['max_queries'],
+            })
+        rows.sort(key=lambda row: row['requests'] * row['avg_ms'], reverse=True)
+        return rows
+
+    def reset(self):
+        """Zero the totals of every worker (each drops its own on next publish)."""
+        cache = self.app.extensions['cache']
+        token = uuid.uuid4().hex
+        with self._lock:
+            self._reset_token = token
+            self._totals.clear()
+        cache.set(RESET_KEY, token, timeout=0)
+        for pid in cache.get(WORKERS_KEY) or {}:
+            cache.delete(f'perf:stats:{pid}')
+        cache.delete(WORKERS_KEY)
+
+
+def init_instrumentation(app):
+    """Install the hooks when ``PERF_INSTRUMENTATION`` is on; returns None otherwise."""
+    if not app.config.get('PERF_INSTRUMENTATION'):
+        return None
+    instrumentation = Instrumentation(
+        app,
+        slow_statements=app.config.get('PERF_SLOW_STATEMENTS', 3),
+        log=app.config.get('PERF_LOG', False),
+        publish_interval=app.config.get('PERF_PUBLISH_INTERVAL', 10.0),
+    )
+    instrumentation.install()
+    app.extensions['instrumentation'] = instrumentation
+    return instrumentation
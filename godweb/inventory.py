@@ -0,0 +1,277 @@
+"""DB-backed product inventory storage.
+
+Both inventory modes keep one ``ProductInventoryAccount`` row per sellable
+account: zip uploads ('folder') use the archive's file names, .txt uploads
+('file') get zero-padded sequence names so the ``(product_id, filename, id)``
+index returns them in upload order. Claiming accounts is a single indexed
+DELETE, so a sale costs the same whether 10 or 200k accounts are left in
+stock.
+"""
+import io
+from datetime import datetime
+
+from sqlalchemy import delete, insert, select
+
+from godweb.extensions import db
+from godweb.models import ProductInventoryAccount
+from godweb.utils import (
+    normalize_inventory_parse_mode,
+    parse_inventory_accounts_text,
+)
+
+INSERT_BATCH_SIZE = 1000
+STREAM_CHUNK_SIZE = 64 * 1024
+_COPY_COLUMNS = ('product_id', 'filename', 'content', 'created_at')
+
+
+def file_account_name(index):
+    """Synthetic row name for the ``index``-th account of a .txt upload."""
+    return f'{index:010d}.txt'
+
+
+def supports_row_locks():
+    bind = db.session.get_bind()
+    return bind.dialect.name in ('postgresql', 'mysql')
+
+
+def _copy_escape(value):
+    """Encode one value for Postgres' COPY text format."""
+    if value is None:
+        return '\\N'
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+def _copy_rows(rows):
+    """Bulk-load rows with ``COPY ... FROM STDIN`` on the session's connection."""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(_copy_escape(row[column]) for column in _COPY_COLUMNS))
+        buffer.write('\n')
+    buffer.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {ProductInventoryAccount.__tablename__} ({', '.join(_COPY_COLUMNS)}) FROM STDIN",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+
+def _insert_rows(rows):
+    dialect = db.session.get_bind().dialect
+    if dialect.name == 'postgresql' and dialect.driver == 'psycopg2':
+        _copy_rows(rows)
+    else:
+        db.session.execute(insert(ProductInventoryAccount), rows)
+
+
+def replace_inventory_accounts(product, accounts, progress=None):
+    """Replace every inventory row of ``product`` with ``(filename, content)`` pairs.
+
+    ``accounts`` may be any iterable (e.g. a streaming zip reader). Rows are
+    written in fixed-size batches -- COPY on Postgres, executemany elsewhere --
+    so large uploads never materialize one ORM object per account. ``progress``
+    is called with the running total after each batch. Returns the row count.
+    """
+    ProductInventoryAccount.query.filter_by(product_id=product.id).delete(synchronize_session=False)
+
+    total = 0
+    batch = []
+    created_at = datetime.utcnow()
+    for filename, content in accounts:
+        batch.append({
+            'product_id': product.id,
+            'filename': filename,
+            'content': content,
+            'created_at': created_at,
+        })
+        if len(batch) >= INSERT_BATCH_SIZE:
+            _insert_rows(batch)
+            total += len(batch)
+            batch = []
+            if progress:
+                progress(total)
+    if batch:
+        _insert_rows(batch)
+        total += len(batch)
+        if progress:
+            progress(total)
+    return total
+
+
+def store_file_inventory(product, content, parse_mode='line'):
+    """Split a .txt upload into per-account rows for a file-mode product."""
+    mode = normalize_inventory_parse_mode(parse_mode)
+    accounts = parse_inventory_accounts_text(content, mode)
+    count = replace_inventory_accounts(
+        product,
+        ((file_account_name(index), account) for index, account in enumerate(accounts, start=1)),
+    )
+    product.inventory_type = 'file'
+    product.parse_mode = mode
+    product.inventory_data = None
+    product.stock = count
+    return count
+
+
+def migrate_legacy_inventory_data(product):
+    """Move a legacy ``Product.inventory_data`` blob into per-account rows.
+
+    Idempotent: the blob is cleared once migrated, so later calls are no-ops.
+    Returns True when a migration happened.
+    """
+    if (product.inventory_type or 'file') != 'file' or product.inventory_data is None:
+        return False
+    store_file_inventory(product, product.inventory_data, product.parse_mode)
+    return True
+
+
+def claim_inventory_accounts(product, quantity=1):
+    """Remove and return up to ``quantity`` accounts for ``product`` in sale order.
+
+    Uses a single ``DELETE ... WHERE id IN (SELECT ... LIMIT n) RETURNING`` where
+    the dialect supports it. Concurrent buyers on Postgres/MySQL skip rows
+    already claimed by another open transaction instead of queueing behind them.
+    The result may be shorter than ``quantity`` when stock runs out.
+    """
+    table = ProductInventoryAccount.__table__
+    next_ids = (
+        select(table.c.id)
+        .where(table.c.product_id == product.id)
+        .order_by(table.c.filename, table.c.id)
+        .limit(quantity)
+    )
+    if supports_row_locks():
+        next_ids = next_ids.with_for_update(skip_locked=True)
+
+    dialect = db.session.get_bind().dialect
+    if dialect.delete_returning and dialect.name != 'mysql':
+        rows = db.session.execute(
+            delete(table)
+            .where(table.c.id.in_(next_ids))
+            .returning(table.c.filename, table.c.id, table.c.content)
+        ).all()
+        # RETURNING order is unspecified; restore sale order.
+        rows.sort(key=lambda row: (row.filename, row.id))
+    else:
+        rows = db.session.execute(next_ids.add_columns(table.c.filename, table.c.content)).all()
+        if rows:
+            db.session.execute(delete(table).where(table.c.id.in_([row.id for row in rows])))
+
+    return [(row.content or '').strip() for row in rows]
+
+
+def claim_inventory_account(product):
+    """Remove and return the next account for ``product`` (None when sold out)."""
+    accounts = claim_inventory_accounts(product, 1)
+    return accounts[0] if accounts else None
+
+
+def iter_inventory_rows(product, batch_size=INSERT_BATCH_SIZE):
+    """Yield remaining ``(filename, content)`` rows for ``product`` in sale order.
+
+    Rows are fetched ``batch_size`` at a time (a server-side cursor on Postgres),
+    so callers can walk arbitrarily large inventories in constant memory.
+    """
+    query = (
+        db.session.query(ProductInventoryAccount.filename, ProductInventoryAccount.content)
+        .filter_by(product_id=product.id)
+        .order_by(ProductInventoryAccount.filename, ProductInventoryAccount.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for filename, content in query:
+        yield filename, content
+
+
+def iter_inventory_contents(product, batch_size=INSERT_BATCH_SIZE):
+    """Yield remaining account contents for ``product`` in sale order."""
+    for _, content in iter_inventory_rows(product, batch_size):
+        yield content
+
+
+def has_inventory_accounts(product):
+    query = db.session.query(ProductInventoryAccount.id).filter_by(product_id=product.id)
+    return query.first() is not None
+
+
+def iter_file_inventory_chunks(product, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield the remaining .txt inventory of a file-mode product in text chunks."""
+    if product.inventory_data is not None:
+        data = product.inventory_data
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
+        return
+
+    if normalize_inventory_parse_mode(product.parse_mode) == 'separator':
+        separator = '\n|\n'
+    else:
+        separator = '\n'
+
+    pending = []
+    pending_size = 0
+    for index, content in enumerate(iter_inventory_contents(product)):
+        piece = content if index == 0 else separator + content
+        pending.append(piece)
+        pending_size += len(piece)
+        if pending_size >= chunk_size:
+            yield ''.join(pending)
+            pending = []
+            pending_size = 0
+    if pending:
+        yield ''.join(pending)
+
+
+def file_inventory_text(product):
+    """Rebuild the remaining .txt inventory of a file-mode product."""
+    return ''.join(iter_file_inventory_chunks(product))
+
+
+class _ZipChunkSink(io.RawIOBase):
+    """Unseekable write target that hands zip output back in chunks."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        self.size = 0
+        return data
+
+
+def iter_inventory_zip_chunks(product, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield a deflated zip of the remaining folder-mode accounts, chunk by chunk.
+
+    ``zipfile`` writes data descriptors when its target can't seek, so each
+    entry can be flushed to the client as soon as it is compressed.
+    """
+    # Imported here: only inventory downloads need it, not every worker boot.
+    import zipfile
+
+    sink = _ZipChunkSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for filename, content in iter_inventory_rows(product):
+            archive.writestr(filename, (content or '').encode('utf-8'))
+            if sink.size >= chunk_size:
+                yield sink.drain()
+    # Closing the archive writes the central directory.
+    tail = sink.drain()
+    if tail:
+        yield tail
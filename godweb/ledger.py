@@ -0,0 +1,183 @@
+"""GodCoin ledger: balance history, snapshots, statements and reconciliation.
+
+``transactions`` is the append-only ledger. Entries written through
+``godweb.wallet`` carry ``balance_after``, so the balance at any moment is
+the ``balance_after`` of the last entry before it -- one indexed lookup on
+``(user_id, created_at, id)``.
+
+Entries from before the ledger have no ``balance_after``, and some balances
+(seeded accounts, manual fixes) never had entries at all. ``balance_snapshots``
+anchors those: ``take_snapshots`` records, in one ``INSERT ... SELECT``, the
+current balance of every user whose ledger moved since their last snapshot,
+together with the last entry id it covers. A historical balance is then the
+nearest snapshot plus the few entries after it.
+
+``reconcile_ledger`` checks, for all users in one grouped query, that the
+latest snapshot plus ``SUM(amount)`` of later entries equals
+``users.godcoin_balance``.
+
+Run ``python -m godweb.ledger snapshot`` from a scheduler (e.g. daily) and
+``python -m godweb.ledger reconcile`` to check for drift.
+"""
+import logging
+import sys
+from datetime import datetime
+
+from sqlalchemy import and_, func, insert, literal, select
+
+from godweb.extensions import db
+from godweb.models import BalanceSnapshot, Transaction, User
+
+logger = logging.getLogger(__name__)
+
+# Entries listed on one statement page; totals always cover the whole range.
+STATEMENT_ENTRY_LIMIT = 500
+
+
+def _latest_snapshot_ids():
+    return (
+        select(BalanceSnapshot.user_id, func.max(BalanceSnapshot.id).label('snapshot_id'))
+        .group_by(BalanceSnapshot.user_id)
+        .subquery()
+    )
+
+
+def take_snapshots(now=None):
+    """Snapshot every user whose ledger moved since their last snapshot. Returns rows written."""
+    now = now or datetime.utcnow()
+    last_entry = (
+        select(Transaction.user_id, func.max(Transaction.id).label('transaction_id'))
+        .group_by(Transaction.user_id)
+        .subquery()
+    )
+    covered = (
+        select(BalanceSnapshot.user_id, func.max(func.coalesce(BalanceSnapshot.transaction_id, 0)).label('covered'))
+        .group_by(BalanceSnapshot.user_id)
+        .subquery()
+    )
+    rows = (
+        select(
+            User.id,
+            func.coalesce(User.godcoin_balance, 0),
+            last_entry.c.transaction_id,
+            literal(now, db.DateTime),
+        )
+        .outerjoin(last_entry, last_entry.c.user_id == User.id)
+        .outerjoin(covered, covered.c.user_id == User.id)
+        .where(func.coalesce(last_entry.c.transaction_id, 0) != func.coalesce(covered.c.covered, -1))
+    )
+    result = db.session.execute(
+        insert(BalanceSnapshot).from_select(['user_id', 'balance', 'transaction_id', 'taken_at'], rows)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def balance_at(user_id, when):
+    """The user's balance just before ``when``."""
+    entry = db.session.execute(
+        select(Transaction.id, Transaction.balance_after)
+        .where(Transaction.user_id == user_id, Transaction.created_at < when)
+        .order_by(Transaction.created_at.desc(), Transaction.id.desc())
+        .limit(1)
+    ).first()
+    if entry is not None and entry.balance_after is not None:
+        return entry.balance_after
+
+    # Legacy history: nearest snapshot, then the entries after it.
+    snapshot = db.session.execute(
+        select(BalanceSnapshot.balance, BalanceSnapshot.transaction_id)
+        .where(BalanceSnapshot.user_id == user_id, BalanceSnapshot.taken_at < when)
+        .order_by(BalanceSnapshot.taken_at.desc(), BalanceSnapshot.id.desc())
+        .limit(1)
+    ).first()
+    base = snapshot.balance if snapshot else 0
+    after_id = (snapshot.transaction_id or 0) if snapshot else 0
+    delta = db.session.execute(
+        select(func.coalesce(func.sum(Transaction.amount), 0))
+        .where(Transaction.user_id == user_id, Transaction.id > after_id, Transaction.created_at < when)
+    ).scalar()
+    return base + delta
+
+
+def statement(user_id, start, end, limit=STATEMENT_ENTRY_LIMIT):
+    """Opening/closing balance and entries for ``start <= created_at < end``."""
+    in_range = and_(
+        Transaction.user_id == user_id, Transaction.created_at >= start, Transaction.created_at < end,
+    )
+    credits, debits, count = db.session.execute(
+        select(
+            func.coalesce(func.sum(Transaction.amount).filter(Transaction.amount > 0), 0),
+            func.coalesce(func.sum(Transaction.amount).filter(Transaction.amount < 0), 0),
+            func.count(Transaction.id),
+        ).where(in_range)
+    ).one()
+    entries = (
+        Transaction.query.filter(in_range)
+        .order_by(Transaction.created_at, Transaction.id)
+        .limit(limit)
+        .all()
+    )
+    opening = balance_at(user_id, start)
+    return {
+        'start': start,
+        'end': end,
+        'opening': opening,
+        'credits': credits,
+        'debits': -debits,
+        'closing': opening + credits + debits,
+        'entries': entries,
+        'entry_count': count,
+    }
+
+
+def _expected_balances():
+    latest = _latest_snapshot_ids()
+    snapshot = BalanceSnapshot.__table__.alias('snapshot')
+    return (
+        select(
+            User.id.label('user_id'),
+            func.coalesce(User.godcoin_balance, 0).label('stored'),
+            (func.coalesce(snapshot.c.balance, 0) + func.coalesce(func.sum(Transaction.amount), 0)).label('expected'),
+        )
+        .outerjoin(latest, latest.c.user_id == User.id)
+        .outerjoin(snapshot, snapshot.c.id == latest.c.snapshot_id)
+        .outerjoin(Transaction, and_(
+            Transaction.user_id == User.id,
+            Transaction.id > func.coalesce(snapshot.c.transaction_id, 0),
+        ))
+        .group_by(User.id, User.godcoin_balance, snapshot.c.balance)
+        .subquery()
+    )
+
+
+def reconcile_ledger():
+    """Compare stored balances with snapshot + ledger for every user in one pass.
+
+    Returns ``{'stored_total', 'expected_total', 'mismatches': [(user_id, stored, expected)]}``.
+    """
+    balances = _expected_balances()
+    stored_total, expected_total = db.session.execute(
+        select(func.coalesce(func.sum(balances.c.stored), 0), func.coalesce(func.sum(balances.c.expected), 0))
+    ).one()
+    mismatches = [
+        tuple(row) for row in db.session.execute(
+            select(balances.c.user_id, balances.c.stored, balances.c.expected)
+            .where(balances.c.stored != balances.c.expected)
+            .order_by(balances.c.user_id)
+        )
+    ]
+    if mismatches:
+        logger.warning('Ledger mismatch for %d user(s), e.g. %s', len(mismatches), mismatches[:5])
+    return {'stored_total': stored_total, 'expected_total': expected_total, 'mismatches': mismatches}
+
+
+if __name__ == '__main__':
+    from godweb.app import app
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'reconcile'
+    with app.app_context():
+        if command == 'snapshot':
+            print(f'{take_snapshots()} snapshot(s) written')
+        else:
+            print(reconcile_ledger())
@@ -0,0 +1,304 @@
+"""Versioned schema migrations.
+
+Each migration is a function registered with ``@migration(version, name)``;
+applied versions are recorded in ``schema_version``. ``migrate()`` runs the
+pending ones in order under a lock (a Postgres advisory lock; SQLite
+serializes writers by itself), so it is meant to run once per deploy::
+
+    python -m godweb.migrations          # Heroku release phase (see Procfile)
+
+and ``create_app()`` only reads the current version number
+(``check_schema``). ``SCHEMA_ON_BOOT`` decides what a worker does when the
+database is behind anyway (local development, a deploy without the release
+phase): ``migrate`` (default; the lock makes concurrent workers apply each
+migration once), ``check`` (refuse to start) or ``off``.
+
+Migrations 1-6 are the steps every worker used to repeat at boot. They stay
+idempotent so an existing database without ``schema_version`` is adopted by
+simply running them once. New migrations append with the next number and
+never change an already released one.
+"""
+import logging
+import os
+from contextlib import contextmanager
+
+from flask import current_app
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from godweb.extensions import db
+from godweb.models import SchemaVersion
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = []
+
+# Arbitrary constant shared by every process running migrations.
+ADVISORY_LOCK_KEY = 7_201_931
+
+
+def migration(version, name):
+    def register(fn):
+        assert not MIGRATIONS or MIGRATIONS[-1][0] < version, 'migrations must be registered in order'
+        MIGRATIONS.append((version, name, fn))
+        return fn
+    return register
+
+
+def latest_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def current_version():
+    """Highest applied migration; 0 for a fresh or pre-versioning database."""
+    try:
+        return db.session.execute(select(func.max(SchemaVersion.version))).scalar() or 0
+    except (OperationalError, ProgrammingError):
+        db.session.rollback()
+        return 0
+
+
+@contextmanager
+def _migration_lock():
+    if db.engine.dialect.name != 'postgresql':
+        yield
+        return
+    # Held on its own connection: the session commits (and returns its
+    # connection to the pool) after every migration.
+    with db.engine.connect() as lock_connection:
+        lock_connection.execute(text('SELECT pg_advisory_lock(:key)'), {'key': ADVISORY_LOCK_KEY})
+        try:
+            yield
+        finally:
+            lock_connection.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': ADVISORY_LOCK_KEY})
+            lock_connection.commit()
+
+
+def migrate():
+    """Apply pending migrations. Returns the versions applied."""
+    applied = []
+    with _migration_lock():
+        SchemaVersion.__table__.create(db.engine, checkfirst=True)
+        done = current_version()
+        for version, name, fn in MIGRATIONS:
+            if version <= done:
+                continue
+            logger.info('Applying migration %d: %s', version, name)
+            try:
+                fn()
+                db.session.add(SchemaVersion(version=version, name=name))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            applied.append(version)
+    return applied
+
+
+def check_schema(app):
+    """Boot-time check. Returns True when the schema is current."""
+    if current_version() >= latest_version():
+        return True
+    mode = app.config.get('SCHEMA_ON_BOOT', 'migrate')
+    if mode == 'migrate':
+        logger.info('Database schema is behind; migrating at boot')
+        migrate()
+        return True
+    if mode == 'off':
+        return False
+    raise RuntimeError(
+        f'Database schema is at version {current_version()}, code needs {latest_version()}. '
+        'Run `python -m godweb.migrations` (the Heroku release phase does this on deploy).'
+    )
+
+
+# -- migrations -----------------------------------------------------------------
+
+def _columns(table_name):
+    inspector = inspect(db.engine)
+    if table_name not in inspector.get_table_names():
+        return None
+    return {column['name'] for column in inspector.get_columns(table_name)}
+
+
+def _add_column(table_name, column_name, ddl):
+    columns = _columns(table_name)
+    if columns is not None and column_name not in columns:
+        db.session.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {column_name} {ddl}'))
+        db.session.commit()
+
+
+@migration(1, 'create tables')
+def _create_tables():
+    db.create_all()
+
+
+@migration(2, 'legacy columns')
+def _legacy_columns():
+    _add_column('users', 'recovery_number', 'VARCHAR(20)')
+    _add_column('transactions', 'balance_after', 'INTEGER')
+    _add_column('products', 'parse_mode', "VARCHAR(20) DEFAULT 'line'")
+    _add_column('products', 'inventory_type', "VARCHAR(20) DEFAULT 'file'")
+    _add_column('products', 'inventory_folder_path', 'VARCHAR(255)')
+    _add_column('products', 'inventory_data', 'TEXT')
+    db.session.execute(text("UPDATE products SET parse_mode = 'line' WHERE parse_mode IS NULL"))
+    db.session.execute(text("UPDATE products SET inventory_type = 'file' WHERE inventory_type IS NULL"))
+
+
+@migration(3, 'keyset and inventory indexes')
+def _indexes():
+    # create_all() only builds indexes for brand-new tables.
+    db.session.execute(text(
+        'CREATE INDEX IF NOT EXISTS ix_product_inventory_accounts_claim '
+        'ON product_inventory_accounts (product_id, filename, id)'
+    ))
+    # Keyset pagination walks (created_at, id): backfill the rare NULL
+    # timestamp so no row becomes unreachable, and index existing tables.
+    keyset_indexes = {
+        'orders': {'ix_orders_user_created': 'user_id, created_at, id', 'ix_orders_created': 'created_at, id'},
+        'transactions': {
+            'ix_transactions_user_created': 'user_id, created_at, id',
+            'ix_transactions_created': 'created_at, id',
+        },
+        'topups': {'ix_topups_user_created': 'user_id, created_at, id', 'ix_topups_processed': 'processed_at, id'},
+        'post_purchases': {'ix_post_purchases_created': 'created_at, id'},
+        'users': {},
+        'products': {},
+        'posts': {},
+    }
+    for table_name, indexes in keyset_indexes.items():
+        db.session.execute(text(f'UPDATE {table_name} SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL'))
+        for index_name, columns in indexes.items():
+            db.session.execute(text(f'CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({columns})'))
+
+
+@migration(4, 'rescue legacy inventory')
+def _rescue_inventory():
+    # Move legacy inventory -- text blobs in products.inventory_data, files and
+    # folders under UPLOAD_FOLDER -- into per-account rows before Heroku's
+    # ephemeral storage wipes it. Products are read and written through Core
+    # and text: the mapped Product has columns (updated_at) that only later
+    # migrations add.
+    from godweb.inventory import file_account_name, replace_inventory_accounts
+    from godweb.models import Product, ProductInventoryAccount
+    from godweb.utils import (
+        list_inventory_folder_files,
+        normalize_inventory_parse_mode,
+        parse_inventory_accounts_text,
+        read_inventory_folder_account,
+    )
+
+    def folder_accounts(folder_path):
+        for fname in list_inventory_folder_files(folder_path):
+            try:
+                yield fname, read_inventory_folder_account(folder_path, fname)
+            except OSError:
+                continue
+
+    products = Product.__table__
+    upload_folder = current_app.config.get('UPLOAD_FOLDER')
+    if upload_folder and not os.path.isdir(upload_folder):
+        upload_folder = None
+    rows = db.session.execute(select(
+        products.c.id, products.c.inventory_type, products.c.inventory_folder_path,
+        products.c.inventory_file, products.c.inventory_data, products.c.parse_mode,
+    )).all()
+    for product in rows:
+        if (product.inventory_type or 'file') == 'folder':
+            if not upload_folder or not product.inventory_folder_path:
+                continue
+            existing = db.session.execute(
+                select(func.count()).where(ProductInventoryAccount.product_id == product.id)
+            ).scalar()
+            folder_path = os.path.join(upload_folder, product.inventory_folder_path)
+            if existing == 0 and os.path.isdir(folder_path):
+                count = replace_inventory_accounts(product, folder_accounts(folder_path))
+                db.session.execute(
+                    text('UPDATE products SET stock = :stock WHERE id = :id'), {'stock': count, 'id': product.id},
+                )
+            continue
+
+        data = product.inventory_data
+        if not data and upload_folder and product.inventory_file:
+            filepath = os.path.join(upload_folder, product.inventory_file)
+            if os.path.isfile(filepath):
+                try:
+                    with open(filepath, 'r', encoding='utf-8', errors='replace') as fh:
+                        data = fh.read()
+                except OSError:
+                    pass
+        if data is None:
+            continue
+        # Split legacy text blobs into per-account rows (godweb.inventory).
+        mode = normalize_inventory_parse_mode(product.parse_mode)
+        accounts = parse_inventory_accounts_text(data, mode)
+        count = replace_inventory_accounts(
+            product,
+            ((file_account_name(index), account) for index, account in enumerate(accounts, start=1)),
+        )
+        db.session.execute(
+            text(
+                "UPDATE products SET inventory_type = 'file', parse_mode = :mode, inventory_data = NULL, "
+                'stock = :stock WHERE id = :id'
+            ),
+            {'mode': mode, 'stock': count, 'id': product.id},
+        )
+
+
+@migration(5, 'fold legacy notification reads')
+def _notification_reads():
+    from godweb.notifications import migrate_notification_reads
+    migrate_notification_reads()
+
+
+@migration(6, 'dashboard stats row')
+def _site_stats():
+    from godweb.stats import ensure_stats
+    ensure_stats()
+
+
+@migration(7, 'product updated_at')
+def _product_updated_at():
+    # Validator for conditional GETs on store pages (see godweb.conditional).
+    _add_column('products', 'updated_at', 'TIMESTAMP')
+    db.session.execute(text('UPDATE products SET updated_at = created_at WHERE updated_at IS NULL'))
+
+
+@migration(8, 'post pin columns')
+def _post_pin_columns():
+    # Formerly the ad-hoc migrate_pin.py script.
+    _add_column('posts', 'pin_priority', 'INTEGER DEFAULT 0')
+    _add_column('posts', 'pinned_by', 'VARCHAR(20)')
+    db.session.execute(text('UPDATE posts SET pin_priority = 0 WHERE pin_priority IS NULL'))
+
+
+@migration(9, 'search index')
+def _search_index():
+    # FTS5 / tsvector tables and their initial backfill; workers only check
+    # that they exist (godweb.search.init_search).
+    from godweb.search import create_search_index
+    create_search_index(current_app)
+
+
+@migration(10, 'topup bank reference')
+def _topup_bank_reference():
+    # A statement line approves at most one topup, even across re-uploads.
+    _add_column('topups', 'bank_reference', 'VARCHAR(100)')
+    db.session.execute(text(
+        'CREATE UNIQUE INDEX IF NOT EXISTS uq_topups_bank_reference ON topups (bank_reference)'
+    ))
+
+
+if __name__ == '__main__':
+    # The module-level app in godweb.app must not refuse to boot (or migrate
+    # implicitly) before we get to run the migrations explicitly.
+    os.environ['SCHEMA_ON_BOOT'] = 'off'
+    from godweb.app import app
+
+    with app.app_context():
+        before = current_version()
+        applied = migrate()
+        if applied:
+            print(f'Schema migrated from version {before} to {applied[-1]}: applied {applied}')
+        else:
+            print(f'Schema is up to date (version {before})')
@@ -3,6 +3,13 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from godweb.extensions import db, login_manager
 
+# Deferred-column policy: TEXT columns that can grow large (post bodies,
+# inventory payloads, delivered account credentials) are never loaded by list
+# queries. Views that actually render or consume them must opt in with
+# ``.options(db.undefer(Model.column))``; anything else pays one extra SELECT.
+# List pages use the short ``Post.excerpt`` instead of ``Post.content``.
+POST_EXCERPT_LENGTH = 100
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
@@ -29,6 +36,10 @@ class User(UserMixin, db.Model):
     post_purchases = db.relationship('PostPurchase', backref='user', lazy=True, cascade='all, delete-orphan')
     sent_notifications = db.relationship('Notification', backref='creator', lazy=True, cascade='all, delete-orphan')
     notification_reads = db.relationship('NotificationRead', backref='user', lazy=True, cascade='all, delete-orphan')
+    balance_snapshots = db.relationship('BalanceSnapshot', backref='user', lazy=True, cascade='all, delete-orphan')
+    notification_read_state = db.relationship(
+        'NotificationReadState', backref='user', uselist=False, lazy=True, cascade='all, delete-orphan'
+    )
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -54,7 +65,7 @@ class Post(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
-    content = db.Column(db.Text, nullable=False)
+    content = db.deferred(db.Column(db.Text, nullable=False))
     thumbnail = db.Column(db.String(255))
     is_premium = db.Column(db.Boolean, default=False)
     premium_price = db.Column(db.Integer, default=0)  # GodCoin price
@@ -67,6 +78,9 @@ class Post(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Card preview computed in SQL so list pages never fetch the full body.
+    excerpt = db.column_property(db.func.substr(content, 1, POST_EXCERPT_LENGTH))
+
     comments = db.relationship('Comment', backref='post', lazy=True, cascade='all, delete-orphan')
     purchases = db.relationship('PostPurchase', backref='post', lazy=True, cascade='all, delete-orphan')
 
@@ -88,6 +102,11 @@ class PostPurchase(db.Model):
     price = db.Column(db.Integer, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Rollup high-water mark scans (see godweb.rollups).
+    __table_args__ = (
+        db.Index('ix_post_purchases_created', 'created_at', 'id'),
+    )
+
 class Product(db.Model):
     __tablename__ = 'products'
 
@@ -102,8 +121,9 @@ class Product(db.Model):
     parse_mode = db.Column(db.String(20), default='line', nullable=False)  # line or separator
     inventory_type = db.Column(db.String(20), default='file', nullable=False)  # file or folder
     inventory_folder_path = db.Column(db.String(255))  # Legacy folder name (filesystem mode), kept for migration
-    inventory_data = db.Column(db.Text)  # Inventory text persisted in DB (file mode) so it survives dyno restarts
+    inventory_data = db.deferred(db.Column(db.Text))  # Legacy file-mode blob; migrated into ProductInventoryAccount rows
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     orders = db.relationship('Order', backref='product', lazy=True)
     inventory_accounts = db.relationship(
@@ -116,29 +136,41 @@ class Product(db.Model):
 
 
 class ProductInventoryAccount(db.Model):
-    """One row per .txt account for products in 'folder' inventory mode.
+    """One row per sellable account, for both 'file' and 'folder' inventory modes.
 
     Storing each account as a DB row (instead of a file under uploads/) makes the
-    inventory survive Heroku dyno restarts where the ephemeral filesystem is wiped.
+    inventory survive Heroku dyno restarts where the ephemeral filesystem is wiped,
+    and lets a sale delete a single row instead of rewriting a whole text blob.
     """
     __tablename__ = 'product_inventory_accounts'
 
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), nullable=False, index=True)
     filename = db.Column(db.String(255), nullable=False)
-    content = db.Column(db.Text, nullable=False)
+    content = db.deferred(db.Column(db.Text, nullable=False))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Serves the "next account to sell" lookup in both inventory modes.
+        db.Index('ix_product_inventory_accounts_claim', 'product_id', 'filename', 'id'),
+    )
+
 class Order(db.Model):
     __tablename__ = 'orders'
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
-    account_info = db.Column(db.Text, nullable=False)  # The account info given to user
+    account_info = db.deferred(db.Column(db.Text, nullable=False))  # The account info given to user
     price = db.Column(db.Integer, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Keyset pagination indexes (see godweb.pagination): per user and global.
+    __table_args__ = (
+        db.Index('ix_orders_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_orders_created', 'created_at', 'id'),
+    )
+
 
 class Transaction(db.Model):
     __tablename__ = 'transactions'
@@ -148,8 +180,15 @@ class Transaction(db.Model):
     type = db.Column(db.String(50), nullable=False)  # topup, purchase, admin_add, admin_subtract
     amount = db.Column(db.Integer, nullable=False)  # positive or negative
     description = db.Column(db.String(255))
+    # Wallet balance right after this entry; NULL for entries written before the ledger.
+    balance_after = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_transactions_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_transactions_created', 'created_at', 'id'),
+    )
+
 class Topup(db.Model):
     __tablename__ = 'topups'
 
@@ -161,6 +200,13 @@ class Topup(db.Model):
     status = db.Column(db.String(20), default='pending')  # pending, approved, rejected
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     processed_at = db.Column(db.DateTime)
+    bank_reference = db.Column(db.String(100))  # statement line that approved it (godweb.topups)
+
+    __table_args__ = (
+        db.Index('ix_topups_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_topups_processed', 'processed_at', 'id'),
+        db.Index('uq_topups_bank_reference', 'bank_reference', unique=True),
+    )
 
 
 class Notification(db.Model):
@@ -175,6 +221,10 @@ class Notification(db.Model):
 
 
 class NotificationRead(db.Model):
+    """Legacy one-row-per-(user, notification) read marker.
+
+    Superseded by NotificationReadState; rows are migrated and removed at boot.
+    """
     __tablename__ = 'notification_reads'
 
     id = db.Column(db.Integer, primary_key=True)
@@ -185,3 +235,141 @@ class NotificationRead(db.Model):
     __table_args__ = (
         db.UniqueConstraint('user_id', 'notification_id', name='uq_notification_read_user_notification'),
     )
+
+
+class NotificationReadState(db.Model):
+    """Per-user notification read state: a watermark plus out-of-order reads.
+
+    Every notification with ``id <= last_read_id`` is read. ``read_ids`` holds the
+    comma-separated ids above the watermark that were read out of order; it is
+    compacted into the watermark as soon as the gap below them closes, so it
+    stays small and the table has exactly one row per user.
+    """
+    __tablename__ = 'notification_read_states'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    last_read_id = db.Column(db.Integer, nullable=False, default=0)
+    read_ids = db.Column(db.Text, nullable=False, default='')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ServerEvent(db.Model):
+    """Outbox row for the live event stream (see ``godweb.events``).
+
+    Written in the same transaction as the change it announces, so clients only
+    hear about committed state. Rows are pruned after ``SSE_EVENT_RETENTION``.
+    """
+    __tablename__ = 'server_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    channel = db.Column(db.String(50), nullable=False, default='global')  # global, user:<id>
+    event = db.Column(db.String(50), nullable=False)
+    data = db.Column(db.Text, nullable=False, default='{}')  # JSON payload
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+class SiteStats(db.Model):
+    """Single-row admin dashboard counters (see ``godweb.stats``).
+
+    Updated in the same transaction as the rows they count and periodically
+    recounted from scratch to correct any drift.
+    """
+    __tablename__ = 'site_stats'
+
+    id = db.Column(db.Integer, primary_key=True)
+    users = db.Column(db.Integer, nullable=False, default=0)
+    posts = db.Column(db.Integer, nullable=False, default=0)
+    products = db.Column(db.Integer, nullable=False, default=0)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    pending_topups = db.Column(db.Integer, nullable=False, default=0)
+    total_godcoin = db.Column(db.BigInteger, nullable=False, default=0)
+    reconciled_at = db.Column(db.DateTime)
+
+
+class DailyStats(db.Model):
+    """Per-day sales/topup totals maintained by ``godweb.rollups`` (UTC days)."""
+    __tablename__ = 'daily_stats'
+
+    day = db.Column(db.Date, primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)  # store units sold
+    sales_godcoin = db.Column(db.BigInteger, nullable=False, default=0)
+    post_sales = db.Column(db.Integer, nullable=False, default=0)
+    post_revenue = db.Column(db.BigInteger, nullable=False, default=0)
+    topups = db.Column(db.Integer, nullable=False, default=0)  # approved topups
+    topup_vnd = db.Column(db.BigInteger, nullable=False, default=0)
+    topup_godcoin = db.Column(db.BigInteger, nullable=False, default=0)
+    admin_added = db.Column(db.BigInteger, nullable=False, default=0)
+    admin_removed = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class DailyProductStats(db.Model):
+    """Per-day, per-product store sales. No FK: history outlives deleted products."""
+    __tablename__ = 'daily_product_stats'
+
+    day = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(db.Integer, primary_key=True)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class DailyPostStats(db.Model):
+    """Per-day, per-post premium sales. No FK: history outlives deleted posts."""
+    __tablename__ = 'daily_post_stats'
+
+    day = db.Column(db.Date, primary_key=True)
+    post_id = db.Column(db.Integer, primary_key=True)
+    sales = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class RollupState(db.Model):
+    """High-water mark ``(last_ts, last_id)`` of each rollup source."""
+    __tablename__ = 'rollup_state'
+
+    source = db.Column(db.String(50), primary_key=True)
+    last_ts = db.Column(db.DateTime, nullable=False)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class BalanceSnapshot(db.Model):
+    """A user's balance as of ledger entry ``transaction_id`` (see ``godweb.ledger``)."""
+    __tablename__ = 'balance_snapshots'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    balance = db.Column(db.Integer, nullable=False)
+    transaction_id = db.Column(db.Integer)  # last Transaction.id covered; NULL if none yet
+    taken_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_balance_snapshots_user_taken', 'user_id', 'taken_at', 'id'),
+    )
+
+
+class GrantBatch(db.Model):
+    """One applied bulk GodCoin grant upload (see ``godweb.grants``).
+
+    ``digest`` is the SHA-256 of the uploaded file; the unique constraint is
+    what makes re-uploading the same file a no-op. No FK on ``admin_id``:
+    history outlives deleted admins.
+    """
+    __tablename__ = 'grant_batches'
+
+    id = db.Column(db.Integer, primary_key=True)
+    digest = db.Column(db.String(64), unique=True, nullable=False)
+    filename = db.Column(db.String(255))
+    admin_id = db.Column(db.Integer)
+    rows = db.Column(db.Integer, nullable=False, default=0)
+    users = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.BigInteger, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class SchemaVersion(db.Model):
+    """One row per applied migration (see ``godweb.migrations``)."""
+    __tablename__ = 'schema_version'
+
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(100), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
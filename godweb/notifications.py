@@ -0,0 +1,226 @@
+"""Notification read-state helpers built on ``NotificationReadState``.
+
+A user's read state is one row: a watermark id plus a compact set of ids read
+out of order above it. Checking or updating it never touches more than the
+navbar's worth of notifications, independent of how many users or
+notifications exist. The navbar payload is additionally cached (see
+``navbar_payload``) so a steady-state page render issues no queries for it.
+"""
+import uuid
+from bisect import bisect_right
+from collections import defaultdict
+from itertools import islice
+
+from sqlalchemy import insert
+
+from godweb.cache import get_cache
+from godweb.extensions import db
+from godweb.models import Notification, NotificationRead, NotificationReadState
+
+# Notifications shown in the navbar dropdown; the unread badge counts these.
+NAVBAR_NOTIFICATION_LIMIT = 12
+
+# Navbar cache: the global list is stored under a version token that admins
+# bump on create/delete; each user's read state is cached until they read.
+# Both only invalidate the cache of the dyno that handled the change, so
+# entries live seconds: that bounds how stale another dyno's navbar can be.
+LIST_VERSION_KEY = 'notifications:version'
+LIST_CACHE_TIMEOUT = 30
+STATE_CACHE_TIMEOUT = 30
+
+
+def decode_read_ids(raw):
+    return {int(item) for item in (raw or '').split(',') if item}
+
+
+def encode_read_ids(ids):
+    return ','.join(str(item) for item in sorted(ids))
+
+
+class ReadState:
+    """In-memory view of a user's watermark and out-of-order reads."""
+
+    def __init__(self, last_read_id=0, read_ids=None):
+        self.last_read_id = last_read_id or 0
+        self.read_ids = set(read_ids or ())
+
+    @classmethod
+    def from_row(cls, row):
+        if row is None:
+            return cls()
+        return cls(row.last_read_id, decode_read_ids(row.read_ids))
+
+    def is_read(self, notification_id):
+        return notification_id <= self.last_read_id or notification_id in self.read_ids
+
+    def compact(self, next_ids):
+        """Advance the watermark over ``next_ids`` (ascending ids above it) while read."""
+        for notification_id in next_ids:
+            if notification_id not in self.read_ids:
+                break
+            self.last_read_id = notification_id
+        self.read_ids = {item for item in self.read_ids if item > self.last_read_id}
+
+    def skip_to(self, floor):
+        """Count every id up to ``floor`` as read."""
+        if floor > self.last_read_id:
+            self.last_read_id = floor
+            self.read_ids = {item for item in self.read_ids if item > floor}
+
+
+def load_read_state(user_id):
+    return ReadState.from_row(db.session.get(NotificationReadState, user_id))
+
+
+def latest_notifications(limit=NAVBAR_NOTIFICATION_LIMIT):
+    return Notification.query.order_by(Notification.created_at.desc(), Notification.id.desc()).limit(limit).all()
+
+
+def _list_key(version):
+    return f'notifications:latest:{version}'
+
+
+def _state_key(user_id):
+    return f'notifications:state:{user_id}'
+
+
+def cached_latest_notifications():
+    """Navbar notifications as plain dicts, served from cache when current."""
+    cache = get_cache()
+    version = cache.get(LIST_VERSION_KEY) or '0'
+    return cache.get_or_set(
+        _list_key(version),
+        lambda: [
+            {'id': item.id, 'content': item.content, 'created_at': item.created_at}
+            for item in latest_notifications()
+        ],
+        LIST_CACHE_TIMEOUT,
+    )
+
+
+def invalidate_notification_list():
+    """Call after committing a notification create/delete."""
+    get_cache().set(LIST_VERSION_KEY, uuid.uuid4().hex, timeout=0)
+
+
+def cached_read_state(user_id):
+    cache = get_cache()
+    cached = cache.get(_state_key(user_id))
+    if cached is not None:
+        return ReadState(*cached)
+    state = load_read_state(user_id)
+    store_cached_read_state(user_id, state)
+    return state
+
+
+def forget_cached_read_state(user_id):
+    get_cache().delete(_state_key(user_id))
+
+
+def store_cached_read_state(user_id, state):
+    """Refresh the cached state after committing a change to it."""
+    get_cache().set(_state_key(user_id), (state.last_read_id, frozenset(state.read_ids)), STATE_CACHE_TIMEOUT)
+
+
+def navbar_payload(user_id, state=None):
+    """Navbar items with read flags and the unread badge count.
+
+    Pass ``state`` to evaluate a read state that is not cached/committed yet.
+    """
+    notifications = cached_latest_notifications()
+    if not notifications:
+        return [], 0
+    if state is None:
+        state = cached_read_state(user_id)
+    items = [dict(item, is_read=state.is_read(item['id'])) for item in notifications]
+    return items, sum(1 for item in items if not item['is_read'])
+
+
+def visible_floor():
+    """Highest id below every notification the navbar still shows (0 if it shows all).
+
+    Older notifications can no longer be opened, so they can never be read.
+    """
+    ids = [item['id'] for item in cached_latest_notifications()]
+    if len(ids) < NAVBAR_NOTIFICATION_LIMIT:
+        return 0
+    return min(ids) - 1
+
+
+def mark_read(user_id, notification_id):
+    """Record that ``user_id`` read ``notification_id``. Caller commits.
+
+    The watermark also moves up to ``visible_floor()``, so notifications that
+    scrolled out of the navbar unread do not hold it back forever.
+    """
+    row = db.session.get(NotificationReadState, user_id)
+    if row is None:
+        row = NotificationReadState(user_id=user_id, last_read_id=0, read_ids='')
+        db.session.add(row)
+    state = ReadState.from_row(row)
+    floor = visible_floor()
+    if state.is_read(notification_id) and floor <= state.last_read_id:
+        return state
+
+    state.skip_to(floor)
+    if not state.is_read(notification_id):
+        state.read_ids.add(notification_id)
+    # Only the ids just above the watermark can close the gap, so fetch at most
+    # one more than the number of out-of-order reads.
+    next_ids = [
+        item.id for item in
+        db.session.query(Notification.id)
+        .filter(Notification.id > state.last_read_id)
+        .order_by(Notification.id)
+        .limit(len(state.read_ids) + 1)
+    ]
+    state.compact(next_ids)
+    row.last_read_id = state.last_read_id
+    row.read_ids = encode_read_ids(state.read_ids)
+    return state
+
+
+def migrate_notification_reads(batch_size=1000):
+    """Fold legacy ``notification_reads`` rows into per-user read states.
+
+    Idempotent: migrated rows are deleted, and users that already have a state
+    row only get their legacy reads merged in. Returns the number of users migrated.
+    """
+    if db.session.query(NotificationRead.id).first() is None:
+        return 0
+
+    notification_ids = [row.id for row in db.session.query(Notification.id).order_by(Notification.id)]
+    reads_by_user = defaultdict(set)
+    for user_id, notification_id in db.session.query(NotificationRead.user_id, NotificationRead.notification_id):
+        reads_by_user[user_id].add(notification_id)
+
+    user_ids = list(reads_by_user)
+    existing = {}
+    for start in range(0, len(user_ids), batch_size):
+        chunk = user_ids[start:start + batch_size]
+        for row in NotificationReadState.query.filter(NotificationReadState.user_id.in_(chunk)):
+            existing[row.user_id] = row
+    new_rows = []
+    for user_id, read_ids in reads_by_user.items():
+        row = existing.get(user_id)
+        state = ReadState.from_row(row)
+        state.read_ids |= {item for item in read_ids if item > state.last_read_id}
+        start = bisect_right(notification_ids, state.last_read_id)
+        state.compact(islice(notification_ids, start, None))
+        if row is None:
+            new_rows.append({
+                'user_id': user_id,
+                'last_read_id': state.last_read_id,
+                'read_ids': encode_read_ids(state.read_ids),
+            })
+        else:
+            row.last_read_id = state.last_read_id
+            row.read_ids = encode_read_ids(state.read_ids)
+        if len(new_rows) >= batch_size:
+            db.session.execute(insert(NotificationReadState), new_rows)
+            new_rows = []
+    if new_rows:
+        db.session.execute(insert(NotificationReadState), new_rows)
+
+    NotificationRead.query.delete(synchronize_session=False)
+    return len(reads_by_user)
@@ -0,0 +1,157 @@
+"""Full-page microcache for the public pages, anonymous visitors only.
+
+Logged-out visitors see the same home, store and blog pages for seconds at a
+time, so ``@cached_page`` keeps the rendered response in the app cache for
+``PAGE_CACHE_TTL`` seconds (5 in production, 0 -- off -- otherwise), keyed by
+the path and the query parameters the views read (``QUERY_PARAMS``); any
+other parameter (tracking tags, cache busters) shares the same entry instead
+of minting a new one. A request is served from (and stored into) the cache only
+when it is a GET/HEAD from an anonymous session with no pending flash
+messages; responses that are not 200, are streamed, or touched the session
+(a CSRF token, a flash) are never stored.
+
+Stampedes: concurrent misses for the same URL within a worker are collapsed
+(single-flight) -- one thread renders, the others wait for it and reuse its
+entry. With the filesystem backend a page is thus rendered at most once per
+worker per TTL.
+
+Purging: every cached page belongs to one or more groups (``'blog'``,
+``'store'``) and its key carries each group's generation token.
+``purge_pages('store')`` swaps the token, so every store page (and the home
+page, which is in both groups) is re-rendered on its next hit. Call it after
+committing anything anonymous visitors can see: post, category, comment and
+pin changes (``'blog'``), product edits and stock changes (``'store'``).
+"""
+import threading
+import uuid
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+
+from godweb.cache import get_cache
+
+GROUPS = ('blog', 'store')
+# The only query parameters the cached views look at.
+QUERY_PARAMS = ('category', 'cursor', 'search', 'type')
+# Response headers that belong to one visitor, never to the shared copy.
+_PRIVATE_HEADERS = {'set-cookie', 'content-length'}
+
+
+def _generation_key(group):
+    return f'page:generation:{group}'
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key onto one leader thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def run(self, key, func, wait=5.0):
+        """Run ``func`` as the leader for ``key``; returns ``(leader, result)``.
+
+        A follower waits up to ``wait`` seconds for the leader to finish and
+        gets ``(False, None)``; it should then re-check the cache.
+        """
+        with self._lock:
+            done = self._calls.get(key)
+            leader = done is None
+            if leader:
+                done = self._calls[key] = threading.Event()
+        if not leader:
+            done.wait(wait)
+            return False, None
+        try:
+            return True, func()
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            done.set()
+
+
+class PageCache:
+    def __init__(self, ttl=5, wait=5.0):
+        self.ttl = ttl
+        self.wait = wait
+        self.flights = SingleFlight()
+
+    def key(self, groups):
+        cache = get_cache()
+        generations = ':'.join(cache.get(_generation_key(group)) or '0' for group in groups)
+        query = urlencode([(name, request.args[name]) for name in QUERY_PARAMS if name in request.args])
+        return f'page:{generations}:{request.path}?{query}'
+
+    def lookup(self, key):
+        entry = get_cache().get(key)
+        if entry is None:
+            return None
+        status, headers, body = entry
+        response = make_response(body, status, headers)
+        response.headers['X-Page-Cache'] = 'HIT'
+        # The stored copy keeps the view's ETag/Last-Modified (godweb.conditional).
+        return response.make_conditional(request)
+
+    def render(self, key, view, args, kwargs):
+        response = make_response(view(*args, **kwargs))
+        if response.status_code == 200 and not response.is_streamed and not session.modified:
+            headers = [(name, value) for name, value in response.headers.items()
+                       if name.lower() not in _PRIVATE_HEADERS]
+            get_cache().set(key, (response.status_code, headers, response.get_data()), timeout=self.ttl)
+            response.headers['X-Page-Cache'] = 'MISS'
+        return response
+
+
+def _cacheable_request():
+    return (
+        request.method in ('GET', 'HEAD')
+        and not current_user.is_authenticated
+        and not session.get('_flashes')
+    )
+
+
+def cached_page(*groups, on_hit=None):
+    """Serve the view from the page cache for anonymous visitors.
+
+    ``on_hit(**view_kwargs)`` runs when a cached copy is served, for side
+    effects the view would otherwise have had (e.g. counting a view).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            pages = current_app.extensions['page_cache']
+            if not pages.ttl or not _cacheable_request():
+                return view(*args, **kwargs)
+            key = pages.key(groups)
+            response = pages.lookup(key)
+            if response is None:
+                leader, response = pages.flights.run(key, lambda: pages.render(key, view, args, kwargs), pages.wait)
+                if leader:
+                    return response
+                response = pages.lookup(key)
+                if response is None:
+                    # The leader's page was not cacheable (or it timed out).
+                    return view(*args, **kwargs)
+            if on_hit is not None:
+                on_hit(**kwargs)
+            return response
+        return wrapper
+    return decorator
+
+
+def purge_pages(*groups):
+    """Drop every cached page in ``groups`` (all groups when none given)."""
+    cache = get_cache()
+    for group in groups or GROUPS:
+        cache.set(_generation_key(group), uuid.uuid4().hex, timeout=0)
+
+
+def init_page_cache(app):
+    pages = PageCache(
+        ttl=app.config.get('PAGE_CACHE_TTL', 5),
+        wait=app.config.get('PAGE_CACHE_WAIT', 5.0),
+    )
+    app.extensions['page_cache'] = pages
+    return pages
@@ -0,0 +1,166 @@
+"""Keyset ("cursor") pagination for listing pages.
+
+``.paginate()`` runs ``OFFSET n LIMIT k`` plus a ``COUNT(*)`` on every page
+view, so deep pages of ``transactions``/``orders`` get slower as the tables
+grow. A keyset page instead resumes from the sort key of the last row it
+showed (``WHERE (created_at, id) < (:c, :i)``), which is one index range scan
+no matter how far the user has paged.
+
+Cursors are opaque URL-safe tokens; a tampered or stale one (including one
+whose values do not match the key columns' types) just falls back to the
+first page. Pages only know whether a next/previous page exists, not the
+total page count.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from sqlalchemy import bindparam, tuple_
+
+DEFAULT_PER_PAGE = 20
+
+
+class KeysetPage:
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+
+def _python_type(key):
+    try:
+        return key.type.python_type
+    except NotImplementedError:
+        return None
+
+
+def _matches(value, expected):
+    """Whether a decoded cursor value is a scalar fit for a column of type ``expected``."""
+    if isinstance(value, bool) or not isinstance(value, (str, int, float, datetime)):
+        return False
+    if expected is None:
+        return True
+    if expected is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, expected)
+
+
+def encode_cursor(direction, values):
+    payload = json.dumps([direction, [_encode_value(value) for value in values]], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, types):
+    """Return ``(direction, values)`` for a cursor token, or None if it is invalid.
+
+    ``types`` holds the python type of each key column (None: any scalar).
+    """
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, values = json.loads(raw)
+        values = [_decode_value(value) for value in values]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        return None
+    if direction not in ('next', 'prev') or len(values) != len(types):
+        return None
+    if not all(_matches(value, expected) for value, expected in zip(values, types)):
+        return None
+    return direction, values
+
+
+def keyset_paginate(query, keys, cursor=None, per_page=DEFAULT_PER_PAGE):
+    """Return one ``KeysetPage`` of ``query`` ordered newest-first by ``keys``.
+
+    ``keys`` are column expressions sorted descending, ending with a unique
+    column (normally ``(Model.created_at, Model.id)``) so every row has a
+    distinct position. They must not be NULL; wrap nullable ones in
+    ``coalesce``. ``query`` must not carry its own ORDER BY.
+    """
+    decoded = decode_cursor(cursor, [_python_type(key) for key in keys])
+    direction, values = decoded if decoded else ('next', None)
+
+    query = query.add_columns(*[key.label(f'_keyset_{index}') for index, key in enumerate(keys)])
+    if values is not None:
+        row_key = tuple_(*keys)
+        position = tuple_(*[bindparam(None, value, type_=key.type) for key, value in zip(keys, values)])
+        query = query.filter(row_key < position if direction == 'next' else row_key > position)
+    if direction == 'next':
+        query = query.order_by(*[key.desc() for key in keys])
+    else:
+        # Walk backwards from the cursor, then flip the rows into display order.
+        query = query.order_by(*[key.asc() for key in keys])
+
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == 'prev':
+        rows.reverse()
+
+    items = [row[0] for row in rows]
+    if not rows:
+        # Stepped past either end (e.g. rows deleted meanwhile); offer a way back.
+        if values is None:
+            return KeysetPage(items, per_page)
+        if direction == 'next':
+            return KeysetPage(items, per_page, prev_cursor=encode_cursor('prev', values))
+        return KeysetPage(items, per_page, next_cursor=encode_cursor('next', values))
+
+    first_key = list(rows[0][1:])
+    last_key = list(rows[-1][1:])
+    if direction == 'next':
+        next_cursor = encode_cursor('next', last_key) if has_more else None
+        prev_cursor = encode_cursor('prev', first_key) if values is not None else None
+    else:
+        next_cursor = encode_cursor('next', last_key)
+        prev_cursor = encode_cursor('prev', first_key) if has_more else None
+    return KeysetPage(items, per_page, next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+
+def ranked_paginate(query, id_column, ranked_ids, cursor=None, per_page=DEFAULT_PER_PAGE):
+    """Page through ``query`` restricted to ``ranked_ids``, keeping their order.
+
+    For search results, whose order is a relevance rank rather than a column.
+    ``ranked_ids`` is already bounded (see ``godweb.search``), so the matching
+    rows are loaded once and sliced; the cursor carries the slice offset.
+    """
+    decoded = decode_cursor(cursor, [int])
+    offset = max(decoded[1][0], 0) if decoded else 0
+
+    rank = {item_id: position for position, item_id in enumerate(ranked_ids)}
+    rows = query.filter(id_column.in_(ranked_ids)).all() if ranked_ids else []
+    rows.sort(key=lambda row: rank[getattr(row, id_column.key)])
+
+    items = rows[offset:offset + per_page]
+    next_cursor = encode_cursor('next', [offset + per_page]) if offset + per_page < len(rows) else None
+    prev_cursor = encode_cursor('next', [max(offset - per_page, 0)]) if offset > 0 else None
+    return KeysetPage(items, per_page, next_cursor=next_cursor, prev_cursor=prev_cursor)
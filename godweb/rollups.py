@@ -0,0 +1,291 @@
+"""Daily sales and topup rollups for the admin analytics page.
+
+Aggregates are kept in ``daily_stats`` (one row per UTC day),
+``daily_product_stats`` and ``daily_post_stats`` so the analytics page never
+scans ``orders``, ``post_purchases``, ``topups`` or ``transactions``.
+
+Each source table is consumed in ``(timestamp, id)`` order from a high-water
+mark stored in ``rollup_state``. A batch is one ``GROUP BY day[, key]`` query
+over the next ``ROLLUP_BATCH_SIZE`` rows, upserted with
+``ON CONFLICT DO UPDATE SET x = x + excluded.x`` -- the work per batch is a
+handful of set-based statements however many rows it covers, which is what
+lets the backfill of millions of rows finish quickly.
+
+The batch moves the mark with a conditional UPDATE *before* writing the
+aggregates, in the same transaction: a concurrent run blocks on that row,
+then sees the mark moved and backs off, so no batch is counted twice. Rows
+newer than ``ROLLUP_SETTLE_SECONDS`` are left for the next run so a
+transaction that took its id/timestamp but has not committed yet is not
+skipped past.
+
+The admin analytics page refreshes a few batches per load; run
+``python -m godweb.rollups`` for the initial backfill or from a scheduler,
+``python -m godweb.rollups --rebuild`` to recompute everything.
+"""
+import logging
+import sys
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import bindparam, case, delete, func, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+
+from godweb.extensions import db
+from godweb.models import (
+    DailyPostStats, DailyProductStats, DailyStats, Order, Post, PostPurchase, Product, RollupState, Topup,
+    Transaction,
+)
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_BATCH_SIZE = 10_000
+EPOCH = datetime(1970, 1, 1)
+
+
+class Source:
+    """A table consumed in ``(ts, id)`` order into one or more rollup tables.
+
+    Each batch runs one query grouped by day plus ``keys`` computing
+    ``aggregates`` (all additive). ``targets`` lists ``(model, key names,
+    {column: aggregate name})``; coarser targets are summed from the same rows.
+    """
+
+    def __init__(self, name, model, ts, criteria, keys, aggregates, targets):
+        self.name = name
+        self.model = model
+        self.ts = ts
+        self.criteria = criteria
+        self.keys = keys
+        self.aggregates = aggregates
+        self.targets = targets
+
+
+def _sources():
+    amount = Transaction.amount
+    return [
+        Source(
+            'orders', Order, Order.created_at, [], [Order.product_id],
+            {'count': func.count(), 'revenue': func.sum(Order.price)},
+            [
+                (DailyStats, [], {'orders': 'count', 'sales_godcoin': 'revenue'}),
+                (DailyProductStats, ['product_id'], {'units': 'count', 'revenue': 'revenue'}),
+            ],
+        ),
+        Source(
+            'post_purchases', PostPurchase, PostPurchase.created_at, [], [PostPurchase.post_id],
+            {'count': func.count(), 'revenue': func.sum(PostPurchase.price)},
+            [
+                (DailyStats, [], {'post_sales': 'count', 'post_revenue': 'revenue'}),
+                (DailyPostStats, ['post_id'], {'sales': 'count', 'revenue': 'revenue'}),
+            ],
+        ),
+        # An approved topup counts on the day it was approved.
+        Source(
+            'topups', Topup, Topup.processed_at, [Topup.status == 'approved'], [],
+            {'count': func.count(), 'vnd': func.sum(Topup.amount), 'godcoin': func.sum(Topup.godcoin_amount)},
+            [(DailyStats, [], {'topups': 'count', 'topup_vnd': 'vnd', 'topup_godcoin': 'godcoin'})],
+        ),
+        Source(
+            'admin_adjustments', Transaction, Transaction.created_at,
+            [Transaction.type.in_(('admin_add', 'admin_subtract'))], [],
+            {
+                'added': func.sum(case((amount > 0, amount), else_=0)),
+                'removed': func.sum(case((amount < 0, -amount), else_=0)),
+            },
+            [(DailyStats, [], {'admin_added': 'added', 'admin_removed': 'removed'})],
+        ),
+    ]
+
+
+def _as_date(value):
+    # SQLite's date() returns 'YYYY-MM-DD' text.
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _upsert_add(model, key_names, rows):
+    """Insert ``rows``, adding their values onto rows that already have the key."""
+    if not rows:
+        return
+    table = model.__table__
+    value_names = [name for name in rows[0] if name not in key_names]
+    dialect = db.engine.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_names,
+            set_={name: table.c[name] + stmt.excluded[name] for name in value_names},
+        )
+        db.session.execute(stmt, rows)
+        return
+    for row in rows:
+        key = [table.c[name] == row[name] for name in key_names]
+        updated = db.session.execute(
+            update(table).where(*key).values({name: table.c[name] + row[name] for name in value_names})
+        ).rowcount
+        if not updated:
+            db.session.execute(table.insert().values(row))
+
+
+def _ensure_state(sources):
+    known = set(db.session.execute(select(RollupState.source)).scalars())
+    for source in sources:
+        if source.name not in known:
+            try:
+                db.session.add(RollupState(source=source.name, last_ts=EPOCH, last_id=0))
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+
+
+def _position(source, values):
+    return tuple_(*[bindparam(None, value, type_=column.type)
+                    for column, value in zip((source.ts, source.model.id), values)])
+
+
+def _batch_bound(source, after, cutoff, batch_size):
+    """``(ts, id)`` of the last row of the next batch, or None when drained."""
+    key = tuple_(source.ts, source.model.id)
+    pending = select(source.ts, source.model.id).where(
+        *source.criteria, key > _position(source, after), source.ts < cutoff,
+    )
+    row = db.session.execute(
+        pending.order_by(source.ts, source.model.id).offset(batch_size - 1).limit(1)
+    ).first()
+    if row is None:
+        row = db.session.execute(
+            pending.order_by(source.ts.desc(), source.model.id.desc()).limit(1)
+        ).first()
+    return tuple(row) if row is not None else None
+
+
+def _run_batch(source, cutoff, batch_size):
+    """Roll up the next batch of ``source``. Returns False when there was nothing to do."""
+    state = db.session.execute(
+        select(RollupState.last_ts, RollupState.last_id).where(RollupState.source == source.name)
+    ).one()
+    after = (state.last_ts, state.last_id)
+    bound = _batch_bound(source, after, cutoff, batch_size)
+    if bound is None:
+        db.session.rollback()
+        return False
+
+    claimed = db.session.execute(
+        update(RollupState)
+        .where(RollupState.source == source.name, RollupState.last_ts == after[0], RollupState.last_id == after[1])
+        .values(last_ts=bound[0], last_id=bound[1], updated_at=datetime.utcnow()),
+        execution_options={'synchronize_session': False},
+    ).rowcount
+    if claimed != 1:
+        # Another worker rolled this range up first.
+        db.session.rollback()
+        return False
+
+    key = tuple_(source.ts, source.model.id)
+    day = func.date(source.ts)
+    grouped = db.session.execute(
+        select(day.label('day'), *source.keys, *(value.label(name) for name, value in source.aggregates.items()))
+        .where(*source.criteria, key > _position(source, after), key <= _position(source, bound))
+        .group_by(day, *source.keys)
+    ).mappings().all()
+    for model, key_names, columns in source.targets:
+        folded = {}
+        for row in grouped:
+            row_key = (_as_date(row['day']),) + tuple(row[name] for name in key_names)
+            totals = folded.setdefault(row_key, dict.fromkeys(columns, 0))
+            for column, aggregate in columns.items():
+                totals[column] += row[aggregate] or 0
+        _upsert_add(model, ['day'] + key_names, [
+            {'day': row_key[0], **dict(zip(key_names, row_key[1:])), **totals}
+            for row_key, totals in folded.items()
+        ])
+    db.session.commit()
+    return True
+
+
+def refresh_rollups(max_batches=None, batch_size=ROLLUP_BATCH_SIZE):
+    """Fold new source rows into the rollups. Returns ``{source: batches run}``."""
+    settle = current_app.config.get('ROLLUP_SETTLE_SECONDS', 5)
+    cutoff = datetime.utcnow() - timedelta(seconds=settle)
+    sources = _sources()
+    _ensure_state(sources)
+    done = {}
+    for source in sources:
+        done[source.name] = 0
+        while max_batches is None or done[source.name] < max_batches:
+            if not _run_batch(source, cutoff, batch_size):
+                break
+            done[source.name] += 1
+    return done
+
+
+def rebuild_rollups(batch_size=ROLLUP_BATCH_SIZE):
+    """Drop every aggregate and recompute from the source tables."""
+    for model in (DailyStats, DailyProductStats, DailyPostStats, RollupState):
+        db.session.execute(delete(model))
+    db.session.commit()
+    return refresh_rollups(batch_size=batch_size)
+
+
+def rollup_freshness():
+    """Oldest high-water mark across sources: the rollups are complete up to here."""
+    return db.session.execute(select(func.min(RollupState.last_ts))).scalar()
+
+
+# -- reads for the analytics page ---------------------------------------------
+
+SERIES_FIELDS = [column.key for column in DailyStats.__table__.columns if column.key != 'day']
+
+
+def daily_series(days, today=None):
+    """One dict per day for the last ``days`` days (oldest first), gaps zero-filled."""
+    today = today or datetime.utcnow().date()
+    start = today - timedelta(days=days - 1)
+    stored = {row.day: row for row in DailyStats.query.filter(DailyStats.day >= start, DailyStats.day <= today)}
+    series = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        row = stored.get(day)
+        entry = {name: (getattr(row, name) if row else 0) for name in SERIES_FIELDS}
+        entry['day'] = day
+        series.append(entry)
+    return series
+
+
+def top_products(since, limit=10):
+    """Best-selling products since ``since`` by GodCoin revenue."""
+    revenue = func.sum(DailyProductStats.revenue).label('revenue')
+    return db.session.execute(
+        select(DailyProductStats.product_id, Product.name, func.sum(DailyProductStats.units).label('units'), revenue)
+        .outerjoin(Product, Product.id == DailyProductStats.product_id)
+        .where(DailyProductStats.day >= since)
+        .group_by(DailyProductStats.product_id, Product.name)
+        .order_by(revenue.desc(), DailyProductStats.product_id)
+        .limit(limit)
+    ).all()
+
+
+def top_posts(since, limit=10):
+    """Best-selling premium posts since ``since`` by GodCoin revenue."""
+    revenue = func.sum(DailyPostStats.revenue).label('revenue')
+    return db.session.execute(
+        select(DailyPostStats.post_id, Post.title, func.sum(DailyPostStats.sales).label('sales'), revenue)
+        .outerjoin(Post, Post.id == DailyPostStats.post_id)
+        .where(DailyPostStats.day >= since)
+        .group_by(DailyPostStats.post_id, Post.title)
+        .order_by(revenue.desc(), DailyPostStats.post_id)
+        .limit(limit)
+    ).all()
+
+
+if __name__ == '__main__':
+    from godweb.app import app
+
+    with app.app_context():
+        if '--rebuild' in sys.argv[1:]:
+            print(rebuild_rollups())
+        else:
+            print(refresh_rollups())
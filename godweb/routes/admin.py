@@ -1,20 +1,43 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, send_file, after_this_request
+from flask import (
+    Blueprint, render_template, request, redirect, url_for, flash, current_app,
+    after_this_request, Response, stream_with_context,
+)
 from flask_login import login_required, current_user
-from godweb.models import User, Post, Category, Product, ProductInventoryAccount, Transaction, Topup, Order, Notification
+from godweb.models import (
+    User, Post, Category, Product, ProductInventoryAccount, Transaction, Topup, Order, Notification, GrantBatch,
+)
 from godweb.extensions import db
 from functools import wraps
 import os
+from sqlalchemy.exc import IntegrityError
 from werkzeug.utils import secure_filename
 from datetime import datetime
 from godweb.utils import (
     upload_image as upload_image_util,
     normalize_inventory_parse_mode,
-    parse_inventory_accounts_text,
-    parse_zip_to_accounts,
+    iter_zip_accounts,
     cleanup_inventory_folder,
 )
+from godweb.events import publish, publish_stock
+from godweb.pagination import keyset_paginate
+from godweb.search import index_post, index_product, remove_post, remove_product
+from godweb.rollups import daily_series, refresh_rollups, rollup_freshness, top_posts, top_products
+from godweb.grants import apply_grant_file
+from godweb.stats import bump_stats, get_stats
+from godweb.topups import approve_topups, match_statement, reject_topups
+from godweb.wallet import credit, debit
+from godweb.notifications import forget_cached_read_state, invalidate_notification_list
+from godweb.page_cache import purge_pages
+from godweb.inventory import (
+    file_inventory_text,
+    has_inventory_accounts,
+    iter_file_inventory_chunks,
+    iter_inventory_zip_chunks,
+    replace_inventory_accounts,
+    store_file_inventory,
+)
 import tempfile
-import zipfile
+import time
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -31,16 +54,15 @@ def admin_required(f):
 @login_required
 @admin_required
 def dashboard():
-    stats = {
-        'users': User.query.count(),
-        'posts': Post.query.count(),
-        'products': Product.query.count(),
-        'orders': Order.query.count(),
-        'pending_topups': Topup.query.filter_by(status='pending').count(),
-        'total_godcoin': db.session.query(db.func.sum(User.godcoin_balance)).scalar() or 0
-    }
-    recent_topups = Topup.query.filter_by(status='pending').order_by(Topup.created_at.desc()).limit(5).all()
-    recent_orders = Order.query.order_by(Order.created_at.desc()).limit(5).all()
+    stats = get_stats()
+    recent_topups = (
+        Topup.query.options(db.joinedload(Topup.user))
+        .filter_by(status='pending').order_by(Topup.created_at.desc()).limit(5).all()
+    )
+    recent_orders = (
+        Order.query.options(db.joinedload(Order.user), db.joinedload(Order.product))
+        .order_by(Order.created_at.desc()).limit(5).all()
+    )
     return render_template('admin/dashboard.html', stats=stats, recent_topups=recent_topups, recent_orders=recent_orders)
 
 # Users Management
@@ -48,7 +70,6 @@ def dashboard():
 @login_required
 @admin_required
 def users():
-    page = request.args.get('page', 1, type=int)
     search = request.args.get('search', '')
 
     query = User.query
@@ -65,7 +86,7 @@ def users():
                 )
             )
 
-    users = query.order_by(User.created_at.desc()).paginate(page=page, per_page=20)
+    users = keyset_paginate(query, [User.created_at, User.id], request.args.get('cursor'), per_page=20)
     return render_template('admin/users.html', users=users)
 
 @admin_bp.route('/users/quick-add-coin', methods=['POST'])
@@ -87,35 +108,45 @@ def quick_add_coin():
         return redirect(url_for('admin.users'))
 
     if action == 'add':
-        user.godcoin_balance += amount
-        transaction = Transaction(
-            user_id=user_id,
-            type='admin_add',
-            amount=amount,
-            description=f'Admin cộng GodCoin'
-        )
-        db.session.add(transaction)
+        balance = credit(user_id, amount, 'admin_add', 'Admin cộng GodCoin')
         db.session.commit()
-        flash(f'Đã cộng {amount} GodCoin cho {user.username} (ID #{user_id})! Số dư mới: {user.godcoin_balance} GC', 'success')
+        flash(f'Đã cộng {amount} GodCoin cho {user.username} (ID #{user_id})! Số dư mới: {balance} GC', 'success')
     elif action == 'subtract':
-        if user.godcoin_balance >= amount:
-            user.godcoin_balance -= amount
-            transaction = Transaction(
-                user_id=user_id,
-                type='admin_subtract',
-                amount=-amount,
-                description=f'Admin trừ GodCoin'
-            )
-            db.session.add(transaction)
+        balance = debit(user_id, amount, 'admin_subtract', 'Admin trừ GodCoin')
+        if balance is not None:
             db.session.commit()
-            flash(f'Đã trừ {amount} GodCoin của {user.username} (ID #{user_id})! Số dư mới: {user.godcoin_balance} GC', 'success')
+            flash(f'Đã trừ {amount} GodCoin của {user.username} (ID #{user_id})! Số dư mới: {balance} GC', 'success')
         else:
+            db.session.rollback()
             flash(f'Số dư không đủ để trừ! {user.username} chỉ có {user.godcoin_balance} GC', 'error')
     else:
         flash(f'Hành động không hợp lệ!', 'error')
 
     return redirect(url_for('admin.users'))
 
+@admin_bp.route('/users/grants', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def grant_coins():
+    result = None
+    if request.method == 'POST':
+        grant_file = request.files.get('grants')
+        if not grant_file or not grant_file.filename:
+            flash('Vui lòng chọn file CSV!', 'error')
+            return redirect(url_for('admin.grant_coins'))
+
+        result = apply_grant_file(grant_file.read(), filename=grant_file.filename, admin_id=current_user.id)
+        if result.status == 'applied':
+            batch = result.batch
+            flash(f'Đã cộng {batch.total} GodCoin cho {batch.users} người dùng ({batch.rows} dòng)!', 'success')
+        elif result.status == 'duplicate':
+            flash(f'File này đã được áp dụng lúc {result.batch.created_at.strftime("%d/%m/%Y %H:%M")}, không cộng lại.', 'error')
+        else:
+            flash(f'File có {result.error_count} dòng lỗi, chưa cộng GodCoin cho ai.', 'error')
+
+    batches = GrantBatch.query.order_by(GrantBatch.created_at.desc(), GrantBatch.id.desc()).limit(20).all()
+    return render_template('admin/grants.html', result=result, batches=batches)
+
 @admin_bp.route('/users/<int:user_id>/edit', methods=['GET', 'POST'])
 @login_required
 @admin_required
@@ -146,8 +177,18 @@ def delete_user(user_id):
         flash('Không thể xóa tài khoản admin!', 'error')
         return redirect(url_for('admin.users'))
 
+    # Posts, orders and topups go with the user (cascade); take them off the counters too.
+    bump_stats(
+        users=-1,
+        posts=-Post.query.filter_by(author_id=user.id).count(),
+        orders=-Order.query.filter_by(user_id=user.id).count(),
+        pending_topups=-Topup.query.filter_by(user_id=user.id, status='pending').count(),
+        total_godcoin=-(user.godcoin_balance or 0),
+    )
     db.session.delete(user)
     db.session.commit()
+    # SQLite may hand the id to the next signup; don't leak the read state to it.
+    forget_cached_read_state(user.id)
     flash(f'Đã xóa tài khoản {user.username}!', 'success')
     return redirect(url_for('admin.users'))
 
@@ -161,27 +202,12 @@ def adjust_balance(user_id):
 
     if amount and amount > 0:
         if action == 'add':
-            user.godcoin_balance += amount
-            transaction = Transaction(
-                user_id=user_id,
-                type='admin_add',
-                amount=amount,
-                description='Admin cộng GodCoin'
-            )
-        else:
-            if user.godcoin_balance >= amount:
-                user.godcoin_balance -= amount
-                transaction = Transaction(
-                    user_id=user_id,
-                    type='admin_subtract',
-                    amount=-amount,
-                    description='Admin trừ GodCoin'
-                )
-            else:
-                flash('Số dư không đủ để trừ!', 'error')
-                return redirect(url_for('admin.users'))
+            credit(user_id, amount, 'admin_add', 'Admin cộng GodCoin')
+        elif debit(user_id, amount, 'admin_subtract', 'Admin trừ GodCoin') is None:
+            db.session.rollback()
+            flash('Số dư không đủ để trừ!', 'error')
+            return redirect(url_for('admin.users'))
 
-        db.session.add(transaction)
         db.session.commit()
         flash(f'Đã điều chỉnh số dư GodCoin cho {user.username}!', 'success')
 
@@ -209,6 +235,7 @@ def create_category():
             category = Category(name=name, description=description)
             db.session.add(category)
             db.session.commit()
+            purge_pages('blog')
             flash('Tạo danh mục thành công!', 'success')
             return redirect(url_for('admin.categories'))
 
@@ -221,6 +248,7 @@ def delete_category(category_id):
     category = Category.query.get_or_404(category_id)
     db.session.delete(category)
     db.session.commit()
+    purge_pages('blog')
     flash('Xóa danh mục thành công!', 'success')
     return redirect(url_for('admin.categories'))
 
@@ -235,7 +263,7 @@ def posts():
     if post_type not in ['free', 'premium']:
         post_type = 'free'
 
-    query = Post.query
+    query = Post.query.options(db.joinedload(Post.category))
     if post_type == 'premium':
         query = query.filter_by(is_premium=True)
     else:
@@ -275,7 +303,10 @@ def create_post():
                     post.thumbnail = uploaded
 
         db.session.add(post)
+        bump_stats(posts=1)
         db.session.commit()
+        index_post(post)
+        purge_pages('blog')
         flash('Tạo bài viết thành công!', 'success')
         return redirect(url_for('admin.posts'))
 
@@ -285,7 +316,7 @@ def create_post():
 @login_required
 @admin_required
 def edit_post(post_id):
-    post = Post.query.get_or_404(post_id)
+    post = Post.query.options(db.undefer(Post.content)).get_or_404(post_id)
     categories = Category.query.all()
 
     if request.method == 'POST':
@@ -303,6 +334,8 @@ def edit_post(post_id):
                     post.thumbnail = uploaded
 
         db.session.commit()
+        index_post(post)
+        purge_pages('blog')
         flash('Cập nhật bài viết thành công!', 'success')
         return redirect(url_for('admin.posts'))
 
@@ -345,7 +378,10 @@ def upload_image():
 def delete_post(post_id):
     post = Post.query.get_or_404(post_id)
     db.session.delete(post)
+    bump_stats(posts=-1)
     db.session.commit()
+    remove_post(post_id)
+    purge_pages('blog')
     flash('Xóa bài viết thành công!', 'success')
     return redirect(url_for('admin.posts'))
 
@@ -377,19 +413,20 @@ def create_product():
                     product.image = uploaded
 
         db.session.add(product)
+        bump_stats(products=1)
         db.session.commit()
+        index_product(product)
 
         # Persist inventory text directly in DB so it survives dyno restarts.
         if 'inventory_file' in request.files:
             inventory_file = request.files['inventory_file']
             if inventory_file.filename:
                 content = inventory_file.read().decode('utf-8-sig', errors='replace')
-                lines = [line.strip() for line in content.splitlines() if line.strip()]
-                product.inventory_type = 'file'
-                product.inventory_data = content
+                store_file_inventory(product, content, product.parse_mode)
                 product.inventory_file = f"inventory_{product.id}.txt"
-                product.stock = len(lines)
                 db.session.commit()
+        # Only now is the stock final; an earlier purge could re-cache it at 0.
+        purge_pages('store')
 
         flash('Tạo sản phẩm thành công!', 'success')
         return redirect(url_for('admin.products'))
@@ -415,6 +452,8 @@ def edit_product(product_id):
                     product.image = uploaded
 
         db.session.commit()
+        index_product(product)
+        purge_pages('store')
         flash('Cập nhật sản phẩm thành công!', 'success')
         return redirect(url_for('admin.products'))
 
@@ -425,6 +464,7 @@ def edit_product(product_id):
 @admin_required
 def product_inventory(product_id):
     product = Product.query.get_or_404(product_id)
+    import_stats = None
 
     if request.method == 'POST':
         if 'inventory_file' in request.files:
@@ -435,16 +475,17 @@ def product_inventory(product_id):
 
                 if filename.endswith('.zip'):
                     try:
-                        accounts_data = parse_zip_to_accounts(inventory_file)
+                        started = time.perf_counter()
+
+                        def log_progress(count):
+                            current_app.logger.info('Inventory import product=%s: %d accounts', product.id, count)
 
-                        # Replace any existing inventory rows for this product.
-                        ProductInventoryAccount.query.filter_by(product_id=product.id).delete(synchronize_session=False)
-                        for fname, fcontent in accounts_data:
-                            db.session.add(ProductInventoryAccount(
-                                product_id=product.id,
-                                filename=fname,
-                                content=fcontent,
-                            ))
+                        # Stream zip members straight into batched inserts, replacing old rows.
+                        account_count = replace_inventory_accounts(
+                            product, iter_zip_accounts(inventory_file), progress=log_progress,
+                        )
+                        if not account_count:
+                            raise ValueError('File zip không chứa tài khoản .txt hợp lệ')
 
                         # Drop legacy filesystem leftovers (best-effort, not required).
                         if product.inventory_file:
@@ -461,10 +502,19 @@ def product_inventory(product_id):
                         product.inventory_folder_path = None
                         product.inventory_data = None
                         product.inventory_file = None
-                        product.stock = len(accounts_data)
+                        product.stock = account_count
                         product.sold_count = 0
+                        publish_stock(product)
                         db.session.commit()
-                        flash(f'Da upload zip voi {len(accounts_data)} tai khoan (moi file .txt la 1 tai khoan)!', 'success')
+                        purge_pages('store')
+
+                        elapsed = max(time.perf_counter() - started, 1e-6)
+                        import_stats = {
+                            'accounts': account_count,
+                            'seconds': elapsed,
+                            'rate': account_count / elapsed,
+                        }
+                        flash(f'Da upload zip voi {account_count} tai khoan (moi file .txt la 1 tai khoan)!', 'success')
                     except ValueError as exc:
                         db.session.rollback()
                         flash(str(exc), 'error')
@@ -474,102 +524,85 @@ def product_inventory(product_id):
                 elif filename.endswith('.txt'):
                     parse_mode = normalize_inventory_parse_mode(request.form.get('parse_mode'))
                     content = inventory_file.read().decode('utf-8-sig', errors='replace')
-                    accounts = parse_inventory_accounts_text(content, parse_mode)
 
-                    product.stock = len(accounts)
-                    product.parse_mode = parse_mode
-                    product.inventory_type = 'file'
-                    product.inventory_data = content
+                    # Replaces any previous rows (file or folder mode) with one row per account.
+                    account_count = store_file_inventory(product, content, parse_mode)
                     product.inventory_file = f"inventory_{product.id}.txt"
                     product.sold_count = 0  # Reset sold count when uploading new file
 
-                    # Clear any folder-mode rows when switching to file mode.
-                    ProductInventoryAccount.query.filter_by(product_id=product.id).delete(synchronize_session=False)
                     if product.inventory_folder_path:
                         cleanup_inventory_folder(upload_folder, product.inventory_folder_path)
                         product.inventory_folder_path = None
 
+                    publish_stock(product)
                     db.session.commit()
-                    flash(f'Da upload file voi {len(accounts)} tai khoan!', 'success')
+                    purge_pages('store')
+                    flash(f'Da upload file voi {account_count} tai khoan!', 'success')
                 else:
                     flash('Chi ho tro file .txt hoac .zip', 'error')
 
-    return render_template('admin/product_inventory.html', product=product)
+    return render_template('admin/product_inventory.html', product=product, import_stats=import_stats)
 
 @admin_bp.route('/products/<int:product_id>/view-file')
 @login_required
 @admin_required
 def view_inventory_file(product_id):
-    product = Product.query.get_or_404(product_id)
+    product = Product.query.options(db.undefer(Product.inventory_data)).get_or_404(product_id)
 
     inventory_type = getattr(product, 'inventory_type', 'file') or 'file'
 
     if inventory_type == 'folder':
-        accounts = (
-            ProductInventoryAccount.query
-            .filter_by(product_id=product.id)
-            .order_by(ProductInventoryAccount.filename, ProductInventoryAccount.id)
-            .all()
-        )
-        if not accounts:
+        account_query = ProductInventoryAccount.query.filter_by(product_id=product.id)
+        total_files = account_query.count()
+        if not total_files:
             flash('San pham chua co tai khoan trong kho!', 'error')
             return redirect(url_for('admin.product_inventory', product_id=product_id))
-        files = [a.filename for a in accounts]
-        preview_files = files[:50]
-        return render_template('admin/view_inventory_file.html', product=product, mode='folder', files=preview_files, total_files=len(files), content='')
+        # Only the first 50 names are shown; account contents stay deferred.
+        preview_files = [
+            row.filename for row in account_query
+            .with_entities(ProductInventoryAccount.filename)
+            .order_by(ProductInventoryAccount.filename, ProductInventoryAccount.id)
+            .limit(50)
+        ]
+        return render_template('admin/view_inventory_file.html', product=product, mode='folder', files=preview_files, total_files=total_files, content='')
 
-    content = product.inventory_data
-    if content is None:
+    if product.inventory_data is None and not product.inventory_file:
         flash('San pham chua co file tai khoan!', 'error')
         return redirect(url_for('admin.product_inventory', product_id=product_id))
 
+    content = file_inventory_text(product)
     return render_template('admin/view_inventory_file.html', product=product, mode='file', content=content)
 
 @admin_bp.route('/products/<int:product_id>/download-file')
 @login_required
 @admin_required
 def download_inventory_file(product_id):
-    product = Product.query.get_or_404(product_id)
+    product = Product.query.options(db.undefer(Product.inventory_data)).get_or_404(product_id)
 
     inventory_type = getattr(product, 'inventory_type', 'file') or 'file'
+    safe_name = secure_filename(product.name) or f'product_{product.id}'
 
+    # Both branches stream: rows are read in batches and written to the socket
+    # as they are encoded, so worker memory doesn't grow with inventory size.
     if inventory_type == 'folder':
-        accounts = (
-            ProductInventoryAccount.query
-            .filter_by(product_id=product.id)
-            .order_by(ProductInventoryAccount.filename, ProductInventoryAccount.id)
-            .all()
-        )
-        if not accounts:
+        if not has_inventory_accounts(product):
             flash('Thu muc kho khong con tai khoan de tai xuong!', 'error')
             return redirect(url_for('admin.product_inventory', product_id=product_id))
 
-        from io import BytesIO
-        buf = BytesIO()
-        with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zip_output:
-            for acc in accounts:
-                zip_output.writestr(acc.filename, (acc.content or '').encode('utf-8'))
-        buf.seek(0)
-        safe_name = secure_filename(product.name) or f'product_{product.id}'
-        return send_file(
-            buf,
+        return Response(
+            stream_with_context(iter_inventory_zip_chunks(product)),
             mimetype='application/zip',
-            as_attachment=True,
-            download_name=f"{safe_name}_inventory.zip",
+            headers={'Content-Disposition': f'attachment; filename="{safe_name}_inventory.zip"'},
         )
 
-    content = product.inventory_data
-    if content is None:
+    if product.inventory_data is None and not product.inventory_file:
         flash('San pham chua co file tai khoan!', 'error')
         return redirect(url_for('admin.product_inventory', product_id=product_id))
 
-    from io import BytesIO
-    safe_name = secure_filename(product.name) or f'product_{product.id}'
-    return send_file(
-        BytesIO(content.encode('utf-8')),
+    return Response(
+        stream_with_context(iter_file_inventory_chunks(product)),
         mimetype='text/plain; charset=utf-8',
-        as_attachment=True,
-        download_name=f"{safe_name}_inventory.txt",
+        headers={'Content-Disposition': f'attachment; filename="{safe_name}_inventory.txt"'},
     )
 
 @admin_bp.route('/products/<int:product_id>/delete', methods=['POST'])
@@ -591,24 +624,31 @@ def delete_product(product_id):
         cleanup_inventory_folder(current_app.config['UPLOAD_FOLDER'], product.inventory_folder_path)
 
     db.session.delete(product)
+    bump_stats(products=-1)
     db.session.commit()
+    remove_product(product_id)
+    purge_pages('store')
     flash('Xóa sản phẩm thành công!', 'success')
     return redirect(url_for('admin.products'))
 
 # Topup Management
+TOPUP_MAX_PER_PAGE = 500
+
 @admin_bp.route('/topups')
 @login_required
 @admin_required
 def topups():
     page = request.args.get('page', 1, type=int)
     status = request.args.get('status', 'pending')
+    # Larger pages make bulk approval of a busy day practical.
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), TOPUP_MAX_PER_PAGE)
 
-    query = Topup.query
+    query = Topup.query.options(db.joinedload(Topup.user))
     if status:
         query = query.filter_by(status=status)
 
-    topups = query.order_by(Topup.created_at.desc()).paginate(page=page, per_page=20)
-    return render_template('admin/topups.html', topups=topups, current_status=status)
+    topups = query.order_by(Topup.created_at.desc()).paginate(page=page, per_page=per_page)
+    return render_template('admin/topups.html', topups=topups, current_status=status, per_page=per_page)
 
 @admin_bp.route('/topups/<int:topup_id>/approve', methods=['POST'])
 @login_required
@@ -616,52 +656,110 @@ def topups():
 def approve_topup(topup_id):
     topup = Topup.query.get_or_404(topup_id)
 
-    if topup.status != 'pending':
+    # approve_topups claims the pending row with a conditional UPDATE, so a
+    # double click (or two admins) credits the wallet once.
+    if not approve_topups([topup_id]):
         flash('Yêu cầu này đã được xử lý!', 'error')
         return redirect(url_for('admin.topups'))
-
-    topup.status = 'approved'
-    topup.processed_at = datetime.utcnow()
-
-    user = User.query.get(topup.user_id)
-    user.godcoin_balance += topup.godcoin_amount
-
-    transaction = Transaction(
-        user_id=topup.user_id,
-        type='topup',
-        amount=topup.godcoin_amount,
-        description=f'Nạp GodCoin qua {topup.method.upper()}'
-    )
-    db.session.add(transaction)
     db.session.commit()
 
-    flash(f'Đã duyệt nạp {topup.godcoin_amount} GodCoin cho {user.username}!', 'success')
+    flash(f'Đã duyệt nạp {topup.godcoin_amount} GodCoin cho {topup.user.username}!', 'success')
     return redirect(url_for('admin.topups'))
 
 @admin_bp.route('/topups/<int:topup_id>/reject', methods=['POST'])
 @login_required
 @admin_required
 def reject_topup(topup_id):
-    topup = Topup.query.get_or_404(topup_id)
+    Topup.query.get_or_404(topup_id)
 
-    if topup.status != 'pending':
+    if not reject_topups([topup_id]):
         flash('Yêu cầu này đã được xử lý!', 'error')
         return redirect(url_for('admin.topups'))
-
-    topup.status = 'rejected'
-    topup.processed_at = datetime.utcnow()
     db.session.commit()
 
     flash('Đã từ chối yêu cầu nạp tiền!', 'success')
     return redirect(url_for('admin.topups'))
 
+@admin_bp.route('/topups/bulk', methods=['POST'])
+@login_required
+@admin_required
+def bulk_topups():
+    topup_ids = request.form.getlist('topup_ids', type=int)
+    action = request.form.get('action')
+    if not topup_ids or action not in ('approve', 'reject'):
+        flash('Vui lòng chọn yêu cầu và hành động!', 'error')
+        return redirect(url_for('admin.topups'))
+
+    # One transaction for the whole selection; already-processed rows are skipped.
+    try:
+        if action == 'approve':
+            done = len(approve_topups(topup_ids))
+        else:
+            done = reject_topups(topup_ids)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    skipped = len(set(topup_ids)) - done
+    verb = 'duyệt' if action == 'approve' else 'từ chối'
+    message = f'Đã {verb} {done} yêu cầu nạp tiền!'
+    if skipped:
+        message += f' Bỏ qua {skipped} yêu cầu đã được xử lý.'
+    flash(message, 'success' if done else 'error')
+    return redirect(url_for('admin.topups'))
+
+@admin_bp.route('/topups/import', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def import_topup_statement():
+    if request.method == 'GET':
+        return render_template('admin/topup_import.html', result=None)
+
+    statement_file = request.files.get('statement')
+    method = request.form.get('method') or None
+    dry_run = bool(request.form.get('dry_run'))
+    if not statement_file or not statement_file.filename:
+        flash('Vui lòng chọn file sao kê (CSV)!', 'error')
+        return redirect(url_for('admin.import_topup_statement'))
+    if method not in (None, 'bank', 'momo'):
+        flash('Phương thức thanh toán không hợp lệ!', 'error')
+        return redirect(url_for('admin.import_topup_statement'))
+
+    try:
+        result = match_statement(statement_file.stream, method=method)
+    except (ValueError, UnicodeDecodeError) as exc:
+        flash(f'Không đọc được file sao kê: {exc}', 'error')
+        return redirect(url_for('admin.import_topup_statement'))
+
+    approved = []
+    if not dry_run and result.matched:
+        try:
+            approved = approve_topups([topup_id for _, topup_id in result.matched], result.references)
+            db.session.commit()
+        except IntegrityError:
+            # Another upload recorded one of these bank references first.
+            db.session.rollback()
+            flash('Sao kê này vừa được nhập ở phiên khác, vui lòng thử lại!', 'error')
+            return redirect(url_for('admin.import_topup_statement'))
+        except Exception:
+            db.session.rollback()
+            raise
+        flash(f'Đã duyệt {len(approved)} yêu cầu nạp tiền từ sao kê!', 'success')
+
+    return render_template('admin/topup_import.html', result=result, dry_run=dry_run, approved=len(approved))
+
 # Transactions Log
 @admin_bp.route('/transactions')
 @login_required
 @admin_required
 def transactions():
-    page = request.args.get('page', 1, type=int)
-    transactions = Transaction.query.order_by(Transaction.created_at.desc()).paginate(page=page, per_page=50)
+    transactions = keyset_paginate(
+        Transaction.query.options(db.joinedload(Transaction.user)),
+        [Transaction.created_at, Transaction.id],
+        request.args.get('cursor'),
+        per_page=50,
+    )
     return render_template('admin/transactions.html', transactions=transactions)
 
 # Orders
@@ -669,11 +767,48 @@ def transactions():
 @login_required
 @admin_required
 def orders():
-    page = request.args.get('page', 1, type=int)
-    orders = Order.query.order_by(Order.created_at.desc()).paginate(page=page, per_page=20)
+    orders = keyset_paginate(
+        Order.query.options(
+            db.undefer(Order.account_info), db.joinedload(Order.user), db.joinedload(Order.product),
+        ),
+        [Order.created_at, Order.id],
+        request.args.get('cursor'),
+        per_page=20,
+    )
     return render_template('admin/orders.html', orders=orders)
 
 
+# Analytics (served from the daily rollups only; see godweb.rollups)
+ANALYTICS_RANGES = (7, 30, 90)
+
+@admin_bp.route('/analytics')
+@login_required
+@admin_required
+def analytics():
+    days = request.args.get('days', 30, type=int)
+    if days not in ANALYTICS_RANGES:
+        days = 30
+    refresh_rollups(max_batches=current_app.config['ROLLUP_REFRESH_BATCHES'])
+
+    series = daily_series(days)
+    for day in series:
+        day['revenue'] = day['sales_godcoin'] + day['post_revenue']
+    since = series[0]['day']
+    totals = {name: sum(day[name] for day in series) for name in series[0] if name != 'day'}
+    peaks = {name: max(day[name] for day in series) or 1 for name in ('revenue', 'topup_vnd')}
+    return render_template(
+        'admin/analytics.html',
+        days=days,
+        ranges=ANALYTICS_RANGES,
+        series=series,
+        totals=totals,
+        peaks=peaks,
+        products=top_products(since),
+        posts=top_posts(since),
+        freshness=rollup_freshness(),
+    )
+
+
 @admin_bp.route('/notifications', methods=['GET', 'POST'])
 @login_required
 @admin_required
@@ -686,12 +821,22 @@ def notifications():
 
         notification = Notification(content=content, created_by=current_user.id)
         db.session.add(notification)
+        db.session.flush()
+        publish('notification', {
+            'id': notification.id,
+            'content': notification.content,
+            'created_at': notification.created_at.strftime('%d/%m %H:%M'),
+        })
         db.session.commit()
+        invalidate_notification_list()
         flash('Đã tạo thông báo mới!', 'success')
         return redirect(url_for('admin.notifications'))
 
     page = request.args.get('page', 1, type=int)
-    notifications = Notification.query.order_by(Notification.created_at.desc()).paginate(page=page, per_page=20)
+    notifications = (
+        Notification.query.options(db.joinedload(Notification.creator))
+        .order_by(Notification.created_at.desc()).paginate(page=page, per_page=20)
+    )
     return render_template('admin/notifications.html', notifications=notifications)
 
 
@@ -701,6 +846,28 @@ def notifications():
 def delete_notification(notification_id):
     notification = Notification.query.get_or_404(notification_id)
     db.session.delete(notification)
+    publish('notification_deleted', {'id': notification_id})
     db.session.commit()
+    invalidate_notification_list()
     flash('Đã xóa thông báo!', 'success')
     return redirect(url_for('admin.notifications'))
+
+
+@admin_bp.route('/performance')
+@login_required
+@admin_required
+def performance():
+    instrumentation = current_app.extensions.get('instrumentation')
+    stats = instrumentation.endpoint_stats() if instrumentation else []
+    return render_template('admin/performance.html', enabled=instrumentation is not None, stats=stats)
+
+
+@admin_bp.route('/performance/reset', methods=['POST'])
+@login_required
+@admin_required
+def reset_performance():
+    instrumentation = current_app.extensions.get('instrumentation')
+    if instrumentation:
+        instrumentation.reset()
+        flash('Đã xóa số liệu hiệu năng!', 'success')
+    return redirect(url_for('admin.performance'))
@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_user, logout_user, login_required, current_user
 from godweb.models import User
 from godweb.extensions import db
+from godweb.stats import bump_stats
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -58,6 +59,7 @@ def register():
         user = User(username=username, email=email, recovery_number=recovery_number)
         user.set_password(password)
         db.session.add(user)
+        bump_stats(users=1)
         db.session.commit()
 
         flash('Đăng ký thành công! Vui lòng đăng nhập.', 'success')
@@ -1,7 +1,13 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, make_response
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from flask_login import login_required, current_user
-from godweb.models import Post, Category, Comment, PostPurchase, Transaction
+from godweb.models import Post, Category, Comment, PostPurchase
+from godweb.conditional import conditional_page, make_etag, table_version
 from godweb.extensions import db
+from godweb.page_cache import cached_page, purge_pages
+from godweb.pagination import keyset_paginate, ranked_paginate
+from godweb.search import search_ids
+from godweb.wallet import debit
+from godweb.view_counter import get_view_counter
 from sqlalchemy import func
 
 blog_bp = Blueprint('blog', __name__)
@@ -19,9 +25,14 @@ def can_access_post(post, user):
 
     return PostPurchase.query.filter_by(user_id=user.id, post_id=post.id).first() is not None
 
+
+def _count_cached_view(post_id):
+    # A page-cache hit skips the view, but the visit still counts.
+    get_view_counter(current_app).record(post_id)
+
 @blog_bp.route('/')
+@cached_page('blog')
 def index():
-    page = request.args.get('page', 1, type=int)
     category_id = request.args.get('category', type=int)
     search = request.args.get('search', '')
     post_type = request.args.get('type', 'free')
@@ -29,30 +40,37 @@ def index():
     if post_type not in ['free', 'premium']:
         post_type = 'free'
 
-    query = Post.query
+    post_version = table_version(Post.updated_at)
+    etag = make_etag('blog.index', *post_version, *table_version(Category.id))
 
-    if post_type == 'premium':
-        query = query.filter_by(is_premium=True)
-    else:
-        query = query.filter_by(is_premium=False)
+    def render():
+        query = Post.query.options(db.joinedload(Post.category))
 
-    if category_id:
-        query = query.filter_by(category_id=category_id)
+        if post_type == 'premium':
+            query = query.filter_by(is_premium=True)
+        else:
+            query = query.filter_by(is_premium=False)
+
+        if category_id:
+            query = query.filter_by(category_id=category_id)
 
-    # Case-insensitive search using LOWER()
-    if search:
-        search_lower = search.lower()
-        query = query.filter(
-            func.lower(Post.title).contains(search_lower) |
-            func.lower(Post.content).contains(search_lower)
-        )
+        if search.strip():
+            # Accent-insensitive, ranked by the full-text index; see godweb.search.
+            posts = ranked_paginate(query, Post.id, search_ids('post', search), request.args.get('cursor'), per_page=9)
+        else:
+            # Sort: Admin Pin (2) > User Pin (1) > Newest (by created_at)
+            posts = keyset_paginate(
+                query,
+                [func.coalesce(Post.pin_priority, 0), Post.created_at, Post.id],
+                request.args.get('cursor'),
+                per_page=9,
+            )
+        categories = Category.query.all()
 
-    # Sort: Admin Pin (2) > User Pin (1) > Newest (by created_at)
-    posts = query.order_by(Post.pin_priority.desc(), Post.created_at.desc()).paginate(page=page, per_page=9)
-    categories = Category.query.all()
+        return render_template('blog/index.html', posts=posts, categories=categories,
+                              current_category=category_id, search=search, current_type=post_type)
 
-    return render_template('blog/index.html', posts=posts, categories=categories,
-                          current_category=category_id, search=search, current_type=post_type)
+    return conditional_page(etag, post_version[0], render)
 
 @blog_bp.route('/<int:post_id>/pin', methods=['POST'])
 @login_required
@@ -95,22 +113,35 @@ def pin_post(post_id):
             flash('Đã ghim bài viết!', 'success')
 
     db.session.commit()
+    purge_pages('blog')
     return redirect(url_for('blog.detail', post_id=post_id))
 
 
 @blog_bp.route('/<int:post_id>')
+@cached_page('blog', on_hit=_count_cached_view)
 def detail(post_id):
-    post = Post.query.get_or_404(post_id)
-    post.views += 1
-    db.session.commit()
+    post = Post.query.options(db.undefer(Post.content)).get_or_404(post_id)
+    # Write-behind: the view is buffered and flushed in batches, so this
+    # request stays read-only and never locks the posts row.
+    view_counter = get_view_counter(current_app)
+    views = (post.views or 0) + view_counter.pending(post.id) + 1
+    view_counter.record(post.id)
 
     has_access = can_access_post(post, current_user)
 
-    comments = []
+    comment_version = (None, 0)
     if has_access:
-        comments = Comment.query.filter_by(post_id=post_id).order_by(Comment.created_at.desc()).all()
+        comment_version = table_version(Comment.created_at, Comment.post_id == post_id)
+    last_modified = max(filter(None, (post.updated_at, comment_version[0])), default=None)
+    etag = make_etag('blog.detail', post.id, post.updated_at, has_access, *comment_version)
+
+    def render():
+        comments = []
+        if has_access:
+            comments = Comment.query.filter_by(post_id=post_id).order_by(Comment.created_at.desc()).all()
+        return render_template('blog/detail.html', post=post, views=views, has_access=has_access, comments=comments)
 
-    response = make_response(render_template('blog/detail.html', post=post, has_access=has_access, comments=comments))
+    response = conditional_page(etag, last_modified, render)
 
     if post.is_premium and not has_access:
         response.headers['Cache-Control'] = 'private, no-store, max-age=0'
@@ -131,25 +162,15 @@ def purchase(post_id):
         flash('Bạn đã mua bài viết này rồi!', 'info')
         return redirect(url_for('blog.detail', post_id=post_id))
 
-    # Check balance
-    if current_user.godcoin_balance < post.premium_price:
+    # Deduct balance (atomic check-and-debit) and create purchase
+    if debit(current_user.id, post.premium_price, 'purchase', f'Mua bài viết: {post.title}') is None:
+        db.session.rollback()
         flash('Số dư GodCoin không đủ! Vui lòng nạp thêm.', 'error')
         return redirect(url_for('wallet.topup'))
 
-    # Deduct balance and create purchase
-    current_user.godcoin_balance -= post.premium_price
-
     purchase = PostPurchase(user_id=current_user.id, post_id=post_id, price=post.premium_price)
     db.session.add(purchase)
 
-    transaction = Transaction(
-        user_id=current_user.id,
-        type='purchase',
-        amount=-post.premium_price,
-        description=f'Mua bài viết: {post.title}'
-    )
-    db.session.add(transaction)
-
     db.session.commit()
 
     flash('Mua bài viết thành công!', 'success')
@@ -170,6 +191,7 @@ def add_comment(post_id):
         comment = Comment(content=content, author_id=current_user.id, post_id=post_id)
         db.session.add(comment)
         db.session.commit()
+        purge_pages('blog')
         flash('Bình luận đã được thêm!', 'success')
 
     return redirect(url_for('blog.detail', post_id=post_id))
@@ -1,7 +1,10 @@
-from flask import Blueprint, render_template, send_from_directory, current_app, jsonify, abort
+from flask import Blueprint, Response, render_template, send_from_directory, current_app, jsonify, abort, request
 from flask_login import login_required, current_user
+from godweb.events import GLOBAL_CHANNEL, get_event_broker, latest_event_id, publish, user_channel
 from godweb.extensions import db
-from godweb.models import Post, Product, Category, Notification, NotificationRead
+from godweb.models import Post, Product, Category, Notification
+from godweb.notifications import mark_read, navbar_payload, store_cached_read_state
+from godweb.page_cache import cached_page
 import os
 
 main_bp = Blueprint('main', __name__)
@@ -16,6 +19,7 @@ def uploaded_file(filename):
     return send_from_directory(current_app.config['UPLOAD_FOLDER'], filename)
 
 @main_bp.route('/')
+@cached_page('blog', 'store')
 def home():
     # Sort: Admin Pin > User Pin > Newest
     featured_posts = Post.query.order_by(Post.pin_priority.desc(), Post.created_at.desc()).limit(6).all()
@@ -40,21 +44,46 @@ def terms():
 def read_notification(notification_id):
     notification = Notification.query.get_or_404(notification_id)
 
-    already_read = NotificationRead.query.filter_by(
-        user_id=current_user.id,
-        notification_id=notification.id
-    ).first()
+    read_state = mark_read(current_user.id, notification.id)
+    _, unread_count = navbar_payload(current_user.id, read_state)
+    # Keep the user's other tabs in sync.
+    publish('unread', {'count': unread_count}, channel=user_channel(current_user.id))
+    db.session.commit()
+    store_cached_read_state(current_user.id, read_state)
 
-    if not already_read:
-        db.session.add(NotificationRead(user_id=current_user.id, notification_id=notification.id))
-        db.session.commit()
+    return jsonify({'success': True, 'unread_count': unread_count})
 
-    unread_count = db.session.query(Notification.id).outerjoin(
-        NotificationRead,
-        db.and_(
-            NotificationRead.notification_id == Notification.id,
-            NotificationRead.user_id == current_user.id
-        )
-    ).filter(NotificationRead.id.is_(None)).count()
 
-    return jsonify({'success': True, 'unread_count': unread_count})
+@main_bp.route('/events')
+def events():
+    """Server-Sent Events: new notifications, unread counts and stock changes.
+
+    Logged-in users only; 204 tells an anonymous EventSource to stop retrying.
+    """
+    if not current_user.is_authenticated:
+        return '', 204
+    channels = [GLOBAL_CHANNEL, user_channel(current_user.id)]
+
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    if last_event_id is None:
+        last_event_id = latest_event_id()
+    # Release the pooled connection before the long-lived response starts.
+    db.session.remove()
+
+    broker = get_event_broker(current_app)
+    subscription = broker.subscribe(channels, last_event_id)
+    if subscription is None:
+        # Every stream slot of this worker is taken; the client backs off.
+        retry_ms = current_app.config['SSE_BUSY_RETRY']
+        response = Response(f'retry: {retry_ms}\n\n', status=503, mimetype='text/event-stream')
+        response.headers['Retry-After'] = str(retry_ms // 1000)
+        return response
+    stream = broker.stream(
+        subscription,
+        keepalive=current_app.config['SSE_KEEPALIVE'],
+        max_duration=current_app.config['SSE_MAX_DURATION'],
+    )
+    response = Response(stream, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from godweb.models import Order, Transaction, PostPurchase
 from godweb.extensions import db
+from godweb.pagination import keyset_paginate
 import os
 from werkzeug.utils import secure_filename
 
@@ -11,7 +12,10 @@ profile_bp = Blueprint('profile', __name__)
 @login_required
 def index():
     recent_transactions = Transaction.query.filter_by(user_id=current_user.id).order_by(Transaction.created_at.desc()).limit(5).all()
-    recent_orders = Order.query.filter_by(user_id=current_user.id).order_by(Order.created_at.desc()).limit(5).all()
+    recent_orders = (
+        Order.query.options(db.joinedload(Order.product))
+        .filter_by(user_id=current_user.id).order_by(Order.created_at.desc()).limit(5).all()
+    )
     return render_template('profile/index.html', transactions=recent_transactions, orders=recent_orders)
 
 @profile_bp.route('/edit', methods=['GET', 'POST'])
@@ -78,13 +82,23 @@ def change_password():
 @profile_bp.route('/orders')
 @login_required
 def orders():
-    page = request.args.get('page', 1, type=int)
-    orders = Order.query.filter_by(user_id=current_user.id).order_by(Order.created_at.desc()).paginate(page=page, per_page=10)
+    orders = keyset_paginate(
+        Order.query.options(db.undefer(Order.account_info), db.joinedload(Order.product))
+        .filter_by(user_id=current_user.id),
+        [Order.created_at, Order.id],
+        request.args.get('cursor'),
+        per_page=10,
+    )
     return render_template('profile/orders.html', orders=orders)
 
 @profile_bp.route('/purchases')
 @login_required
 def purchases():
     page = request.args.get('page', 1, type=int)
-    purchases = PostPurchase.query.filter_by(user_id=current_user.id).order_by(PostPurchase.created_at.desc()).paginate(page=page, per_page=10)
+    purchases = (
+        PostPurchase.query.options(db.joinedload(PostPurchase.post))
+        .filter_by(user_id=current_user.id)
+        .order_by(PostPurchase.created_at.desc())
+        .paginate(page=page, per_page=10)
+    )
     return render_template('profile/purchases.html', purchases=purchases)
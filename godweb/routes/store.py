@@ -1,44 +1,64 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from flask_login import login_required, current_user
-from godweb.models import Product, Order, Transaction, User, ProductInventoryAccount
+from godweb.models import Product, Order
+from godweb.conditional import conditional_page, make_etag, table_version
+from godweb.events import publish_stock
 from godweb.extensions import db
-from godweb.utils import (
-    normalize_inventory_parse_mode,
-    parse_inventory_accounts_text,
-    serialize_inventory_accounts,
-)
+from godweb.inventory import claim_inventory_accounts, migrate_legacy_inventory_data
+from godweb.page_cache import cached_page, purge_pages
+from godweb.pagination import keyset_paginate, ranked_paginate
+from godweb.search import search_ids
+from godweb.stats import bump_stats
+from godweb.wallet import debit
+from sqlalchemy import insert
 from datetime import datetime
-import os
 
 store_bp = Blueprint('store', __name__)
 
+# Upper bound for one checkout so a single request can't hold the locks forever.
+MAX_PURCHASE_QUANTITY = 100
+
 @store_bp.route('/')
+@cached_page('store')
 def index():
-    page = request.args.get('page', 1, type=int)
     search = request.args.get('search', '')
 
-    query = Product.query
+    product_version = table_version(Product.updated_at)
+    etag = make_etag('store.index', *product_version)
+
+    def render():
+        query = Product.query
 
-    if search:
-        query = query.filter(Product.name.contains(search) | Product.description.contains(search))
+        if search.strip():
+            # Ranked by the full-text index; see godweb.search.
+            products = ranked_paginate(
+                query, Product.id, search_ids('product', search), request.args.get('cursor'), per_page=12,
+            )
+        else:
+            products = keyset_paginate(query, [Product.created_at, Product.id], request.args.get('cursor'), per_page=12)
 
-    products = query.order_by(Product.created_at.desc()).paginate(page=page, per_page=12)
+        return render_template('store/index.html', products=products, search=search)
 
-    return render_template('store/index.html', products=products, search=search)
+    return conditional_page(etag, product_version[0], render)
 
 @store_bp.route('/<int:product_id>')
+@cached_page('store')
 def detail(product_id):
     product = Product.query.get_or_404(product_id)
-    return render_template('store/detail.html', product=product)
+    etag = make_etag('store.detail', product.id, product.updated_at, product.stock)
+    return conditional_page(
+        etag, product.updated_at,
+        lambda: render_template('store/detail.html', product=product, max_quantity=MAX_PURCHASE_QUANTITY),
+    )
 
-def _lock_row(model, row_id):
+def _lock_row(model, row_id, *options):
     """Acquire a row-level lock on (model, row_id) for the current transaction.
 
     Uses ``SELECT ... FOR UPDATE`` on engines that support it (Postgres, MySQL).
     SQLite ignores the locking hint but its default journal-mode locking already
     serializes write transactions, which is sufficient for tests / local dev.
     """
-    query = db.session.query(model).filter(model.id == row_id)
+    query = db.session.query(model).options(*options).filter(model.id == row_id)
     bind = db.session.get_bind()
     if bind.dialect.name in ('postgresql', 'mysql'):
         query = query.with_for_update()
@@ -48,96 +68,86 @@ def _lock_row(model, row_id):
 @store_bp.route('/<int:product_id>/buy', methods=['POST'])
 @login_required
 def buy(product_id):
+    quantity = request.form.get('quantity', 1, type=int)
+    if quantity < 1 or quantity > MAX_PURCHASE_QUANTITY:
+        flash(f'Số lượng mua phải từ 1 đến {MAX_PURCHASE_QUANTITY}!', 'error')
+        return redirect(url_for('store.detail', product_id=product_id))
+
     try:
-        # Lock both rows for the duration of the transaction so concurrent
-        # buyers can't double-spend the same balance or claim the same account.
-        product = _lock_row(Product, product_id)
+        # Lock the product row so concurrent buyers can't claim the same account.
+        # The balance needs no lock: the debit below is a conditional UPDATE.
+        # inventory_data is only non-NULL for not-yet-migrated legacy products.
+        product = _lock_row(Product, product_id, db.undefer(Product.inventory_data))
         if product is None:
             db.session.rollback()
             flash('Sản phẩm không tồn tại!', 'error')
             return redirect(url_for('store.index'))
 
-        user = _lock_row(User, current_user.id)
-        if user is None:
-            db.session.rollback()
-            flash('Phiên đăng nhập không hợp lệ!', 'error')
-            return redirect(url_for('auth.login'))
-
-        if user.godcoin_balance < product.price:
+        total_price = product.price * quantity
+        # Cheap early exit; the debit re-checks atomically.
+        if (current_user.godcoin_balance or 0) < total_price:
             db.session.rollback()
             flash('Số dư GodCoin không đủ! Vui lòng nạp thêm.', 'error')
             return redirect(url_for('wallet.topup'))
 
         inventory_type = getattr(product, 'inventory_type', 'file') or 'file'
-        account_info = None
-        remaining_stock = 0
-
-        if inventory_type == 'folder':
-            # Inventory accounts are persisted as DB rows so they survive dyno restarts.
-            account_query = (
-                db.session.query(ProductInventoryAccount)
-                .filter_by(product_id=product.id)
-                .order_by(ProductInventoryAccount.filename, ProductInventoryAccount.id)
-            )
-            bind = db.session.get_bind()
-            if bind.dialect.name in ('postgresql', 'mysql'):
-                account_query = account_query.with_for_update(skip_locked=True)
-            account_row = account_query.first()
-
-            if account_row is None:
-                product.stock = 0
-                db.session.commit()
-                flash('Sản phẩm đã hết hàng!', 'error')
+        if inventory_type == 'file':
+            # One-time move of a pre-row-storage text blob into per-account rows.
+            migrate_legacy_inventory_data(product)
+
+        # Inventory accounts are persisted as DB rows so they survive dyno restarts.
+        accounts = claim_inventory_accounts(product, quantity)
+        if not accounts:
+            if inventory_type == 'file' and not product.inventory_file:
+                db.session.rollback()
+                flash('Sản phẩm chưa có hàng!', 'error')
                 return redirect(url_for('store.detail', product_id=product_id))
+            product.stock = 0
+            publish_stock(product)
+            db.session.commit()
+            purge_pages('store')
+            flash('Sản phẩm đã hết hàng!', 'error')
+            return redirect(url_for('store.detail', product_id=product_id))
+
+        if len(accounts) < quantity:
+            # All-or-nothing: put the claimed accounts back by rolling back.
+            db.session.rollback()
+            flash(f'Chỉ còn {len(accounts)} sản phẩm trong kho!', 'error')
+            return redirect(url_for('store.detail', product_id=product_id))
 
-            account_info = (account_row.content or '').strip()
-            db.session.delete(account_row)
-            db.session.flush()
-            remaining_stock = (
-                db.session.query(ProductInventoryAccount)
-                .filter_by(product_id=product.id)
-                .count()
-            )
+        if quantity == 1:
+            description = f'Mua sản phẩm: {product.name}'
         else:
-            parse_mode = normalize_inventory_parse_mode(getattr(product, 'parse_mode', 'line'))
-            inventory_data = getattr(product, 'inventory_data', None)
-            accounts = parse_inventory_accounts_text(inventory_data, parse_mode) if inventory_data else []
-            if not accounts:
-                if not (inventory_data or product.inventory_file):
-                    db.session.rollback()
-                    flash('Sản phẩm chưa có hàng!', 'error')
-                    return redirect(url_for('store.detail', product_id=product_id))
-                product.stock = 0
-                db.session.commit()
-                flash('Sản phẩm đã hết hàng!', 'error')
-                return redirect(url_for('store.detail', product_id=product_id))
+            description = f'Mua {quantity} x sản phẩm: {product.name}'
+        if debit(current_user.id, total_price, 'purchase', description) is None:
+            # Spent elsewhere since the early check; the rollback returns the accounts.
+            db.session.rollback()
+            flash('Số dư GodCoin không đủ! Vui lòng nạp thêm.', 'error')
+            return redirect(url_for('wallet.topup'))
 
-            account_info = accounts[0]
-            remaining_accounts = accounts[1:]
-            product.inventory_data = serialize_inventory_accounts(remaining_accounts, parse_mode)
-            remaining_stock = len(remaining_accounts)
-
-        user.godcoin_balance -= product.price
-        product.stock = remaining_stock
-        product.sold_count = (product.sold_count or 0) + 1
-
-        db.session.add(Order(
-            user_id=user.id,
-            product_id=product_id,
-            account_info=account_info,
-            price=product.price,
-        ))
-        db.session.add(Transaction(
-            user_id=user.id,
-            type='purchase',
-            amount=-product.price,
-            description=f'Mua sản phẩm: {product.name}',
-        ))
+        # The product row is locked, so decrementing is exact without a COUNT(*).
+        product.stock = max((product.stock or 0) - quantity, 0)
+        product.sold_count = (product.sold_count or 0) + quantity
+
+        now = datetime.utcnow()
+        db.session.execute(insert(Order), [
+            {
+                'user_id': current_user.id,
+                'product_id': product_id,
+                'account_info': account_info,
+                'price': product.price,
+                'created_at': now,
+            }
+            for account_info in accounts
+        ])
+        publish_stock(product)
+        bump_stats(orders=quantity)
 
         db.session.commit()
     except Exception:
         db.session.rollback()
         raise
+    purge_pages('store')
 
     flash('Mua hàng thành công! Xem thông tin tài khoản trong lịch sử mua hàng.', 'success')
     return redirect(url_for('profile.orders'))
@@ -145,5 +155,10 @@ def buy(product_id):
 @store_bp.route('/history')
 @login_required
 def history():
-    orders = Order.query.filter_by(user_id=current_user.id).order_by(Order.created_at.desc()).all()
+    orders = keyset_paginate(
+        Order.query.options(db.undefer(Order.account_info), db.joinedload(Order.product))
+        .filter_by(user_id=current_user.id),
+        [Order.created_at, Order.id],
+        request.args.get('cursor'),
+    )
     return render_template('store/history.html', orders=orders)
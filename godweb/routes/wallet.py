@@ -1,7 +1,11 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
+from datetime import datetime, timedelta
 from godweb.models import Transaction, Topup
 from godweb.extensions import db
+from godweb.ledger import statement as build_statement
+from godweb.pagination import keyset_paginate
+from godweb.stats import bump_stats
 
 wallet_bp = Blueprint('wallet', __name__)
 
@@ -36,6 +40,7 @@ def topup():
             method=method
         )
         db.session.add(topup_request)
+        bump_stats(pending_topups=1)
         db.session.commit()
 
         flash(f'Yêu cầu nạp {godcoin_amount} GodCoin đã được gửi! Vui lòng chuyển khoản và chờ admin xác nhận.', 'success')
@@ -46,12 +51,41 @@ def topup():
 @wallet_bp.route('/topup/history')
 @login_required
 def topup_history():
-    topups = Topup.query.filter_by(user_id=current_user.id).order_by(Topup.created_at.desc()).all()
+    topups = keyset_paginate(
+        Topup.query.filter_by(user_id=current_user.id), [Topup.created_at, Topup.id], request.args.get('cursor'),
+    )
     return render_template('wallet/topup_history.html', topups=topups)
 
 @wallet_bp.route('/transactions')
 @login_required
 def transactions():
-    page = request.args.get('page', 1, type=int)
-    transactions = Transaction.query.filter_by(user_id=current_user.id).order_by(Transaction.created_at.desc()).paginate(page=page, per_page=20)
+    transactions = keyset_paginate(
+        Transaction.query.filter_by(user_id=current_user.id),
+        [Transaction.created_at, Transaction.id],
+        request.args.get('cursor'),
+        per_page=20,
+    )
     return render_template('wallet/transactions.html', transactions=transactions)
+
+@wallet_bp.route('/statement')
+@login_required
+def statement():
+    # Defaults to the current month; both ends are whole days.
+    today = datetime.utcnow().date()
+    try:
+        start = datetime.strptime(request.args.get('start', ''), '%Y-%m-%d')
+    except ValueError:
+        start = datetime(today.year, today.month, 1)
+    try:
+        end = datetime.strptime(request.args.get('end', ''), '%Y-%m-%d')
+    except ValueError:
+        end = datetime.combine(today, datetime.min.time())
+    if end < start:
+        start, end = end, start
+
+    try:
+        until = end + timedelta(days=1)
+    except OverflowError:
+        until = datetime.max  # end=9999-12-31
+    report = build_statement(current_user.id, start, until)
+    return render_template('wallet/statement.html', statement=report, start=start, end=end)
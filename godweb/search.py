@@ -0,0 +1,404 @@
+"""Indexed full-text search for blog posts and store products.
+
+Text is folded before it is indexed or queried: lower-cased, Vietnamese
+diacritics stripped and ``đ`` mapped to ``d``, so "tai khoan" finds
+"tài khoản". Every query token is a prefix match and all tokens must match;
+results are ranked with titles/names weighted above bodies.
+
+Backends, picked once at boot by ``init_search``:
+
+* ``FtsSearchBackend`` -- SQLite FTS5 tables ranked with ``bm25``.
+* ``PostgresSearchBackend`` -- ``tsvector`` column with a GIN index, ranked
+  with ``ts_rank``.
+* ``MemorySearchBackend`` -- pure-Python inverted index, for databases
+  without either feature. Each worker builds it lazily from the database and
+  rebuilds when another worker bumps the shared version in the app cache.
+
+The FTS5/``tsvector`` tables are created and backfilled by a versioned
+migration (``create_search_index``), once per deploy; ``init_search`` only
+looks up whether they exist and never runs DDL on worker boot.
+
+Callers save the post/product first and then call ``index_post`` /
+``index_product`` (or ``remove_*``); those commit their own small
+transaction, so a failed index write never rolls back the content change.
+"""
+import heapq
+import logging
+import math
+import re
+import threading
+import unicodedata
+import uuid
+from bisect import bisect_left
+from collections import defaultdict
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from godweb.extensions import db
+from godweb.models import Post, Product
+
+logger = logging.getLogger(__name__)
+
+# Ranked ids returned per search; listing pages page through these.
+SEARCH_RESULT_LIMIT = 200
+TITLE_WEIGHT = 5.0
+BODY_WEIGHT = 1.0
+REBUILD_BATCH_SIZE = 1000
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def fold(value):
+    """Lower-case ``value`` and strip diacritics ("Tài khoản Đẹp" -> "tai khoan dep")."""
+    decomposed = unicodedata.normalize('NFD', (value or '').lower())
+    stripped = ''.join(ch for ch in decomposed if unicodedata.category(ch) != 'Mn')
+    return stripped.replace('đ', 'd')
+
+
+def tokenize(value):
+    return _TOKEN_RE.findall(fold(value))
+
+
+def _folded(value):
+    return ' '.join(tokenize(value))
+
+
+# (model, title column, body column) per searchable kind.
+KINDS = {
+    'post': (Post, Post.title, Post.content),
+    'product': (Product, Product.name, Product.description),
+}
+
+
+def iter_documents(kind, batch_size=REBUILD_BATCH_SIZE):
+    """Yield ``(id, title, body)`` for every row of ``kind``."""
+    model, title_column, body_column = KINDS[kind]
+    query = (
+        db.session.query(model.id, title_column, body_column)
+        .order_by(model.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for row in query:
+        yield row[0], row[1], row[2]
+
+
+class FtsSearchBackend:
+    """SQLite FTS5: one table per kind, rowid = post/product id."""
+
+    name = 'fts5'
+
+    def _table(self, kind):
+        return f'search_{kind}s_fts'
+
+    def exists(self):
+        return db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': self._table('post')},
+        ).first() is not None
+
+    def setup(self):
+        for kind in KINDS:
+            db.session.execute(text(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {self._table(kind)} '
+                "USING fts5(title, body, tokenize='unicode61')"
+            ))
+        db.session.commit()
+
+    def count(self, kind):
+        return db.session.execute(text(f'SELECT count(*) FROM {self._table(kind)}')).scalar()
+
+    def write(self, kind, rows):
+        table = self._table(kind)
+        rows = [{'id': ref_id, 'title': _folded(title), 'body': _folded(body)} for ref_id, title, body in rows]
+        if rows:
+            db.session.execute(text(f'DELETE FROM {table} WHERE rowid = :id'), [{'id': row['id']} for row in rows])
+            db.session.execute(text(f'INSERT INTO {table} (rowid, title, body) VALUES (:id, :title, :body)'), rows)
+
+    def remove(self, kind, ref_id):
+        db.session.execute(text(f'DELETE FROM {self._table(kind)} WHERE rowid = :id'), {'id': ref_id})
+
+    def clear(self, kind):
+        db.session.execute(text(f'DELETE FROM {self._table(kind)}'))
+
+    def search(self, kind, tokens, limit):
+        table = self._table(kind)
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        rows = db.session.execute(text(
+            f'SELECT rowid FROM {table} WHERE {table} MATCH :match '
+            f'ORDER BY bm25({table}, {TITLE_WEIGHT}, {BODY_WEIGHT}), rowid DESC LIMIT :limit'
+        ), {'match': match, 'limit': limit})
+        return [row[0] for row in rows]
+
+
+class PostgresSearchBackend:
+    """Postgres: a weighted ``tsvector`` per row with a GIN index."""
+
+    name = 'postgres'
+
+    def _table(self, kind):
+        return f'search_{kind}s'
+
+    def exists(self):
+        return db.session.execute(text('SELECT to_regclass(:name)'), {'name': self._table('post')}).scalar() is not None
+
+    def setup(self):
+        for kind in KINDS:
+            table = self._table(kind)
+            db.session.execute(text(
+                f'CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, document TSVECTOR NOT NULL)'
+            ))
+            db.session.execute(text(
+                f'CREATE INDEX IF NOT EXISTS ix_{table}_document ON {table} USING GIN (document)'
+            ))
+        db.session.commit()
+
+    def count(self, kind):
+        return db.session.execute(text(f'SELECT count(*) FROM {self._table(kind)}')).scalar()
+
+    def write(self, kind, rows):
+        rows = [{'id': ref_id, 'title': _folded(title), 'body': _folded(body)} for ref_id, title, body in rows]
+        if rows:
+            db.session.execute(text(
+                f'INSERT INTO {self._table(kind)} (id, document) VALUES ('
+                ":id, setweight(to_tsvector('simple', :title), 'A') || "
+                "setweight(to_tsvector('simple', :body), 'D')) "
+                'ON CONFLICT (id) DO UPDATE SET document = EXCLUDED.document'
+            ), rows)
+
+    def remove(self, kind, ref_id):
+        db.session.execute(text(f'DELETE FROM {self._table(kind)} WHERE id = :id'), {'id': ref_id})
+
+    def clear(self, kind):
+        db.session.execute(text(f'DELETE FROM {self._table(kind)}'))
+
+    def search(self, kind, tokens, limit):
+        query = ' & '.join(f'{token}:*' for token in tokens)
+        rows = db.session.execute(text(
+            f"SELECT id FROM {self._table(kind)}, to_tsquery('simple', :query) AS query "
+            'WHERE document @@ query ORDER BY ts_rank(document, query) DESC, id DESC LIMIT :limit'
+        ), {'query': query, 'limit': limit})
+        return [row[0] for row in rows]
+
+
+class _InvertedIndex:
+    def __init__(self):
+        self.postings = defaultdict(dict)  # term -> {ref_id: weight}
+        self.doc_terms = {}  # ref_id -> terms, for removal
+        self._vocabulary = None
+
+    def add(self, ref_id, title, body):
+        self.remove(ref_id)
+        weights = defaultdict(float)
+        for token in tokenize(title):
+            weights[token] += TITLE_WEIGHT
+        for token in tokenize(body):
+            weights[token] += BODY_WEIGHT
+        for term, weight in weights.items():
+            self.postings[term][ref_id] = weight
+        self.doc_terms[ref_id] = set(weights)
+        self._vocabulary = None
+
+    def remove(self, ref_id):
+        for term in self.doc_terms.pop(ref_id, ()):
+            postings = self.postings[term]
+            postings.pop(ref_id, None)
+            if not postings:
+                del self.postings[term]
+        self._vocabulary = None
+
+    def terms_with_prefix(self, prefix):
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        start = bisect_left(self._vocabulary, prefix)
+        for term in self._vocabulary[start:]:
+            if not term.startswith(prefix):
+                break
+            yield term
+
+    def search(self, tokens, limit):
+        total = len(self.doc_terms) or 1
+        scores = None
+        for token in tokens:
+            matches = {}
+            for term in self.terms_with_prefix(token):
+                postings = self.postings[term]
+                idf = math.log(1 + total / len(postings))
+                for ref_id, weight in postings.items():
+                    score = weight * idf
+                    if score > matches.get(ref_id, 0):
+                        matches[ref_id] = score
+            if scores is None:
+                scores = matches
+            else:
+                scores = {ref_id: scores[ref_id] + score for ref_id, score in matches.items() if ref_id in scores}
+            if not scores:
+                return []
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+        return [ref_id for ref_id, _ in best]
+
+
+class MemorySearchBackend:
+    """Per-process inverted index kept in sync through a cache version key."""
+
+    name = 'memory'
+
+    def __init__(self, cache):
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._indexes = {}
+        self._versions = {}
+
+    def _version_key(self, kind):
+        return f'search:version:{kind}'
+
+    def _bump(self, kind):
+        version = uuid.uuid4().hex
+        self.cache.set(self._version_key(kind), version, timeout=0)
+        self._versions[kind] = version
+
+    def _index(self, kind):
+        shared = self.cache.get(self._version_key(kind))
+        if kind in self._indexes and shared == self._versions.get(kind):
+            return self._indexes[kind]
+        index = _InvertedIndex()
+        for ref_id, title, body in iter_documents(kind):
+            index.add(ref_id, title, body)
+        self._indexes[kind] = index
+        if shared is None:
+            self._bump(kind)
+        else:
+            self._versions[kind] = shared
+        return index
+
+    def setup(self):
+        pass
+
+    def count(self, kind):
+        with self._lock:
+            return len(self._index(kind).doc_terms)
+
+    def write(self, kind, rows):
+        with self._lock:
+            index = self._index(kind)
+            for ref_id, title, body in rows:
+                index.add(ref_id, title, body)
+            self._bump(kind)
+
+    def remove(self, kind, ref_id):
+        with self._lock:
+            self._index(kind).remove(ref_id)
+            self._bump(kind)
+
+    def clear(self, kind):
+        with self._lock:
+            self._indexes[kind] = _InvertedIndex()
+            self._bump(kind)
+
+    def search(self, kind, tokens, limit):
+        with self._lock:
+            return self._index(kind).search(tokens, limit)
+
+
+def _index_backend(app):
+    """The database-side backend this app should use, or None for the in-memory one."""
+    choice = app.config.get('SEARCH_BACKEND', 'auto')
+    dialect = db.engine.dialect.name
+    if choice in ('auto', 'fts5') and dialect == 'sqlite':
+        return FtsSearchBackend()
+    if choice in ('auto', 'postgres') and dialect == 'postgresql':
+        return PostgresSearchBackend()
+    return None
+
+
+def rebuild_search_index(kind=None):
+    """Re-index every post/product from scratch. Returns the number of rows indexed."""
+    backend = get_search_backend()
+    total = 0
+    for current in ([kind] if kind else KINDS):
+        backend.clear(current)
+        batch = []
+        for document in iter_documents(current):
+            batch.append(document)
+            if len(batch) >= REBUILD_BATCH_SIZE:
+                backend.write(current, batch)
+                total += len(batch)
+                batch = []
+        backend.write(current, batch)
+        total += len(batch)
+    db.session.commit()
+    return total
+
+
+def create_search_index(app):
+    """Create the index tables and backfill empty ones. Runs from a migration."""
+    backend = _index_backend(app)
+    if backend is None:
+        return None
+    try:
+        backend.setup()
+    except OperationalError:
+        db.session.rollback()
+        logger.warning('SQLite was built without FTS5; using the in-memory search index')
+        return None
+    app.extensions['search'] = backend
+    for kind, (model, _, _) in KINDS.items():
+        if backend.count(kind) == 0 and db.session.query(model.id).first() is not None:
+            rebuild_search_index(kind)
+    return backend
+
+
+def init_search(app):
+    """Pick the search backend at boot: one catalog lookup, no DDL. Call inside an app context."""
+    backend = _index_backend(app)
+    if backend is None or not backend.exists():
+        backend = MemorySearchBackend(app.extensions['cache'])
+    app.extensions['search'] = backend
+    return backend
+
+
+def get_search_backend():
+    from flask import current_app
+    return current_app.extensions['search']
+
+
+def search_ids(kind, query, limit=SEARCH_RESULT_LIMIT):
+    """Ids of ``kind`` matching ``query``, best match first."""
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    return get_search_backend().search(kind, tokens, limit)
+
+
+def _index(kind, ref_id, title, body):
+    try:
+        get_search_backend().write(kind, [(ref_id, title, body)])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        logger.exception('Indexing %s %s for search failed', kind, ref_id)
+
+
+def _unindex(kind, ref_id):
+    try:
+        get_search_backend().remove(kind, ref_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        logger.exception('Removing %s %s from the search index failed', kind, ref_id)
+
+
+def index_post(post):
+    _index('post', post.id, post.title, post.content)
+
+
+def index_product(product):
+    _index('product', product.id, product.name, product.description)
+
+
+def remove_post(post_id):
+    _unindex('post', post_id)
+
+
+def remove_product(product_id):
+    _unindex('product', product_id)
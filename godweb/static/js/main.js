@@ -114,36 +114,162 @@ function updateNotificationBadge(newCount) {
 }
 
 function initializeNotificationActions() {
-    const notificationItems = document.querySelectorAll('.notification-item[data-notification-id]');
-    notificationItems.forEach(item => {
-        item.addEventListener('click', async function() {
-            const notificationId = this.dataset.notificationId;
-            if (!notificationId) {
+    const notificationMenu = document.querySelector('.notification-menu');
+    if (!notificationMenu) {
+        return;
+    }
+
+    // Delegated so items pushed by the live event stream are clickable too.
+    notificationMenu.addEventListener('click', async function(event) {
+        const item = event.target.closest('.notification-item[data-notification-id]');
+        if (!item) {
+            return;
+        }
+        const notificationId = item.dataset.notificationId;
+
+        try {
+            const response = await fetch(`/notifications/${notificationId}/read`, {
+                method: 'POST',
+                headers: {
+                    'X-Requested-With': 'XMLHttpRequest'
+                }
+            });
+
+            if (!response.ok) {
                 return;
             }
 
-            try {
-                const response = await fetch(`/notifications/${notificationId}/read`, {
-                    method: 'POST',
-                    headers: {
-                        'X-Requested-With': 'XMLHttpRequest'
-                    }
-                });
+            const result = await response.json();
+            if (result.success) {
+                item.classList.remove('unread');
+                updateNotificationBadge(result.unread_count || 0);
+            }
+        } catch (error) {
+            console.error('Notification read error:', error);
+        }
+    });
+}
 
-                if (!response.ok) {
-                    return;
-                }
+// Live updates pushed by /events (Server-Sent Events)
+const NAVBAR_NOTIFICATION_LIMIT = 12;
 
-                const result = await response.json();
-                if (result.success) {
-                    this.classList.remove('unread');
-                    updateNotificationBadge(result.unread_count || 0);
-                }
+function currentNotificationCount() {
+    const desktopBadge = document.getElementById('notificationBadge');
+    return desktopBadge ? parseInt(desktopBadge.textContent, 10) || 0 : 0;
+}
+
+function prependNotification(notification) {
+    const notificationMenu = document.querySelector('.notification-menu');
+    if (!notificationMenu || notificationMenu.querySelector(`[data-notification-id="${notification.id}"]`)) {
+        return;
+    }
+
+    const item = document.createElement('button');
+    item.type = 'button';
+    item.className = 'notification-item unread';
+    item.dataset.notificationId = String(notification.id);
+
+    const text = document.createElement('span');
+    text.className = 'notification-item-text';
+    text.textContent = notification.content;
+    const time = document.createElement('span');
+    time.className = 'notification-item-time';
+    time.textContent = notification.created_at;
+    item.append(text, time);
+
+    const empty = notificationMenu.querySelector('.notification-empty');
+    if (empty) {
+        empty.remove();
+    }
+    const header = notificationMenu.querySelector('.notification-menu-header');
+    if (header) {
+        header.after(item);
+    } else {
+        notificationMenu.prepend(item);
+    }
+
+    const items = notificationMenu.querySelectorAll('.notification-item');
+    let dropped = 0;
+    for (let i = NAVBAR_NOTIFICATION_LIMIT; i < items.length; i++) {
+        if (items[i].classList.contains('unread')) {
+            dropped++;
+        }
+        items[i].remove();
+    }
+    updateNotificationBadge(currentNotificationCount() + 1 - dropped);
+}
+
+function removeNotification(notificationId) {
+    const item = document.querySelector(`.notification-item[data-notification-id="${notificationId}"]`);
+    if (!item) {
+        return;
+    }
+    if (item.classList.contains('unread')) {
+        updateNotificationBadge(Math.max(currentNotificationCount() - 1, 0));
+    }
+    item.remove();
+}
+
+function updateStockBadges(productId, stock) {
+    document.querySelectorAll(`[data-product-stock="${productId}"]`).forEach(badge => {
+        const suffix = badge.dataset.stockSuffix || '';
+        badge.classList.toggle('in-stock', stock > 0);
+        badge.classList.toggle('out-of-stock', stock <= 0);
+        badge.innerHTML = stock > 0
+            ? `<i class="fas fa-check"></i> Còn ${stock}${suffix}`
+            : '<i class="fas fa-times"></i> Hết hàng';
+    });
+}
+
+function initializeLiveEvents() {
+    if (!window.EventSource) {
+        return;
+    }
+    // The notification menu is only rendered for logged-in users; the stream
+    // is not opened for anonymous visitors or on admin pages.
+    if (!document.querySelector('.notification-menu') || document.body.classList.contains('admin-page')) {
+        return;
+    }
+
+    let source = null;
+    let retryTimer = null;
+    const open = () => {
+        if (source || document.hidden) {
+            return;
+        }
+        // EventSource reconnects on its own and resumes from the last event id.
+        source = new EventSource('/events');
+        const listen = (name, handler) => source.addEventListener(name, event => {
+            try {
+                handler(JSON.parse(event.data));
             } catch (error) {
-                console.error('Notification read error:', error);
+                console.error('Live event error:', error);
             }
         });
-    });
+
+        listen('notification', prependNotification);
+        listen('notification_deleted', data => removeNotification(data.id));
+        listen('unread', data => updateNotificationBadge(data.count || 0));
+        listen('stock', data => updateStockBadges(data.product_id, data.stock));
+        source.onerror = () => {
+            // A 503 (server at its stream cap) closes the source for good: back off.
+            if (source && source.readyState === EventSource.CLOSED) {
+                source = null;
+                retryTimer = setTimeout(open, 30000 + Math.random() * 30000);
+            }
+        };
+    };
+    const close = () => {
+        clearTimeout(retryTimer);
+        if (source) {
+            source.close();
+            source = null;
+        }
+    };
+
+    // Background tabs give their stream slot back.
+    document.addEventListener('visibilitychange', () => (document.hidden ? close() : open()));
+    open();
 }
 
 function toggleNotificationFromMobile() {
@@ -353,6 +479,7 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     initializeNotificationActions();
+    initializeLiveEvents();
 });
 
 // Format number with commas
@@ -0,0 +1,150 @@
+"""Incrementally maintained admin dashboard counters.
+
+The dashboard used to run five ``COUNT(*)`` queries and a ``SUM`` over every
+user on each load. The numbers now live in the single ``site_stats`` row:
+code paths that create or remove counted rows call ``bump_stats`` inside their
+own transaction, so a rolled-back purchase never moves a counter.
+
+``bump_stats`` only adds to a per-session tally; the tally is written as one
+``UPDATE ... SET x = x + :delta`` from a ``before_commit`` hook, after the
+session's final flush. That statement is exact under concurrency and locks the
+row only for the commit itself, however early or often a request calls
+``bump_stats``; a rollback discards the tally.
+
+``reconcile_stats`` recounts everything in one UPDATE; it runs when the row is
+first created and, through ``get_stats``, whenever the last recount is older
+than ``STATS_RECONCILE_INTERVAL`` seconds. Only the worker that wins the
+conditional claim on ``reconciled_at`` does the recount.
+
+Run ``python -m godweb.stats`` (e.g. from a scheduler) to force a recount.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from godweb.extensions import db
+from godweb.models import Order, Post, Product, SiteStats, Topup, User
+
+logger = logging.getLogger(__name__)
+
+STATS_ID = 1
+FIELDS = ('users', 'posts', 'products', 'orders', 'pending_topups', 'total_godcoin')
+_PENDING = 'godweb.stats.pending'
+
+
+def bump_stats(**deltas):
+    """Add ``deltas`` (e.g. ``orders=2, total_godcoin=-100``) when the current transaction commits."""
+    pending = db.session.info.setdefault(_PENDING, defaultdict(int))
+    for name, delta in deltas.items():
+        pending[name] += delta
+
+
+@event.listens_for(Session, 'before_commit')
+def _write_pending(session):
+    pending = session.info.pop(_PENDING, None)
+    values = {name: getattr(SiteStats, name) + delta for name, delta in (pending or {}).items() if delta}
+    if values:
+        # Flush first so the counter row is the last one this transaction locks.
+        session.flush()
+        session.execute(
+            update(SiteStats).where(SiteStats.id == STATS_ID).values(**values),
+            execution_options={'synchronize_session': False},
+        )
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _drop_pending(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_PENDING, None)
+
+
+def _recounts():
+    def count(column, *criteria):
+        return select(func.count(column)).where(*criteria).scalar_subquery()
+
+    return {
+        'users': count(User.id),
+        'posts': count(Post.id),
+        'products': count(Product.id),
+        'orders': count(Order.id),
+        'pending_topups': count(Topup.id, Topup.status == 'pending'),
+        'total_godcoin': select(func.coalesce(func.sum(User.godcoin_balance), 0)).scalar_subquery(),
+    }
+
+
+def _read():
+    row = db.session.execute(
+        select(*(getattr(SiteStats, name) for name in FIELDS), SiteStats.reconciled_at)
+        .where(SiteStats.id == STATS_ID)
+    ).mappings().first()
+    return dict(row) if row is not None else None
+
+
+def reconcile_stats():
+    """Recount every counter from the source tables and commit.
+
+    Returns ``{field: correction}`` for the counters that had drifted.
+    """
+    before = _read()
+    if before is None:
+        try:
+            db.session.add(SiteStats(id=STATS_ID))
+            db.session.flush()
+        except IntegrityError:
+            # Another worker created the row first.
+            db.session.rollback()
+    db.session.execute(
+        update(SiteStats).where(SiteStats.id == STATS_ID)
+        .values(reconciled_at=datetime.utcnow(), **_recounts()),
+        execution_options={'synchronize_session': False},
+    )
+    after = _read()
+    db.session.commit()
+    if before is None:
+        return {}
+    drift = {name: after[name] - before[name] for name in FIELDS if after[name] != before[name]}
+    if drift:
+        logger.warning('Dashboard stats drifted; corrected by %s', drift)
+    return drift
+
+
+def ensure_stats():
+    """Create and fill the stats row if it does not exist yet."""
+    if _read() is None:
+        reconcile_stats()
+
+
+def _claim_reconcile(cutoff):
+    claimed = db.session.execute(
+        update(SiteStats)
+        .where(SiteStats.id == STATS_ID)
+        .where(or_(SiteStats.reconciled_at.is_(None), SiteStats.reconciled_at < cutoff))
+        .values(reconciled_at=datetime.utcnow()),
+        execution_options={'synchronize_session': False},
+    ).rowcount
+    db.session.commit()
+    return claimed == 1
+
+
+def get_stats():
+    """The dashboard counters, recounted first if the last recount is stale."""
+    row = _read()
+    interval = current_app.config.get('STATS_RECONCILE_INTERVAL', 3600)
+    cutoff = datetime.utcnow() - timedelta(seconds=interval)
+    if row is None or row['reconciled_at'] is None or row['reconciled_at'] < cutoff:
+        if row is None or _claim_reconcile(cutoff):
+            reconcile_stats()
+            row = _read()
+    return {name: row[name] for name in FIELDS}
+
+
+if __name__ == '__main__':
+    from godweb.app import app
+
+    with app.app_context():
+        print(reconcile_stats() or 'Dashboard stats are in sync')
@@ -0,0 +1,122 @@
+"""Template compilation: shared bytecode cache, release-time precompile, warmup.
+
+``JINJA_CACHE_DIR`` (on by default in production) points Jinja at a
+filesystem bytecode cache shared by every worker on the dyno: a template is
+compiled to Python bytecode once and every other worker, and every later
+boot, only unmarshals it. Entries are keyed by template name and validated
+against the source checksum, so a stale entry is simply recompiled and the
+cache survives the slug being moved from the build directory to ``/app``.
+
+``python -m godweb.templating [DIR]`` fills the cache for every template; run it at
+build/release time (``bin/post_compile`` on Heroku) so even the first worker
+after a deploy never compiles. It needs no real database.
+
+``warm_pages`` then renders the hot public pages once against in-memory model
+objects -- no queries -- so the first real request also finds the URL map,
+filters and context processors warmed up. Gunicorn calls both at boot (see
+``godweb.gunicorn_conf``).
+"""
+import hashlib
+import logging
+import os
+import sys
+from datetime import datetime
+
+from flask import render_template
+from jinja2 import FileSystemBytecodeCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.jinja-cache')
+
+
+class _NameKeyedBytecodeCache(FileSystemBytecodeCache):
+    """Key entries by template name only, not by absolute source path."""
+
+    def get_cache_key(self, name, filename=None):
+        return hashlib.sha1(name.encode('utf-8')).hexdigest()
+
+
+def init_templating(app):
+    cache_dir = app.config.get('JINJA_CACHE_DIR')
+    if not cache_dir:
+        return
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError as exc:
+        logger.warning('Jinja bytecode cache disabled, cannot create %s: %s', cache_dir, exc)
+        return
+    app.jinja_env.bytecode_cache = _NameKeyedBytecodeCache(cache_dir)
+
+
+def warm_templates(app):
+    """Compile every template into the Jinja cache. Returns how many were loaded.
+
+    Run in the gunicorn master before forking (``preload_app``), the compiled
+    templates are shared copy-on-write by every worker and no request pays
+    for the first compile. With a bytecode cache attached this also writes
+    (or reuses) the on-disk entries.
+    """
+    env = app.jinja_env
+    loaded = 0
+    for name in env.list_templates(extensions=('html',)):
+        try:
+            env.get_template(name)
+            loaded += 1
+        except Exception:
+            logger.exception('Pre-compiling template %s failed', name)
+    return loaded
+
+
+def _page_fixture():
+    """(template, context) for each hot page, built from transient models."""
+    from godweb.models import Category, Comment, Post, Product, User
+    from godweb.pagination import KeysetPage
+
+    now = datetime.utcnow()
+    author = User(id=1, username='warmup', email='warmup@example.invalid', role='user', created_at=now)
+    category = Category(id=1, name='Warmup', created_at=now)
+    post = Post(
+        id=1, title='Warmup', content='<p>Warmup</p>', excerpt='<p>Warmup</p>', author_id=author.id,
+        author=author, category=category, views=0, is_premium=False, premium_price=0, pin_priority=0,
+        created_at=now, updated_at=now,
+    )
+    product = Product(id=1, name='Warmup', description='Warmup', price=1, stock=1, sold_count=0, created_at=now)
+    comment = Comment(id=1, content='Warmup', author=author, author_id=author.id, post_id=post.id, created_at=now)
+    return [
+        ('home.html', {'posts': [post], 'products': [product]}),
+        ('store/index.html', {'products': KeysetPage([product], 12), 'search': ''}),
+        ('blog/index.html', {
+            'posts': KeysetPage([post], 9), 'categories': [category], 'current_category': None,
+            'search': '', 'current_type': 'free',
+        }),
+        ('blog/detail.html', {'post': post, 'views': 1, 'has_access': True, 'comments': [comment]}),
+    ]
+
+
+def warm_pages(app):
+    """Render the hot public pages once, as an anonymous visitor. Returns how many rendered."""
+    rendered = 0
+    with app.test_request_context('/'):
+        for template, context in _page_fixture():
+            try:
+                render_template(template, **context)
+                rendered += 1
+            except Exception:
+                logger.exception('Warming %s failed', template)
+    return rendered
+
+
+if __name__ == '__main__':
+    # Compiling needs the app's Jinja environment (filters, globals), not its
+    # data: build it against a throwaway in-memory database, even when the
+    # build environment has the real DATABASE_URL, and skip the schema step.
+    os.environ['DATABASE_URL'] = 'sqlite://'
+    os.environ['SCHEMA_ON_BOOT'] = 'off'
+    if len(sys.argv) > 1:
+        os.environ['JINJA_CACHE_DIR'] = sys.argv[1]
+    os.environ.setdefault('JINJA_CACHE_DIR', DEFAULT_CACHE_DIR)
+    from godweb.app import app
+
+    count = warm_templates(app)
+    print(f'{count} templates compiled into {app.config["JINJA_CACHE_DIR"]}')
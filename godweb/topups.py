@@ -0,0 +1,203 @@
+"""Topup approval in bulk and bank/MoMo statement matching.
+
+``approve_topups`` / ``reject_topups`` process any number of pending topups
+in the caller's transaction: pending rows are claimed with one conditional
+``UPDATE ... WHERE status = 'pending'`` per chunk (so a topup approved twice,
+by a double click or two admins, is credited once) and the wallets are
+credited with ``godweb.wallet.credit_many``. Neither commits.
+
+``match_statement`` reads a statement CSV exported from the bank or MoMo and
+pairs each incoming transfer with a pending topup of the same user and amount.
+The user comes from the transfer memo, which the topup page asks for as
+``GOD<user id>``. Pending topups are loaded once into a dict keyed by
+``(user_id, amount)``, so matching is a dict lookup per line and a 50k-line
+statement is matched in well under a second.
+
+A line's bank reference is stored on the topup it approves
+(``Topup.bank_reference``, unique), and lines whose reference is already
+stored are skipped, so uploading the same or an overlapping statement again
+approves nothing twice. Lines without a reference column cannot be told apart.
+"""
+import codecs
+import csv
+import re
+from collections import defaultdict, deque
+from datetime import datetime
+
+from sqlalchemy import bindparam, select, update
+
+from godweb.extensions import db
+from godweb.models import Topup
+from godweb.stats import bump_stats
+from godweb.wallet import credit_many
+
+_CHUNK = 1000
+
+MEMO_PATTERN = re.compile(r'GOD\s*(\d+)', re.IGNORECASE)
+
+# Header names seen in bank/MoMo exports, lower-cased.
+AMOUNT_COLUMNS = ('amount', 'credit', 'so tien', 'số tiền', 'so_tien', 'ghi có', 'ghi co')
+MEMO_COLUMNS = ('memo', 'description', 'content', 'noi dung', 'nội dung', 'noi_dung', 'diễn giải', 'dien giai')
+REFERENCE_COLUMNS = ('reference', 'ref', 'transaction_id', 'mã gd', 'ma gd', 'số tham chiếu', 'so tham chieu')
+
+
+def _claim(topup_ids, status):
+    """Move the still-pending topups among ``topup_ids`` to ``status``; returns the claimed rows."""
+    now = datetime.utcnow()
+    ids = sorted(set(topup_ids))
+    returning = db.session.get_bind().dialect.update_returning
+    claimed = []
+    for offset in range(0, len(ids), _CHUNK):
+        chunk = ids[offset:offset + _CHUNK]
+        stmt = (
+            update(Topup)
+            .where(Topup.id.in_(chunk), Topup.status == 'pending')
+            .values(status=status, processed_at=now)
+        )
+        options = {'synchronize_session': False}
+        if returning:
+            claimed.extend(db.session.execute(
+                stmt.returning(Topup.id, Topup.user_id, Topup.godcoin_amount, Topup.method),
+                execution_options=options,
+            ).all())
+        else:
+            db.session.execute(stmt, execution_options=options)
+            claimed.extend(db.session.execute(
+                select(Topup.id, Topup.user_id, Topup.godcoin_amount, Topup.method)
+                .where(Topup.id.in_(chunk), Topup.status == status, Topup.processed_at == now)
+            ).all())
+    return sorted(claimed)
+
+
+def approve_topups(topup_ids, references=None):
+    """Approve and credit the pending topups among ``topup_ids``. Returns the approved rows.
+
+    ``references`` maps topup ids to the bank reference of the statement line
+    that paid them; it is recorded on the approved ones.
+    """
+    claimed = _claim(topup_ids, 'approved')
+    if claimed and references:
+        topups = Topup.__table__
+        rows = [{'t_id': row.id, 't_reference': references[row.id]} for row in claimed if references.get(row.id)]
+        if rows:
+            db.session.execute(
+                topups.update().where(topups.c.id == bindparam('t_id')).values(bank_reference=bindparam('t_reference')),
+                rows,
+            )
+    if claimed:
+        credit_many(
+            [(row.user_id, row.godcoin_amount, f'Nạp GodCoin qua {row.method.upper()}') for row in claimed],
+            'topup',
+        )
+        bump_stats(pending_topups=-len(claimed))
+    return claimed
+
+
+def reject_topups(topup_ids):
+    """Reject the pending topups among ``topup_ids``. Returns how many were rejected."""
+    claimed = _claim(topup_ids, 'rejected')
+    if claimed:
+        bump_stats(pending_topups=-len(claimed))
+    return len(claimed)
+
+
+def parse_amount(value):
+    """``'1,000,000'``, ``'1.000.000 VND'`` or ``'+50000'`` -> int; None if not a positive amount."""
+    value = (value or '').strip()
+    if value.startswith('-'):
+        return None
+    # Banks use both ',' and '.' as thousands separators; drop a trailing decimal part.
+    value = re.sub(r'[.,]\d{1,2}$', '', value)
+    digits = re.sub(r'\D', '', value)
+    return int(digits) if digits and int(digits) > 0 else None
+
+
+def _column(fieldnames, aliases):
+    for name in fieldnames:
+        if name and name.strip().lower() in aliases:
+            return name
+    return None
+
+
+class StatementMatch:
+    """Result of matching one statement: topup ids to approve and lines left over."""
+
+    def __init__(self):
+        self.lines = 0
+        self.matched = []    # (line number, topup id)
+        self.unmatched = []  # (line number, amount, memo, reason)
+        self.references = {}  # topup id -> bank reference of its line
+
+
+def _pending_index(method=None):
+    """``{(user_id, amount): deque of pending topup ids, oldest first}``."""
+    query = select(Topup.id, Topup.user_id, Topup.amount).where(Topup.status == 'pending')
+    if method:
+        query = query.where(Topup.method == method)
+    index = defaultdict(deque)
+    for topup_id, user_id, amount in db.session.execute(query.order_by(Topup.created_at, Topup.id)):
+        index[(user_id, amount)].append(topup_id)
+    return index
+
+
+def _consumed_references(references):
+    """The ones among ``references`` already recorded on an approved topup."""
+    references = sorted(references)
+    consumed = set()
+    for offset in range(0, len(references), _CHUNK):
+        chunk = references[offset:offset + _CHUNK]
+        consumed.update(db.session.execute(select(Topup.bank_reference).where(Topup.bank_reference.in_(chunk))).scalars())
+    return consumed
+
+
+def match_statement(stream, method=None):
+    """Match the lines of a statement CSV (binary stream) against pending topups.
+
+    Raises ValueError when the file has no recognisable amount/memo columns.
+    """
+    reader = csv.DictReader(codecs.iterdecode(stream, 'utf-8-sig'))
+    fieldnames = reader.fieldnames or []
+    amount_column = _column(fieldnames, AMOUNT_COLUMNS)
+    memo_column = _column(fieldnames, MEMO_COLUMNS)
+    reference_column = _column(fieldnames, REFERENCE_COLUMNS)
+    if not amount_column or not memo_column:
+        raise ValueError('Không tìm thấy cột số tiền / nội dung trong file sao kê')
+
+    rows = list(reader)
+    consumed = set()
+    if reference_column:
+        consumed = _consumed_references(
+            {reference for reference in ((row.get(reference_column) or '').strip() for row in rows) if reference}
+        )
+    index = _pending_index(method)
+    seen_references = set()
+    result = StatementMatch()
+    for line_number, row in enumerate(rows, start=2):
+        result.lines += 1
+        memo = (row.get(memo_column) or '').strip()
+        amount = parse_amount(row.get(amount_column))
+        if amount is None:
+            result.unmatched.append((line_number, row.get(amount_column), memo, 'Không phải khoản tiền vào'))
+            continue
+        reference = (row.get(reference_column) or '').strip() if reference_column else ''
+        if reference:
+            if reference in consumed:
+                result.unmatched.append((line_number, amount, memo, 'Mã giao dịch đã được duyệt trước đó'))
+                continue
+            if reference in seen_references:
+                result.unmatched.append((line_number, amount, memo, 'Trùng mã giao dịch'))
+                continue
+            seen_references.add(reference)
+        found = MEMO_PATTERN.search(memo)
+        if not found:
+            result.unmatched.append((line_number, amount, memo, 'Nội dung không có mã GOD<ID>'))
+            continue
+        candidates = index.get((int(found.group(1)), amount))
+        if not candidates:
+            result.unmatched.append((line_number, amount, memo, 'Không có yêu cầu chờ duyệt khớp'))
+            continue
+        topup_id = candidates.popleft()
+        result.matched.append((line_number, topup_id))
+        if reference:
+            result.references[topup_id] = reference
+    return result
@@ -1,18 +1,35 @@
 import os
 import shutil
-import zipfile
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import islice
 from werkzeug.utils import secure_filename
 
 # Check if Cloudinary is configured
 CLOUDINARY_URL = os.environ.get('CLOUDINARY_URL')
 
-if CLOUDINARY_URL:
-    import cloudinary
-    import cloudinary.uploader
-    # Cloudinary is auto-configured from CLOUDINARY_URL environment variable
-    cloudinary.config(secure=True)
+_cloudinary_uploader = None
+
+
+def _get_cloudinary_uploader():
+    """Import and configure cloudinary on the first upload, not at boot.
+
+    The SDK (and the HTTP stack it pulls in) is only needed by admin uploads,
+    so every worker would otherwise pay for it on every cold start.
+    """
+    global _cloudinary_uploader
+    if _cloudinary_uploader is None:
+        import cloudinary
+        import cloudinary.uploader
+        # Cloudinary is auto-configured from CLOUDINARY_URL environment variable
+        cloudinary.config(secure=True)
+        _cloudinary_uploader = cloudinary.uploader
+    return _cloudinary_uploader
+
+# Zip inventory import: decompression threads and members read per round.
+ZIP_READ_WORKERS = 4
+ZIP_READ_CHUNK = 256
 
 def upload_image(file, folder='godweb'):
     """
@@ -42,7 +59,7 @@ def upload_image(file, folder='godweb'):
     if CLOUDINARY_URL:
         # Upload to Cloudinary
         try:
-            result = cloudinary.uploader.upload(
+            result = _get_cloudinary_uploader().upload(
                 file,
                 folder=folder,
                 resource_type='image',
@@ -149,45 +166,69 @@ def serialize_inventory_accounts(accounts, parse_mode='line'):
     return '\n'.join(accounts)
 
 
-def parse_zip_to_accounts(uploaded_file):
-    """Parse a .zip into list of (filename, content) tuples for DB storage.
+def _zip_txt_members(archive):
+    """Yield (safe_name, ZipInfo) for every importable .txt member of ``archive``."""
+    for item in archive.infolist():
+        if item.is_dir():
+            continue
+        raw_name = item.filename.replace('\\', '/')
+        normalized_parts = [part for part in raw_name.split('/') if part and part != '.']
+        # Prevent zip-slip and unsupported paths.
+        if not normalized_parts or '..' in normalized_parts:
+            continue
+        original_name = normalized_parts[-1]
+        if not original_name.lower().endswith('.txt'):
+            continue
+        safe_name = secure_filename(original_name)
+        if not safe_name:
+            continue
+        yield safe_name, item
+
+
+def iter_zip_accounts(uploaded_file, workers=ZIP_READ_WORKERS, chunk_size=ZIP_READ_CHUNK):
+    """Lazily yield (filename, content) accounts from an inventory .zip.
 
-    Mirrors extract_inventory_zip but never writes to disk; returned filenames
-    are sanitized and de-duplicated. Raises ValueError on invalid input.
+    Members are decompressed ``chunk_size`` at a time on a small thread pool
+    (zlib releases the GIL), so memory stays bounded by one chunk no matter how
+    many files the archive holds. Filenames are sanitized and de-duplicated in
+    archive order. Raises ValueError if the upload is not a zip.
     """
+    import zipfile
+
     try:
         archive = zipfile.ZipFile(uploaded_file)
     except zipfile.BadZipFile as exc:
         raise ValueError('File upload không phải zip hợp lệ') from exc
 
-    accounts = []
     used_names = set()
-    with archive:
-        for item in archive.infolist():
-            if item.is_dir():
-                continue
-            raw_name = item.filename.replace('\\', '/')
-            normalized_parts = [part for part in raw_name.split('/') if part and part != '.']
-            if not normalized_parts or '..' in normalized_parts:
-                continue
-            original_name = normalized_parts[-1]
-            if not original_name.lower().endswith('.txt'):
-                continue
-            safe_name = secure_filename(original_name)
-            if not safe_name:
-                continue
-            base, ext = os.path.splitext(safe_name)
-            candidate = safe_name
-            suffix = 1
-            while candidate.lower() in used_names:
-                candidate = f"{base}_{suffix}{ext}"
-                suffix += 1
-            file_text = archive.read(item).decode('utf-8-sig', errors='replace').strip()
-            if not file_text:
-                continue
-            used_names.add(candidate.lower())
-            accounts.append((candidate, file_text))
+    with archive, ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        members = _zip_txt_members(archive)
+        while True:
+            chunk = list(islice(members, chunk_size))
+            if not chunk:
+                break
+            contents = pool.map(archive.read, [item for _, item in chunk])
+            for (safe_name, _), file_bytes in zip(chunk, contents):
+                file_text = file_bytes.decode('utf-8-sig', errors='replace').strip()
+                if not file_text:
+                    continue
+                base, ext = os.path.splitext(safe_name)
+                candidate = safe_name
+                suffix = 1
+                while candidate.lower() in used_names:
+                    candidate = f"{base}_{suffix}{ext}"
+                    suffix += 1
+                used_names.add(candidate.lower())
+                yield candidate, file_text
+
 
+def parse_zip_to_accounts(uploaded_file):
+    """Parse a .zip into list of (filename, content) tuples for DB storage.
+
+    Prefer ``iter_zip_accounts`` for large archives; this materializes every
+    account in memory. Raises ValueError on invalid input.
+    """
+    accounts = list(iter_zip_accounts(uploaded_file))
     if not accounts:
         raise ValueError('File zip không chứa tài khoản .txt hợp lệ')
     return accounts
@@ -278,6 +319,8 @@ def extract_inventory_zip(uploaded_file, upload_folder, product_id):
     Extract a zip containing .txt account files into a per-product folder.
     Returns (folder_name, files_count).
     """
+    import zipfile
+
     folder_name = f"inventory_folder_{product_id}"
     target_folder = os.path.join(upload_folder, folder_name)
 
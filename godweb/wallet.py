@@ -0,0 +1,160 @@
+"""GodCoin balance changes.
+
+Every path that moves money goes through ``debit`` / ``credit``. A debit is a
+single conditional statement::
+
+    UPDATE users SET godcoin_balance = godcoin_balance - :amount
+    WHERE id = :user_id AND godcoin_balance >= :amount
+    RETURNING godcoin_balance
+
+so the balance check and the write happen atomically in the database without
+a prior ``SELECT ... FOR UPDATE``; the row is locked only from this statement
+to the caller's commit. The matching ``Transaction`` row is added to the same
+session and is written in the same flush as the caller's other rows; it
+records the returned balance as ``balance_after`` (see ``godweb.ledger``).
+
+Neither function commits: the caller does, so a failure later in the request
+rolls the balance change back together with everything else. The
+``total_godcoin`` dashboard counter is bumped at that commit, once per
+transaction (``godweb.stats``), not per call.
+
+``credit_many`` is the batch form for admin bulk actions: per 1,000 users, one
+``UPDATE users ... FROM (VALUES ...)`` join returning the new balances, then
+one bulk INSERT of all the ledger rows.
+"""
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import Integer, bindparam, column, func, insert, select, update, values
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+
+from godweb.extensions import db
+from godweb.models import Transaction, User
+from godweb.stats import bump_stats
+
+
+# Legacy rows may hold NULL; treat it as an empty wallet.
+_BALANCE = func.coalesce(User.godcoin_balance, 0)
+
+# Keeps IN lists well under every engine's bound-parameter limit.
+_CHUNK = 1000
+
+
+def _apply(user_id, delta, *criteria):
+    stmt = (
+        update(User)
+        .where(User.id == user_id, *criteria)
+        .values(godcoin_balance=_BALANCE + delta)
+    )
+    options = {'synchronize_session': False}
+    if db.session.get_bind().dialect.update_returning:
+        balance = db.session.execute(stmt.returning(User.godcoin_balance), execution_options=options).scalar()
+    else:
+        if db.session.execute(stmt, execution_options=options).rowcount != 1:
+            return None
+        balance = db.session.execute(select(User.godcoin_balance).where(User.id == user_id)).scalar()
+    if balance is None:
+        return None
+
+    # Keep an already-loaded User (e.g. current_user) in step without a reload.
+    loaded = db.session.identity_map.get(identity_key(User, user_id))
+    if loaded is not None:
+        set_committed_value(loaded, 'godcoin_balance', balance)
+    bump_stats(total_godcoin=delta)
+    return balance
+
+
+def _record(user_id, amount, type, description, balance_after):
+    transaction = Transaction(
+        user_id=user_id, type=type, amount=amount, description=description, balance_after=balance_after,
+    )
+    db.session.add(transaction)
+    return transaction
+
+
+def debit(user_id, amount, type, description):
+    """Take ``amount`` GodCoin from the user if they have it.
+
+    Returns the new balance, or None when the balance is too low (or the user
+    does not exist); nothing is changed in that case.
+    """
+    balance = _apply(user_id, -amount, _BALANCE >= amount)
+    if balance is not None:
+        _record(user_id, -amount, type, description, balance)
+    return balance
+
+
+def credit(user_id, amount, type, description):
+    """Give ``amount`` GodCoin to the user. Returns the new balance, or None if there is no such user."""
+    balance = _apply(user_id, amount)
+    if balance is not None:
+        _record(user_id, amount, type, description, balance)
+    return balance
+
+
+def _apply_many(deltas):
+    """Add ``[(user_id, delta)]`` onto the balances; returns ``{user_id: new balance}``."""
+    bind = db.session.get_bind()
+    options = {'synchronize_session': False}
+    if bind.dialect.name in ('postgresql', 'sqlite'):
+        # WITH deltas(b_id, b_delta) AS (VALUES ...) UPDATE users ... FROM deltas
+        rows = values(column('b_id', Integer), column('b_delta', Integer), name='deltas').data(deltas).cte('deltas')
+        stmt = update(User).add_cte(rows).where(User.id == rows.c.b_id).values(godcoin_balance=_BALANCE + rows.c.b_delta)
+        if bind.dialect.update_returning:
+            return dict(db.session.execute(stmt.returning(User.id, User.godcoin_balance), execution_options=options).all())
+        db.session.execute(stmt, execution_options=options)
+    else:
+        users = User.__table__
+        db.session.execute(
+            users.update()
+            .where(users.c.id == bindparam('b_id'))
+            .values(godcoin_balance=func.coalesce(users.c.godcoin_balance, 0) + bindparam('b_delta')),
+            [{'b_id': user_id, 'b_delta': delta} for user_id, delta in deltas],
+        )
+    ids = [user_id for user_id, _ in deltas]
+    return dict(db.session.execute(select(User.id, User.godcoin_balance).where(User.id.in_(ids))).all())
+
+
+def credit_many(entries, type):
+    """Credit ``(user_id, amount, description)`` entries in a few set-based statements.
+
+    A user may appear more than once; each entry gets its own ledger row with
+    its running ``balance_after``. Returns ``{user_id: new balance}``; entries
+    for users that no longer exist are skipped.
+    """
+    entries = [entry for entry in entries if entry[1]]
+    totals = defaultdict(int)
+    for user_id, amount, _ in entries:
+        totals[user_id] += amount
+    if not totals:
+        return {}
+
+    balances = {}
+    items = list(totals.items())
+    for offset in range(0, len(items), _CHUNK):
+        balances.update(_apply_many(items[offset:offset + _CHUNK]))
+
+    # Walk each user's entries backwards from the final balance.
+    running = dict(balances)
+    rows = []
+    for user_id, amount, description in reversed(entries):
+        if user_id not in running:
+            continue
+        rows.append({
+            'user_id': user_id, 'type': type, 'amount': amount,
+            'description': description, 'balance_after': running[user_id],
+        })
+        running[user_id] -= amount
+    if rows:
+        now = datetime.utcnow()
+        for row in rows:
+            row['created_at'] = now
+        db.session.execute(insert(Transaction), rows[::-1])
+
+    for user_id, balance in balances.items():
+        loaded = db.session.identity_map.get(identity_key(User, user_id))
+        if loaded is not None:
+            set_committed_value(loaded, 'godcoin_balance', balance)
+    bump_stats(total_godcoin=sum(totals[user_id] for user_id in balances))
+    return balances
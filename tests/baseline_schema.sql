@@ -0,0 +1,152 @@
+-- Schema of the baseline release (before versioned migrations), as created by
+-- its db.create_all() on SQLite. Used to test upgrades of real databases.
+
+CREATE TABLE users (
+	id INTEGER NOT NULL,
+	username VARCHAR(80) NOT NULL,
+	email VARCHAR(120) NOT NULL,
+	password_hash VARCHAR(255) NOT NULL,
+	role VARCHAR(20),
+	godcoin_balance INTEGER,
+	avatar VARCHAR(255),
+	recovery_number VARCHAR(20),
+	created_at DATETIME,
+	PRIMARY KEY (id),
+	UNIQUE (username),
+	UNIQUE (email)
+);
+
+CREATE TABLE categories (
+	id INTEGER NOT NULL,
+	name VARCHAR(100) NOT NULL,
+	description TEXT,
+	created_at DATETIME,
+	PRIMARY KEY (id),
+	UNIQUE (name)
+);
+
+CREATE TABLE products (
+	id INTEGER NOT NULL,
+	name VARCHAR(200) NOT NULL,
+	description TEXT,
+	price INTEGER NOT NULL,
+	image VARCHAR(255),
+	stock INTEGER,
+	sold_count INTEGER,
+	inventory_file VARCHAR(255),
+	parse_mode VARCHAR(20) NOT NULL,
+	inventory_type VARCHAR(20) NOT NULL,
+	inventory_folder_path VARCHAR(255),
+	inventory_data TEXT,
+	created_at DATETIME,
+	PRIMARY KEY (id)
+);
+
+CREATE TABLE posts (
+	id INTEGER NOT NULL,
+	title VARCHAR(200) NOT NULL,
+	content TEXT NOT NULL,
+	thumbnail VARCHAR(255),
+	is_premium BOOLEAN,
+	premium_price INTEGER,
+	author_id INTEGER NOT NULL,
+	category_id INTEGER,
+	views INTEGER,
+	pin_priority INTEGER,
+	pinned_by VARCHAR(20),
+	created_at DATETIME,
+	updated_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(author_id) REFERENCES users (id),
+	FOREIGN KEY(category_id) REFERENCES categories (id)
+);
+
+CREATE TABLE product_inventory_accounts (
+	id INTEGER NOT NULL,
+	product_id INTEGER NOT NULL,
+	filename VARCHAR(255) NOT NULL,
+	content TEXT NOT NULL,
+	created_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(product_id) REFERENCES products (id) ON DELETE CASCADE
+);
+
+CREATE INDEX ix_product_inventory_accounts_product_id ON product_inventory_accounts (product_id);
+
+CREATE TABLE orders (
+	id INTEGER NOT NULL,
+	user_id INTEGER NOT NULL,
+	product_id INTEGER NOT NULL,
+	account_info TEXT NOT NULL,
+	price INTEGER NOT NULL,
+	created_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES users (id),
+	FOREIGN KEY(product_id) REFERENCES products (id)
+);
+
+CREATE TABLE transactions (
+	id INTEGER NOT NULL,
+	user_id INTEGER NOT NULL,
+	type VARCHAR(50) NOT NULL,
+	amount INTEGER NOT NULL,
+	description VARCHAR(255),
+	created_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE topups (
+	id INTEGER NOT NULL,
+	user_id INTEGER NOT NULL,
+	amount INTEGER NOT NULL,
+	godcoin_amount INTEGER NOT NULL,
+	method VARCHAR(50) NOT NULL,
+	status VARCHAR(20),
+	created_at DATETIME,
+	processed_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE notifications (
+	id INTEGER NOT NULL,
+	content VARCHAR(255) NOT NULL,
+	created_by INTEGER NOT NULL,
+	created_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(created_by) REFERENCES users (id)
+);
+
+CREATE TABLE comments (
+	id INTEGER NOT NULL,
+	content TEXT NOT NULL,
+	author_id INTEGER NOT NULL,
+	post_id INTEGER NOT NULL,
+	created_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(author_id) REFERENCES users (id),
+	FOREIGN KEY(post_id) REFERENCES posts (id)
+);
+
+CREATE TABLE post_purchases (
+	id INTEGER NOT NULL,
+	user_id INTEGER NOT NULL,
+	post_id INTEGER NOT NULL,
+	price INTEGER NOT NULL,
+	created_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES users (id),
+	FOREIGN KEY(post_id) REFERENCES posts (id)
+);
+
+CREATE TABLE notification_reads (
+	id INTEGER NOT NULL,
+	user_id INTEGER NOT NULL,
+	notification_id INTEGER NOT NULL,
+	read_at DATETIME,
+	PRIMARY KEY (id),
+	CONSTRAINT uq_notification_read_user_notification UNIQUE (user_id, notification_id),
+	FOREIGN KEY(user_id) REFERENCES users (id),
+	FOREIGN KEY(notification_id) REFERENCES notifications (id)
+);
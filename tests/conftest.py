@@ -4,6 +4,7 @@ from __future__ import annotations
 import os
 import re
 import tempfile
+from contextlib import contextmanager
 
 import pytest
 
@@ -52,6 +53,32 @@ def extract_csrf_token(html: str) -> str:
     return match.group(1)
 
 
+@contextmanager
+def query_budget(app, limit):
+    """Fail if the block runs more than ``limit`` SQL statements.
+
+    Yields the list of captured statements so tests can compare runs.
+    """
+    from sqlalchemy import event
+
+    from godweb.extensions import db
+    with app.app_context():
+        engine = db.engine
+    statements = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+    assert len(statements) <= limit, (
+        f'{len(statements)} queries, budget is {limit}:\n' + '\n'.join(statements)
+    )
+
+
 @pytest.fixture()
 def csrf_token(client):
     """Fetch a fresh CSRF token by hitting the login form."""
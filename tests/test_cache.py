@@ -0,0 +1,47 @@
+"""Shared cache backends."""
+from __future__ import annotations
+
+import time
+
+from godweb.cache import FileSystemCache, SimpleCache
+
+
+def test_filesystem_cache_is_shared_between_instances(tmp_path):
+    worker_a = FileSystemCache(str(tmp_path), namespace='db1')
+    worker_b = FileSystemCache(str(tmp_path), namespace='db1')
+    other_db = FileSystemCache(str(tmp_path), namespace='db2')
+
+    worker_a.set('key', {'value': 1})
+    assert worker_b.get('key') == {'value': 1}
+    assert other_db.get('key') is None
+
+    worker_b.delete('key')
+    assert worker_a.get('key') is None
+
+
+def test_cache_entries_expire():
+    cache = SimpleCache()
+    cache.set('short', 'x', timeout=0.01)
+    cache.set('forever', 'y', timeout=0)
+    time.sleep(0.02)
+    assert cache.get('short') is None
+    assert cache.get('forever') == 'y'
+    assert cache.get_or_set('short', lambda: 'z') == 'z'
+    assert cache.get('short') == 'z'
+
+
+def test_caches_sweep_expired_then_soonest_expiring_entries(tmp_path):
+    shared = FileSystemCache(str(tmp_path), threshold=4)
+    shared.SWEEP_EVERY = 1  # count the directory on every write
+    for cache in (SimpleCache(threshold=4), shared):
+        cache.set('token', 'kept', timeout=0)
+        cache.set('stale', 'x', timeout=0.01)
+        time.sleep(0.02)
+        for index in range(4):
+            cache.set(f'page{index}', index, timeout=60 + index)
+
+        assert cache.get('token') == 'kept'
+        assert cache.get('stale') is None
+        assert cache.get('page0') is None  # closest to expiry
+        assert [cache.get(f'page{index}') for index in (1, 2, 3)] == [1, 2, 3]
+    assert len(list(tmp_path.iterdir())) == 4
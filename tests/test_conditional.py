@@ -0,0 +1,126 @@
+"""Conditional GET (ETag / Last-Modified) on catalog and blog pages."""
+from __future__ import annotations
+
+from contextlib import contextmanager
+
+from flask import template_rendered
+
+from tests.test_purchase import _create_user, _login
+
+
+@contextmanager
+def _rendered(app):
+    templates = []
+
+    def record(sender, template, context, **extra):
+        templates.append(template.name)
+
+    template_rendered.connect(record, app)
+    try:
+        yield templates
+    finally:
+        template_rendered.disconnect(record, app)
+
+
+def _create_post(app, **kwargs):
+    from godweb.extensions import db
+    from godweb.models import Post, User
+    with app.app_context():
+        author = User.query.filter_by(username='author').first()
+        if author is None:
+            author = User(username='author', email='author@example.com', recovery_number='0000')
+            author.set_password('pass-1234')
+            db.session.add(author)
+            db.session.flush()
+        post = Post(title='Post', content='<p>body</p>', author_id=author.id, **kwargs)
+        db.session.add(post)
+        db.session.commit()
+        return post.id
+
+
+def _create_product(app):
+    from godweb.extensions import db
+    from godweb.models import Product
+    with app.app_context():
+        product = Product(name='Product', description='test', price=10, stock=3)
+        db.session.add(product)
+        db.session.commit()
+        assert product.updated_at is not None
+        return product.id
+
+
+def test_matching_etag_returns_304_without_rendering(app, client):
+    from godweb.view_counter import get_view_counter
+
+    post_id = _create_post(app)
+    first = client.get(f'/blog/{post_id}')
+    etag = first.headers['ETag']
+    assert etag.startswith('W/')
+    assert first.headers['Last-Modified']
+    assert first.headers['Cache-Control'] == 'no-cache'
+
+    with _rendered(app) as templates:
+        second = client.get(f'/blog/{post_id}', headers={'If-None-Match': etag})
+        by_date = client.get(f'/blog/{post_id}', headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert second.status_code == 304
+    assert by_date.status_code == 304
+    assert second.data == b''
+    assert templates == []
+    # The visit still counts.
+    assert get_view_counter(app).pending(post_id) == 3
+
+
+def test_etag_changes_with_content_not_with_views(app, client):
+    from godweb.extensions import db
+    from godweb.models import Post
+    from godweb.view_counter import get_view_counter
+
+    post_id = _create_post(app)
+    etag = client.get('/blog/').headers['ETag']
+    client.get(f'/blog/{post_id}')
+    assert get_view_counter(app).flush() == 1
+    assert client.get('/blog/', headers={'If-None-Match': etag}).status_code == 304
+
+    with app.app_context():
+        db.session.get(Post, post_id).title = 'Edited'
+        db.session.commit()
+    assert client.get('/blog/', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_store_pages_revalidate_on_stock_change(app, client):
+    from godweb.extensions import db
+    from godweb.models import Product
+
+    product_id = _create_product(app)
+    detail = client.get(f'/store/{product_id}').headers['ETag']
+    listing = client.get('/store/').headers['ETag']
+    assert client.get(f'/store/{product_id}', headers={'If-None-Match': detail}).status_code == 304
+    assert client.get('/store/', headers={'If-None-Match': listing}).status_code == 304
+
+    with app.app_context():
+        db.session.get(Product, product_id).stock = 2
+        db.session.commit()
+    assert client.get(f'/store/{product_id}', headers={'If-None-Match': detail}).status_code == 200
+    assert client.get('/store/', headers={'If-None-Match': listing}).status_code == 200
+
+
+def test_etag_depends_on_visitor(app, client):
+    product_id = _create_product(app)
+    anonymous = client.get(f'/store/{product_id}').headers['ETag']
+
+    _create_user(app)
+    _login(client, 'buyer@example.com', 'pass-1234')
+    response = client.get(f'/store/{product_id}', headers={'If-None-Match': anonymous})
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+    assert 'Cookie' in response.headers['Vary']
+
+
+def test_locked_premium_post_stays_no_store(app, client):
+    post_id = _create_post(app, is_premium=True, premium_price=10)
+    first = client.get(f'/blog/{post_id}')
+    assert first.headers['Cache-Control'] == 'private, no-store, max-age=0'
+
+    second = client.get(f'/blog/{post_id}', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 304
+    assert second.headers['Cache-Control'] == 'private, no-store, max-age=0'
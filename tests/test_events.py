@@ -0,0 +1,114 @@
+"""Server-Sent Events stream for notifications and stock changes."""
+from __future__ import annotations
+
+import json
+
+from tests.conftest import extract_csrf_token
+from tests.test_purchase import _create_product, _create_user, _login
+
+
+def _short_streams(app):
+    app.config.update(SSE_MAX_DURATION=0.3, SSE_KEEPALIVE=0.1)
+    app.extensions['event_broker'].poll_interval = 0.02
+
+
+def _read_events(client, last_event_id=0):
+    resp = client.get('/events', headers={'Last-Event-ID': str(last_event_id)})
+    assert resp.status_code == 200
+    assert resp.mimetype == 'text/event-stream'
+    events = []
+    for frame in resp.get_data(as_text=True).split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in frame.splitlines() if not line.startswith(':'))
+        if 'event' in fields:
+            events.append((int(fields['id']), fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def test_purchase_pushes_stock_change(app, client):
+    _short_streams(app)
+    _create_user(app)
+    product_id = _create_product(app, app.config['UPLOAD_FOLDER'], ['a|1', 'b|2', 'c|3'])
+    _login(client, 'buyer@example.com', 'pass-1234')
+
+    token = extract_csrf_token(client.get(f'/store/{product_id}').data.decode('utf-8'))
+    assert client.post(f'/store/{product_id}/buy', data={'csrf_token': token}).status_code == 302
+
+    events = _read_events(client)
+    assert [(name, data) for _, name, data in events] == [('stock', {'product_id': product_id, 'stock': 2})]
+
+    # Reconnecting with the last seen id does not replay it.
+    assert _read_events(client, last_event_id=events[-1][0]) == []
+
+
+def test_user_events_only_reach_that_user(app, client):
+    from godweb.events import publish, user_channel
+    from godweb.extensions import db
+    _short_streams(app)
+    user_id = _create_user(app)
+    with app.app_context():
+        publish('unread', {'count': 3}, channel=user_channel(user_id))
+        publish('unread', {'count': 9}, channel=user_channel(user_id + 1))
+        publish('notification_deleted', {'id': 1})
+        db.session.commit()
+
+    # Anonymous visitors get no stream at all.
+    assert client.get('/events').status_code == 204
+
+    _login(client, 'buyer@example.com', 'pass-1234')
+    events = _read_events(client)
+    assert [(name, data) for _, name, data in events] == [
+        ('unread', {'count': 3}),
+        ('notification_deleted', {'id': 1}),
+    ]
+    assert app.extensions['event_broker'].subscriber_count() == 0
+
+
+def test_stream_cap_answers_503_with_retry_hint(app, client):
+    _short_streams(app)
+    _create_user(app)
+    _login(client, 'buyer@example.com', 'pass-1234')
+    broker = app.extensions['event_broker']
+    broker.max_streams = 1
+    held = broker.subscribe(['global'], 0)
+    try:
+        resp = client.get('/events')
+        assert resp.status_code == 503
+        assert resp.headers['Retry-After'] == '30'
+        assert resp.get_data(as_text=True) == 'retry: 30000\n\n'
+    finally:
+        broker.unsubscribe(held)
+    assert client.get('/events').status_code == 200
+
+
+def test_late_commit_below_delivered_id_is_still_sent(app):
+    from datetime import datetime, timedelta
+
+    from godweb.events import EventBroker, Subscription
+    from godweb.extensions import db
+    from godweb.models import ServerEvent
+    # Polled by hand: no background thread racing the assertions.
+    broker = EventBroker(app, settle=5)
+    subscription = Subscription(['global'], 0)
+    broker._subscribers.add(subscription)
+    with app.app_context():
+        db.session.add(ServerEvent(id=2, event='stock', data='{}'))
+        db.session.commit()
+    broker.poll()
+    # Id 1 was allocated earlier but its transaction committed later.
+    with app.app_context():
+        db.session.add(ServerEvent(id=1, event='stock', data='{}'))
+        db.session.commit()
+    broker.poll()
+    broker.poll()
+    frames = [subscription.queue.get_nowait() for _ in range(subscription.queue.qsize())]
+    assert [frame.split('\n', 1)[0] for frame in frames] == ['id: 2', 'id: 1']
+    assert subscription.last_id == 0
+
+    with app.app_context():
+        old = datetime.utcnow() - timedelta(seconds=broker.settle + 1)
+        db.session.query(ServerEvent).update({ServerEvent.created_at: old})
+        db.session.commit()
+    broker.poll()
+    assert subscription.last_id == 2
+    assert subscription.sent == set()
+    assert subscription.queue.empty()
@@ -0,0 +1,57 @@
+"""CSV bulk GodCoin grants."""
+from __future__ import annotations
+
+import io
+
+from tests.test_purchase import _create_user
+from tests.test_topups import _admin_client
+
+
+def _upload(client, token, text, filename='khuyen-mai.csv'):
+    data = {'csrf_token': token, 'grants': (io.BytesIO(text.encode('utf-8')), filename)}
+    return client.post('/admin/users/grants', data=data, content_type='multipart/form-data')
+
+
+def test_grant_file_is_applied_once(app, client):
+    from godweb.extensions import db
+    from godweb.models import GrantBatch, Transaction, User
+    token = _admin_client(app, client)
+    alice = _create_user(app, email='alice@example.com', username='alice', godcoin_balance=1)
+    bob = _create_user(app, email='bob@example.com', username='bob', godcoin_balance=0)
+    text = f'user_id,amount,description\n{alice},10,Tết\n{bob},5\n{alice},3,Tết bonus\n'
+
+    assert _upload(client, token, text).status_code == 200
+    retried = _upload(client, token, text, filename='copy.csv')
+    assert 'không cộng lại' in retried.data.decode('utf-8')
+
+    with app.app_context():
+        assert db.session.get(User, alice).godcoin_balance == 14
+        assert db.session.get(User, bob).godcoin_balance == 5
+        ledger = Transaction.query.filter_by(user_id=alice).order_by(Transaction.id).all()
+        assert [(t.amount, t.balance_after, t.description) for t in ledger] == [(10, 11, 'Tết'), (3, 14, 'Tết bonus')]
+        batch = GrantBatch.query.one()
+        assert (batch.rows, batch.users, batch.total) == (3, 2, 18)
+
+
+def test_invalid_rows_reject_the_whole_batch(app, client):
+    from godweb.extensions import db
+    from godweb.models import GrantBatch, Transaction, User
+    token = _admin_client(app, client)
+    alice = _create_user(app, email='alice@example.com', username='alice', godcoin_balance=0)
+
+    rows = [
+        f'{alice},10', '99999,5', f'{alice},-3', f'{alice},²', f'{alice},5000000',
+        '99999999999999999999999,5', f'{alice},1_000', f'{alice}," +5"',
+    ]
+    body = _upload(client, token, '\n'.join(rows) + '\n').data.decode('utf-8')
+    assert 'Không tìm thấy người dùng #99999' in body
+    assert 'Số GodCoin không hợp lệ: -3' in body
+    assert 'Số GodCoin không hợp lệ: ²' in body
+    assert 'vượt quá giới hạn' in body
+    assert 'User ID không hợp lệ: 99999999999999999999999' in body
+    assert 'Số GodCoin không hợp lệ: 1_000' in body
+    assert 'Số GodCoin không hợp lệ: +5' in body
+    with app.app_context():
+        assert db.session.get(User, alice).godcoin_balance == 0
+        assert Transaction.query.count() == 0
+        assert GrantBatch.query.count() == 0
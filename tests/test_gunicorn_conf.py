@@ -0,0 +1,40 @@
+"""Gunicorn configuration and template warm-up."""
+from __future__ import annotations
+
+import importlib
+
+
+def _load_conf(monkeypatch, **env):
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    import godweb.gunicorn_conf
+    return importlib.reload(godweb.gunicorn_conf)
+
+
+def test_warm_templates_compiles_every_template(app):
+    from godweb.templating import warm_templates
+
+    names = app.jinja_env.list_templates(extensions=('html',))
+    assert warm_templates(app) == len(names)
+    assert app.jinja_env.cache is not None
+    assert len(app.jinja_env.cache) >= min(len(names), app.jinja_env.cache.capacity)
+
+
+def test_worker_class_defaults_to_gthread(monkeypatch):
+    monkeypatch.delenv('GUNICORN_WORKER_CLASS', raising=False)
+    conf = _load_conf(monkeypatch, PRELOAD_APP='1', WEB_CONCURRENCY='3')
+    assert conf.worker_class == 'gthread'
+    assert conf.preload_app is True
+    assert conf.workers == 3
+
+
+def test_gevent_falls_back_when_not_installed(monkeypatch):
+    import importlib.util
+    real_find_spec = importlib.util.find_spec
+    monkeypatch.setattr(
+        importlib.util, 'find_spec',
+        lambda name, *args: None if name == 'gevent' else real_find_spec(name, *args),
+    )
+    conf = _load_conf(monkeypatch, GUNICORN_WORKER_CLASS='gevent', PRELOAD_APP='0')
+    assert conf.worker_class == 'gthread'
+    assert conf.preload_app is False
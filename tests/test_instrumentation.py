@@ -0,0 +1,68 @@
+"""Opt-in per-request SQL/template instrumentation."""
+from __future__ import annotations
+
+import re
+
+from tests.conftest import extract_csrf_token
+from tests.test_purchase import _create_user, _login
+
+
+def _instrumented_app(app, monkeypatch):
+    from godweb.app import create_app
+    monkeypatch.setenv('PERF_INSTRUMENTATION', '1')
+    instrumented = create_app()
+    instrumented.config.update(TESTING=True, UPLOAD_FOLDER=app.config['UPLOAD_FOLDER'])
+    return instrumented
+
+
+def test_disabled_by_default(app, client):
+    assert 'instrumentation' not in app.extensions
+    assert 'Server-Timing' not in client.get('/auth/login').headers
+
+
+def test_server_timing_and_endpoint_stats(app, monkeypatch):
+    _create_user(app, email='admin@example.com', username='admin')
+    with app.app_context():
+        from godweb.extensions import db
+        from godweb.models import User
+        User.query.filter_by(email='admin@example.com').update({'role': 'admin'})
+        db.session.commit()
+
+    instrumented = _instrumented_app(app, monkeypatch)
+    client = instrumented.test_client()
+    _login(client, 'admin@example.com', 'pass-1234')
+
+    timing = client.get('/wallet/transactions').headers['Server-Timing']
+    match = re.match(r'db;dur=[\d.]+;desc="(\d+) queries", tpl;dur=[\d.]+;desc="templates", app;dur=[\d.]+', timing)
+    assert match and int(match.group(1)) >= 2  # user load + the listing
+
+    page = client.get('/admin/performance').data.decode('utf-8')
+    assert 'wallet.transactions' in page
+
+    token = extract_csrf_token(page)
+    client.post('/admin/performance/reset', data={'csrf_token': token})
+    with instrumented.app_context():
+        endpoints = [row['endpoint'] for row in instrumented.extensions['instrumentation'].endpoint_stats()]
+    assert endpoints == ['admin.reset_performance']
+
+
+
+def test_failed_statements_leave_nothing_on_the_connection(app, monkeypatch):
+    import pytest
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+
+    from godweb.extensions import db
+    instrumented = _instrumented_app(app, monkeypatch)
+    with instrumented.test_request_context('/'):
+        instrumented.preprocess_request()
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                db.session.execute(text('SELECT * FROM no_such_table'))
+            db.session.rollback()
+        connection = db.session.connection()
+        connection.execute(text('SELECT 1'))
+        # Pooled connections live for the whole process: nothing may pile up on them.
+        assert not connection.info.get('perf_started')
+        from flask import g
+        assert g.perf_stats.queries == 1
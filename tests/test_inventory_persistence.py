@@ -32,7 +32,7 @@ def _create_buyer(app, balance=200):
 def test_buy_succeeds_when_inventory_file_missing_on_disk(app, client, tmp_path):
     """The whole point of the fix: even if /uploads is wiped, DB content serves the buyer."""
     from godweb.extensions import db
-    from godweb.models import Product, User, Order
+    from godweb.models import Product, ProductInventoryAccount, User, Order
 
     _create_buyer(app)
     with app.app_context():
@@ -68,8 +68,10 @@ def test_buy_succeeds_when_inventory_file_missing_on_disk(app, client, tmp_path)
         assert order is not None
         assert order.account_info == 'acct-A@example.com|passA'
         assert product.stock == 1
-        # Remaining inventory still in DB after consumption.
-        assert 'acct-B@example.com|passB' in (product.inventory_data or '')
+        # Remaining inventory still in DB after consumption, now as one row per account.
+        remaining = ProductInventoryAccount.query.filter_by(product_id=product_id).all()
+        assert [row.content for row in remaining] == ['acct-B@example.com|passB']
+        assert product.inventory_data is None
         assert User.query.filter_by(email='buyer@example.com').first().godcoin_balance == 150
 
 
@@ -117,9 +119,9 @@ def test_buy_succeeds_for_folder_inventory_when_disk_wiped(app, client):
 
 
 def test_admin_upload_persists_txt_inventory_to_db(app, client):
-    """Uploading a .txt via admin must populate Product.inventory_data."""
+    """Uploading a .txt via admin must persist one inventory row per account."""
     from godweb.extensions import db
-    from godweb.models import User, Product
+    from godweb.models import User, Product, ProductInventoryAccount
 
     with app.app_context():
         admin = User(username='adm', email='adm@example.com', role='admin', recovery_number='0000')
@@ -149,10 +151,21 @@ def test_admin_upload_persists_txt_inventory_to_db(app, client):
     with app.app_context():
         product = Product.query.get(product_id)
         assert product.inventory_type == 'file'
-        assert product.inventory_data is not None
-        assert 'acct1@x|p1' in product.inventory_data
+        rows = (
+            ProductInventoryAccount.query
+            .filter_by(product_id=product_id)
+            .order_by(ProductInventoryAccount.filename)
+            .all()
+        )
+        assert [r.content for r in rows] == ['acct1@x|p1', 'acct2@x|p2', 'acct3@x|p3']
         assert product.stock == 3
 
+    # View and download rebuild the remaining text from the rows.
+    view = client.get(f'/admin/products/{product_id}/view-file')
+    assert b'acct2@x|p2' in view.data
+    download = client.get(f'/admin/products/{product_id}/download-file')
+    assert download.data.decode('utf-8') == 'acct1@x|p1\nacct2@x|p2\nacct3@x|p3'
+
 
 def test_admin_upload_persists_zip_inventory_to_db(app, client):
     """Uploading a .zip via admin must populate ProductInventoryAccount rows."""
@@ -196,3 +209,173 @@ def test_admin_upload_persists_zip_inventory_to_db(app, client):
         assert [r.filename for r in rows] == ['alpha.txt', 'beta.txt']
         assert rows[0].content == 'acct-alpha@x|pa'
         assert product.stock == 2
+
+
+def test_legacy_inventory_blob_migrated_on_boot(app, monkeypatch):
+    """Existing inventory_data blobs are split into rows by the boot migration."""
+    from godweb.app import create_app
+    from godweb.extensions import db
+    from godweb.models import Product, ProductInventoryAccount, SchemaVersion
+
+    with app.app_context():
+        product = Product(
+            name='Legacy',
+            description='pre-row storage',
+            price=10,
+            stock=2,
+            inventory_file='inventory_legacy.txt',
+            inventory_data='first\nline\n|\nsecond',
+            parse_mode='separator',
+            inventory_type='file',
+        )
+        db.session.add(product)
+        # A database from before versioned migrations.
+        SchemaVersion.query.delete()
+        db.session.commit()
+        product_id = product.id
+
+    # Same DATABASE_URL: a second boot simulates the next deploy.
+    rebooted = create_app()
+    with rebooted.app_context():
+        product = db.session.get(Product, product_id)
+        assert product.inventory_data is None
+        assert product.stock == 2
+        rows = (
+            ProductInventoryAccount.query
+            .filter_by(product_id=product_id)
+            .order_by(ProductInventoryAccount.filename, ProductInventoryAccount.id)
+            .all()
+        )
+        assert [r.content for r in rows] == ['first\nline', 'second']
+
+
+def test_legacy_inventory_migrated_when_upgrading_a_baseline_database(app, tmp_path, monkeypatch):
+    """The real upgrade path: a pre-series products table, then every migration."""
+    from godweb.extensions import db
+    from godweb.migrations import migrate
+    from godweb.models import Product, ProductInventoryAccount
+    from tests.test_migrations import baseline_app
+
+    legacy = baseline_app(tmp_path, monkeypatch, seed=[
+        "INSERT INTO products (id, name, price, stock, parse_mode, inventory_type, inventory_data) "
+        "VALUES (1, 'Blob', 10, 2, 'separator', 'file', 'first\nline\n|\nsecond')",
+        "INSERT INTO products (id, name, price, stock, parse_mode, inventory_type, inventory_file) "
+        "VALUES (2, 'File', 10, 3, 'line', 'file', 'inventory_old.txt')",
+    ])
+    with open(os.path.join(legacy.config['UPLOAD_FOLDER'], 'inventory_old.txt'), 'w', encoding='utf-8') as fh:
+        fh.write('a|1\nb|2\nc|3\n')
+
+    with legacy.app_context():
+        migrate()
+        contents = {
+            product_id: [row.content for row in (
+                ProductInventoryAccount.query.filter_by(product_id=product_id)
+                .order_by(ProductInventoryAccount.filename, ProductInventoryAccount.id)
+            )]
+            for product_id in (1, 2)
+        }
+        assert contents == {1: ['first\nline', 'second'], 2: ['a|1', 'b|2', 'c|3']}
+        blob = db.session.get(Product, 1)
+        assert blob.inventory_data is None and blob.stock == 2
+        assert db.session.get(Product, 2).stock == 3
+
+
+def test_iter_zip_accounts_streams_sanitized_unique_names():
+    from godweb.utils import iter_zip_accounts
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('a.txt', 'first')
+        zf.writestr('nested/a.txt', 'second')
+        zf.writestr('empty.txt', '   ')
+        zf.writestr('../escape.txt', 'zip-slip')
+        zf.writestr('notes.md', 'ignored')
+        for i in range(600):  # spans several read chunks
+            zf.writestr(f'bulk/{i:04d}.txt', f'acct-{i}')
+    buf.seek(0)
+
+    accounts = iter_zip_accounts(buf, workers=2, chunk_size=64)
+    assert next(accounts) == ('a.txt', 'first')
+    rest = list(accounts)
+    assert rest[0] == ('a_1.txt', 'second')
+    assert len(rest) == 601
+    assert all('escape' not in name and 'empty' not in name for name, _ in rest)
+
+
+def test_zip_upload_reports_import_throughput(app, client):
+    from godweb.extensions import db
+    from godweb.models import User, Product
+
+    with app.app_context():
+        admin = User(username='adm', email='adm@example.com', role='admin', recovery_number='0000')
+        admin.set_password('pass-1234')
+        db.session.add(admin)
+        product = Product(name='Z', description='z', price=10, stock=0)
+        db.session.add(product)
+        db.session.commit()
+        product_id = product.id
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as zf:
+        for i in range(2500):  # more than one insert batch
+            zf.writestr(f'{i:05d}.txt', f'acct-{i}')
+    buf.seek(0)
+
+    _login(client, 'adm@example.com', 'pass-1234')
+    token = extract_csrf_token(client.get(f'/admin/products/{product_id}/inventory').data.decode('utf-8'))
+    resp = client.post(
+        f'/admin/products/{product_id}/inventory',
+        data={'csrf_token': token, 'inventory_file': (buf, 'inv.zip')},
+        content_type='multipart/form-data',
+    )
+    assert resp.status_code == 200
+    assert 'tk/s' in resp.data.decode('utf-8')
+
+    with app.app_context():
+        assert db.session.get(Product, product_id).stock == 2500
+
+
+def test_folder_inventory_download_streams_valid_zip(app, client):
+    from godweb.extensions import db
+    from godweb.models import User, Product, ProductInventoryAccount
+
+    with app.app_context():
+        admin = User(username='adm', email='adm@example.com', role='admin', recovery_number='0000')
+        admin.set_password('pass-1234')
+        db.session.add(admin)
+        product = Product(name='Zip Dl', price=10, stock=3, inventory_type='folder')
+        db.session.add(product)
+        db.session.flush()
+        for i in range(3):
+            db.session.add(ProductInventoryAccount(product_id=product.id, filename=f'{i}.txt', content=f'acct-{i}'))
+        db.session.commit()
+        product_id = product.id
+
+    _login(client, 'adm@example.com', 'pass-1234')
+    resp = client.get(f'/admin/products/{product_id}/download-file')
+    assert resp.status_code == 200
+    assert resp.is_streamed
+    assert 'Zip_Dl_inventory.zip' in resp.headers['Content-Disposition']
+
+    with zipfile.ZipFile(io.BytesIO(resp.data)) as archive:
+        assert archive.namelist() == ['0.txt', '1.txt', '2.txt']
+        assert archive.read('2.txt') == b'acct-2'
+
+
+def test_file_inventory_chunks_match_serialized_text(app):
+    from godweb.extensions import db
+    from godweb.inventory import iter_file_inventory_chunks, store_file_inventory
+    from godweb.models import Product
+    from godweb.utils import serialize_inventory_accounts
+
+    accounts = [f'block-{i}\nline two' for i in range(500)]
+    with app.app_context():
+        product = Product(name='Chunks', price=1, inventory_file='chunks.txt')
+        db.session.add(product)
+        db.session.flush()
+        store_file_inventory(product, serialize_inventory_accounts(accounts, 'separator'), 'separator')
+        db.session.commit()
+
+        chunks = list(iter_file_inventory_chunks(product, chunk_size=1024))
+        assert len(chunks) > 1
+        assert ''.join(chunks) == serialize_inventory_accounts(accounts, 'separator')
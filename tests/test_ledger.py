@@ -0,0 +1,95 @@
+"""Ledger snapshots, statements and reconciliation."""
+from __future__ import annotations
+
+from datetime import datetime
+
+from tests.test_purchase import _create_user, _login
+
+
+def _entry(user_id, amount, created_at, balance_after=None):
+    from godweb.extensions import db
+    from godweb.models import Transaction
+    db.session.add(Transaction(
+        user_id=user_id, type='admin_add' if amount > 0 else 'admin_subtract', amount=amount,
+        description='legacy', balance_after=balance_after, created_at=created_at,
+    ))
+    db.session.commit()
+
+
+def test_statement_from_snapshot_plus_legacy_entries(app):
+    from godweb.extensions import db
+    from godweb.ledger import balance_at, reconcile_ledger, statement, take_snapshots
+    from godweb.models import BalanceSnapshot, User
+    from godweb.wallet import credit, debit
+
+    user_id = _create_user(app, godcoin_balance=0)
+    with app.app_context():
+        # Pre-ledger history: balance moved without balance_after.
+        _entry(user_id, 50, datetime(2026, 1, 5))
+        _entry(user_id, -20, datetime(2026, 1, 20))
+        db.session.get(User, user_id).godcoin_balance = 30
+        db.session.commit()
+        assert take_snapshots(now=datetime(2026, 2, 1)) >= 1
+        assert take_snapshots(now=datetime(2026, 2, 2)) == 0  # nothing moved
+        snapshot = BalanceSnapshot.query.filter_by(user_id=user_id).one()
+        assert snapshot.balance == 30
+
+        _entry(user_id, 5, datetime(2026, 2, 10))  # legacy entry after the snapshot
+        db.session.get(User, user_id).godcoin_balance = 35
+        db.session.commit()
+
+        assert balance_at(user_id, datetime(2026, 1, 10)) == 50
+        assert balance_at(user_id, datetime(2026, 2, 15)) == 35
+
+        # New entries carry balance_after.
+        assert credit(user_id, 100, 'admin_add', 'gift') == 135
+        assert debit(user_id, 35, 'purchase', 'buy') == 100
+        db.session.commit()
+        assert balance_at(user_id, datetime.utcnow().replace(year=9999)) == 100
+
+        report = statement(user_id, datetime(2026, 2, 1), datetime(2026, 3, 1))
+        assert (report['opening'], report['credits'], report['debits'], report['closing']) == (30, 5, 0, 35)
+        assert [entry.amount for entry in report['entries']] == [5]
+        assert reconcile_ledger()['mismatches'] == []
+
+
+def test_reconcile_flags_tampered_balance(app):
+    from godweb.extensions import db
+    from godweb.ledger import reconcile_ledger, take_snapshots
+    from godweb.models import User
+    from godweb.wallet import credit
+
+    user_id = _create_user(app, godcoin_balance=0)
+    with app.app_context():
+        take_snapshots()
+        credit(user_id, 40, 'admin_add', 'gift')
+        db.session.commit()
+        assert reconcile_ledger()['mismatches'] == []
+
+        db.session.get(User, user_id).godcoin_balance = 1000  # bypasses the wallet
+        db.session.commit()
+        result = reconcile_ledger()
+        assert result['mismatches'] == [(user_id, 1000, 40)]
+        assert result['stored_total'] - result['expected_total'] == 960
+
+
+def test_statement_page(app, client):
+    from godweb.extensions import db
+    from godweb.wallet import credit
+
+    user_id = _create_user(app, godcoin_balance=0)
+    with app.app_context():
+        credit(user_id, 25, 'admin_add', 'Quà tặng')
+        db.session.commit()
+    _login(client, 'buyer@example.com', 'pass-1234')
+
+    response = client.get('/wallet/statement')
+    assert response.status_code == 200
+    body = response.data.decode('utf-8')
+    assert 'Quà tặng' in body
+    assert '25 GC' in body
+
+    # The last representable day is still a valid range end.
+    response = client.get('/wallet/statement?start=2020-01-01&end=9999-12-31')
+    assert response.status_code == 200
+    assert 'Quà tặng' in response.data.decode('utf-8')
@@ -0,0 +1,123 @@
+"""Versioned migrations and the boot-time schema check."""
+from __future__ import annotations
+
+import os
+import sqlite3
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+def test_boot_on_current_schema_runs_no_ddl(app):
+    from godweb.app import create_app
+    from godweb.migrations import current_version, latest_version
+
+    with app.app_context():
+        assert current_version() == latest_version()
+
+    statements = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement.strip().split()[0].upper())
+
+    event.listen(Engine, 'before_cursor_execute', capture)
+    try:
+        create_app()
+    finally:
+        event.remove(Engine, 'before_cursor_execute', capture)
+    assert 'ALTER' not in statements
+    assert 'CREATE' not in statements
+    assert 'UPDATE' not in statements
+    assert statements.count('SELECT') <= 10
+
+
+def test_outdated_schema_is_refused_or_migrated(app, monkeypatch):
+    from godweb.app import create_app
+    from godweb.extensions import db
+    from godweb.migrations import current_version, latest_version, migrate
+    from godweb.models import SchemaVersion
+
+    with app.app_context():
+        SchemaVersion.query.filter(SchemaVersion.version > 2).delete()
+        db.session.commit()
+
+    monkeypatch.setenv('SCHEMA_ON_BOOT', 'check')
+    with pytest.raises(RuntimeError, match='python -m godweb.migrations'):
+        create_app()
+
+    monkeypatch.setenv('SCHEMA_ON_BOOT', 'off')
+    release = create_app()
+    with release.app_context():
+        assert migrate() == list(range(3, latest_version() + 1))
+        assert migrate() == []
+        assert current_version() == latest_version()
+
+
+BASELINE_SCHEMA = os.path.join(os.path.dirname(__file__), 'baseline_schema.sql')
+
+
+def baseline_app(tmp_path, monkeypatch, seed=()):
+    """An app on a database created by the pre-migrations release, not yet migrated.
+
+    ``seed`` statements run right after the schema, e.g. to add legacy rows.
+    """
+    from godweb.app import create_app
+
+    path = tmp_path / 'baseline.db'
+    connection = sqlite3.connect(path)
+    with open(BASELINE_SCHEMA, encoding='utf-8') as fh:
+        connection.executescript(fh.read())
+    for statement in seed:
+        connection.execute(statement)
+    connection.commit()
+    connection.close()
+
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{path}')
+    monkeypatch.setenv('SCHEMA_ON_BOOT', 'off')
+    upload_dir = tmp_path / 'baseline-uploads'
+    upload_dir.mkdir()
+    app = create_app()
+    app.config.update(TESTING=True, UPLOAD_FOLDER=str(upload_dir))
+    return app
+
+
+def test_baseline_database_migrates_to_the_current_schema(app, tmp_path, monkeypatch):
+    from sqlalchemy import inspect
+
+    from godweb.extensions import db
+    from godweb.migrations import latest_version, migrate
+
+    with app.app_context():
+        inspector = inspect(db.engine)
+        expected = {table: {column['name'] for column in inspector.get_columns(table)}
+                    for table in inspector.get_table_names() if not table.startswith('search_')}
+
+    legacy = baseline_app(tmp_path, monkeypatch, seed=[
+        "INSERT INTO users (id, username, email, password_hash, role, godcoin_balance) "
+        "VALUES (1, 'old', 'old@example.com', 'x', 'user', 40)",
+    ])
+    with legacy.app_context():
+        assert migrate() == list(range(1, latest_version() + 1))
+        inspector = inspect(db.engine)
+        for table, columns in expected.items():
+            assert {column['name'] for column in inspector.get_columns(table)} == columns, table
+
+
+def test_failed_migration_is_not_recorded(app, monkeypatch):
+    from godweb import migrations
+    from godweb.extensions import db
+    from godweb.models import SchemaVersion
+
+    def broken():
+        raise RuntimeError('boom')
+
+    with app.app_context():
+        SchemaVersion.query.filter(SchemaVersion.version >= 4).delete()
+        db.session.commit()
+        monkeypatch.setattr(migrations, 'MIGRATIONS', [
+            (version, name, broken if version == 4 else fn) for version, name, fn in migrations.MIGRATIONS
+        ])
+        with pytest.raises(RuntimeError, match='boom'):
+            migrations.migrate()
+        assert migrations.current_version() == 3
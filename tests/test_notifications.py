@@ -0,0 +1,133 @@
+"""Watermark-based notification read state."""
+from __future__ import annotations
+
+from tests.conftest import extract_csrf_token
+
+
+def _seed(app, count=5):
+    from godweb.extensions import db
+    from godweb.models import Notification, User
+    with app.app_context():
+        user = User(username='reader', email='reader@example.com', recovery_number='0000')
+        user.set_password('pass-1234')
+        db.session.add(user)
+        db.session.flush()
+        notifications = [Notification(content=f'news {i}', created_by=user.id) for i in range(count)]
+        db.session.add_all(notifications)
+        db.session.commit()
+        return user.id, [n.id for n in notifications]
+
+
+def _login(client):
+    token = extract_csrf_token(client.get('/auth/login').data.decode('utf-8'))
+    resp = client.post('/auth/login', data={'email': 'reader@example.com', 'password': 'pass-1234', 'csrf_token': token})
+    assert resp.status_code == 302
+    return token
+
+
+def test_out_of_order_reads_compact_into_watermark(app, client):
+    from godweb.models import NotificationReadState
+    user_id, ids = _seed(app)
+    token = _login(client)
+
+    def read(notification_id):
+        resp = client.post(f'/notifications/{notification_id}/read', headers={'X-CSRFToken': token})
+        assert resp.status_code == 200
+        return resp.get_json()['unread_count']
+
+    assert read(ids[2]) == 4
+    assert read(ids[1]) == 3
+    with app.app_context():
+        state = NotificationReadState.query.get(user_id)
+        assert state.last_read_id == 0
+        assert state.read_ids == f'{ids[1]},{ids[2]}'
+
+    # Reading the oldest closes the gap: the watermark jumps over 1 and 2.
+    assert read(ids[0]) == 2
+    assert read(ids[0]) == 2  # idempotent
+    with app.app_context():
+        state = NotificationReadState.query.get(user_id)
+        assert state.last_read_id == ids[2]
+        assert state.read_ids == ''
+
+    page = client.get('/about').data.decode('utf-8')
+    assert page.count('notification-item unread') == 2
+
+
+def test_watermark_skips_notifications_out_of_the_navbar(app, client):
+    from godweb.models import NotificationReadState
+    from godweb.notifications import NAVBAR_NOTIFICATION_LIMIT
+    user_id, ids = _seed(app, count=NAVBAR_NOTIFICATION_LIMIT + 2)
+    token = _login(client)
+
+    # The two oldest never show up in the navbar, so they can never be read.
+    for notification_id in reversed(ids[2:]):
+        client.post(f'/notifications/{notification_id}/read', headers={'X-CSRFToken': token})
+    with app.app_context():
+        state = NotificationReadState.query.get(user_id)
+        assert state.last_read_id == ids[-1]
+        assert state.read_ids == ''
+
+
+def test_legacy_notification_reads_are_migrated(app):
+    from godweb.app import create_app
+    from godweb.extensions import db
+    from godweb.models import NotificationRead, NotificationReadState, SchemaVersion
+    from godweb.notifications import load_read_state
+
+    user_id, ids = _seed(app)
+    with app.app_context():
+        for notification_id in (ids[0], ids[1], ids[3]):
+            db.session.add(NotificationRead(user_id=user_id, notification_id=notification_id))
+        # A database from before versioned migrations.
+        SchemaVersion.query.delete()
+        db.session.commit()
+
+    rebooted = create_app()
+    with rebooted.app_context():
+        assert NotificationRead.query.count() == 0
+        row = NotificationReadState.query.get(user_id)
+        assert row.last_read_id == ids[1]
+        assert row.read_ids == str(ids[3])
+        state = load_read_state(user_id)
+        assert [state.is_read(i) for i in ids] == [True, True, False, True, False]
+
+
+def test_navbar_payload_is_cached_until_invalidated(app, client):
+    from sqlalchemy import event
+    from godweb.extensions import db
+
+    user_id, ids = _seed(app, count=3)
+    token = _login(client)
+    client.get('/about')  # warm the cache
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        page = client.get('/about').data.decode('utf-8')
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    # Only Flask-Login's user loader touches the DB.
+    assert [s for s in statements if 'notification' in s] == []
+    assert page.count('notification-item unread') == 3
+
+    # Reading refreshes the cached state; the next render reflects it.
+    client.post(f'/notifications/{ids[0]}/read', headers={'X-CSRFToken': token})
+    assert client.get('/about').data.decode('utf-8').count('notification-item unread') == 2
+
+    # An admin-created notification bumps the list version.
+    from godweb.models import User
+    with app.app_context():
+        db.session.get(User, user_id).role = 'admin'
+        db.session.commit()
+    client.post('/admin/notifications', data={'content': 'fresh news', 'csrf_token': token})
+    page = client.get('/about').data.decode('utf-8')
+    assert 'fresh news' in page
+    assert page.count('notification-item unread') == 3
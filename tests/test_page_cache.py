@@ -0,0 +1,132 @@
+"""Anonymous full-page microcache."""
+from __future__ import annotations
+
+import threading
+import time
+
+from tests.conftest import extract_csrf_token, query_budget
+
+
+def _enable(app, ttl=60):
+    app.extensions['page_cache'].ttl = ttl
+
+
+def _create_post(app):
+    from godweb.extensions import db
+    from godweb.models import Post, User
+    with app.app_context():
+        author = User(username='author', email='author@example.com', recovery_number='0000')
+        author.set_password('pass-1234')
+        db.session.add(author)
+        db.session.flush()
+        post = Post(title='Cached post', content='<p>body</p>', author_id=author.id)
+        db.session.add(post)
+        db.session.commit()
+        return post.id
+
+
+def _create_product(app, accounts):
+    from godweb.extensions import db
+    from godweb.models import Product
+    with app.app_context():
+        product = Product(name='Cached product', description='test', price=10, stock=len(accounts),
+                          inventory_file='inv.txt', inventory_data='\n'.join(accounts), parse_mode='line')
+        db.session.add(product)
+        db.session.commit()
+        return product.id
+
+
+def test_anonymous_pages_are_served_from_cache(app, client):
+    _enable(app)
+    first = client.get('/store/?search=sword')
+    assert first.headers['X-Page-Cache'] == 'MISS'
+
+    with query_budget(app, 0):
+        second = client.get('/store/?search=sword&utm_source=x')
+    assert second.headers['X-Page-Cache'] == 'HIT'
+    assert second.data == first.data
+    assert 'X-Frame-Options' in second.headers
+
+    # Parameters the view reads are part of the key; others are ignored.
+    assert client.get('/store/?search=shield').headers['X-Page-Cache'] == 'MISS'
+    assert client.get('/store/?search=sword&_=123').headers['X-Page-Cache'] == 'HIT'
+
+
+def test_logged_in_visitors_bypass_cache(app, client):
+    from godweb.extensions import db
+    from godweb.models import User
+
+    _enable(app)
+    with app.app_context():
+        user = User(username='buyer', email='buyer@example.com', recovery_number='0000', godcoin_balance=100)
+        user.set_password('pass-1234')
+        db.session.add(user)
+        db.session.commit()
+    client.get('/')
+    token = extract_csrf_token(client.get('/auth/login').data.decode('utf-8'))
+    client.post('/auth/login', data={'email': 'buyer@example.com', 'password': 'pass-1234', 'csrf_token': token})
+
+    response = client.get('/')
+    assert 'X-Page-Cache' not in response.headers
+    assert b'buyer' in response.data
+
+
+def test_cache_hit_still_counts_blog_view(app, client):
+    from godweb.view_counter import get_view_counter
+
+    _enable(app)
+    post_id = _create_post(app)
+    client.get(f'/blog/{post_id}')
+    assert client.get(f'/blog/{post_id}').headers['X-Page-Cache'] == 'HIT'
+    assert get_view_counter(app).pending(post_id) == 2
+
+
+def test_purge_drops_only_the_purged_group(app, client):
+    from godweb.page_cache import purge_pages
+
+    _enable(app)
+    for url in ('/', '/store/', '/blog/'):
+        client.get(url)
+    with app.app_context():
+        purge_pages('store')
+    assert client.get('/').headers['X-Page-Cache'] == 'MISS'
+    assert client.get('/store/').headers['X-Page-Cache'] == 'MISS'
+    assert client.get('/blog/').headers['X-Page-Cache'] == 'HIT'
+
+
+def test_purchase_purges_store_pages(app, client):
+    from tests.test_purchase import _create_user, _login
+
+    _enable(app)
+    product_id = _create_product(app, ['a|1', 'b|2'])
+    _create_user(app)
+    anonymous = app.test_client()
+    anonymous.get(f'/store/{product_id}')
+    assert anonymous.get(f'/store/{product_id}').headers['X-Page-Cache'] == 'HIT'
+
+    _login(client, 'buyer@example.com', 'pass-1234')
+    token = extract_csrf_token(client.get(f'/store/{product_id}').data.decode('utf-8'))
+    assert client.post(f'/store/{product_id}/buy', data={'csrf_token': token}).status_code == 302
+
+    assert anonymous.get(f'/store/{product_id}').headers['X-Page-Cache'] == 'MISS'
+
+
+def test_single_flight_runs_leader_once():
+    from godweb.page_cache import SingleFlight
+
+    flights = SingleFlight()
+    calls = []
+    results = []
+
+    def render():
+        calls.append(1)
+        time.sleep(0.05)
+        return 'page'
+
+    threads = [threading.Thread(target=lambda: results.append(flights.run('key', render))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert sorted(results, key=lambda item: item[0]) == [(False, None)] * 7 + [(True, 'page')]
@@ -0,0 +1,95 @@
+"""Keyset pagination over (created_at, id)."""
+from __future__ import annotations
+
+import re
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from tests.test_purchase import _create_user, _login
+
+
+def _seed_transactions(app, user_id, count):
+    from godweb.extensions import db
+    from godweb.models import Transaction
+    base = datetime(2024, 1, 1)
+    with app.app_context():
+        # Pairs share a timestamp so the id tie-breaker is exercised.
+        db.session.add_all([
+            Transaction(user_id=user_id, type='topup', amount=i, description=f'tx {i}',
+                        created_at=base + timedelta(minutes=i // 2))
+            for i in range(count)
+        ])
+        db.session.commit()
+
+
+def test_cursor_walk_covers_every_row_once(app):
+    from godweb.models import Transaction
+    from godweb.pagination import keyset_paginate
+    user_id = _create_user(app)
+    _seed_transactions(app, user_id, 25)
+    keys = [Transaction.created_at, Transaction.id]
+
+    with app.app_context():
+        expected = [t.id for t in Transaction.query.order_by(Transaction.created_at.desc(), Transaction.id.desc())]
+        pages, cursor = [], None
+        while True:
+            page = keyset_paginate(Transaction.query, keys, cursor, per_page=10)
+            pages.append([t.id for t in page.items])
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        assert [len(ids) for ids in pages] == [10, 10, 5]
+        assert sum(pages, []) == expected
+        assert not keyset_paginate(Transaction.query, keys, None, per_page=10).has_prev
+
+        # Walking back from the last page returns the previous pages unchanged.
+        back = keyset_paginate(Transaction.query, keys, page.prev_cursor, per_page=10)
+        assert [t.id for t in back.items] == pages[1]
+        back = keyset_paginate(Transaction.query, keys, back.prev_cursor, per_page=10)
+        assert [t.id for t in back.items] == pages[0]
+        assert not back.has_prev and back.has_next
+
+        # A garbage cursor is treated as the first page.
+        assert [t.id for t in keyset_paginate(Transaction.query, keys, 'not-a-cursor', per_page=10)] == pages[0]
+
+        # So is a well-formed one whose values do not fit the key columns.
+        from godweb.pagination import decode_cursor, encode_cursor
+        types = [datetime, int]
+        assert decode_cursor(encode_cursor('next', [datetime(2024, 1, 1), 5]), types) is not None
+        for values in (['2024-01-01', 5], [datetime(2024, 1, 1), '5'], [datetime(2024, 1, 1), [5]],
+                       [datetime(2024, 1, 1), True], [{'x': 1}, 5]):
+            cursor = encode_cursor('next', values)
+            assert decode_cursor(cursor, types) is None
+            assert [t.id for t in keyset_paginate(Transaction.query, keys, cursor, per_page=10)] == pages[0]
+
+
+def test_wallet_transactions_pages_without_offset_or_count(app, client):
+    from godweb.extensions import db
+    user_id = _create_user(app)
+    _seed_transactions(app, user_id, 45)
+    _login(client, 'buyer@example.com', 'pass-1234')
+
+    statements = []
+    with app.app_context():
+        engine = db.engine
+
+    def capture(conn, cursor, statement, parameters, *args):
+        statements.append((statement.upper(), parameters))
+
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        first = client.get('/wallet/transactions').data.decode('utf-8')
+        cursor = re.search(r'cursor=([\w-]+)', first).group(1)
+        second = client.get(f'/wallet/transactions?cursor={cursor}').data.decode('utf-8')
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+
+    assert 'tx 44' in first and 'tx 25' in first and 'tx 24' not in first
+    assert 'tx 24' in second and 'tx 5' in second and 'tx 44' not in second
+    listing = [(sql, params) for sql, params in statements if 'FROM TRANSACTIONS' in sql]
+    assert len(listing) == 2
+    assert not any('COUNT(' in sql for sql, _ in listing)
+    # SQLite always renders "LIMIT ? OFFSET ?"; the offset must stay 0 on every page.
+    assert [params[-1] for _, params in listing] == [0, 0]
+    assert '(TRANSACTIONS.CREATED_AT, TRANSACTIONS.ID) <' in listing[1][0]
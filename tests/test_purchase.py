@@ -97,3 +97,76 @@ def test_purchase_blocks_unauthenticated(client):
     resp = client.post('/store/1/buy', follow_redirects=False)
     # Without a valid CSRF token Flask-WTF returns 400 BAD REQUEST.
     assert resp.status_code == 400
+
+
+def test_batch_purchase_debits_once_and_creates_one_transaction(app, client):
+    upload_dir = app.config['UPLOAD_FOLDER']
+    user_id = _create_user(app, godcoin_balance=200)
+    product_id = _create_product(app, upload_dir, ['a1|p', 'a2|p', 'a3|p', 'a4|p'])
+
+    _login(client, 'buyer@example.com', 'pass-1234')
+    token = extract_csrf_token(client.get(f'/store/{product_id}').data.decode('utf-8'))
+    resp = client.post(f'/store/{product_id}/buy', data={'csrf_token': token, 'quantity': 3})
+    assert resp.status_code == 302
+    assert '/profile/orders' in resp.headers['Location']
+
+    from godweb.models import User, Order, Product, Transaction
+    with app.app_context():
+        product = Product.query.get(product_id)
+        orders = Order.query.filter_by(user_id=user_id).order_by(Order.id).all()
+        transactions = Transaction.query.filter_by(user_id=user_id).all()
+        assert [o.account_info for o in orders] == ['a1|p', 'a2|p', 'a3|p']
+        assert len(transactions) == 1
+        assert transactions[0].amount == -150
+        assert User.query.get(user_id).godcoin_balance == 50
+        assert product.stock == 1
+        assert product.sold_count == 3
+
+
+def test_batch_purchase_folder_mode(app, client):
+    from godweb.extensions import db
+    from godweb.models import Order, Product, ProductInventoryAccount
+
+    user_id = _create_user(app, godcoin_balance=500)
+    with app.app_context():
+        product = Product(name='Zip', price=50, stock=3, inventory_type='folder', parse_mode='line')
+        db.session.add(product)
+        db.session.flush()
+        for fname in ('c.txt', 'a.txt', 'b.txt'):
+            db.session.add(ProductInventoryAccount(product_id=product.id, filename=fname, content=f'acct-{fname}'))
+        db.session.commit()
+        product_id = product.id
+
+    _login(client, 'buyer@example.com', 'pass-1234')
+    token = extract_csrf_token(client.get(f'/store/{product_id}').data.decode('utf-8'))
+    resp = client.post(f'/store/{product_id}/buy', data={'csrf_token': token, 'quantity': 2})
+    assert resp.status_code == 302
+
+    with app.app_context():
+        orders = Order.query.filter_by(user_id=user_id).order_by(Order.id).all()
+        assert [o.account_info for o in orders] == ['acct-a.txt', 'acct-b.txt']
+        remaining = ProductInventoryAccount.query.filter_by(product_id=product_id).all()
+        assert [r.filename for r in remaining] == ['c.txt']
+
+
+def test_batch_purchase_is_all_or_nothing_when_stock_short(app, client):
+    upload_dir = app.config['UPLOAD_FOLDER']
+    user_id = _create_user(app, godcoin_balance=500)
+    product_id = _create_product(app, upload_dir, ['only1|p', 'only2|p'])
+
+    _login(client, 'buyer@example.com', 'pass-1234')
+    token = extract_csrf_token(client.get(f'/store/{product_id}').data.decode('utf-8'))
+    resp = client.post(f'/store/{product_id}/buy', data={'csrf_token': token, 'quantity': 5})
+    assert resp.status_code == 302
+    assert f'/store/{product_id}' in resp.headers['Location']
+
+    from godweb.models import User, Order
+    with app.app_context():
+        assert Order.query.count() == 0
+        assert User.query.get(user_id).godcoin_balance == 500
+
+    # Nothing was consumed, so the full remaining stock is still sellable.
+    resp = client.post(f'/store/{product_id}/buy', data={'csrf_token': token, 'quantity': 2})
+    assert '/profile/orders' in resp.headers['Location']
+    with app.app_context():
+        assert [o.account_info for o in Order.query.order_by(Order.id)] == ['only1|p', 'only2|p']
@@ -0,0 +1,80 @@
+"""List pages run a fixed number of queries however many rows they show."""
+from __future__ import annotations
+
+from tests.conftest import query_budget
+from tests.test_purchase import _create_user, _login
+
+PAGES = [
+    '/admin/',
+    '/admin/orders',
+    '/admin/transactions',
+    '/admin/topups',
+    '/admin/posts',
+    '/admin/posts?type=premium',
+    '/admin/notifications',
+    '/profile/',
+    '/profile/orders',
+    '/profile/purchases',
+    '/store/history',
+    '/blog/',
+    '/blog/?type=premium',
+]
+# Generous enough for auth, navbar and counts; far below one query per row.
+BUDGET = 15
+
+
+def _seed(app, admin_id, start, count):
+    """Rows whose related user/product/post/category are all distinct."""
+    from godweb.extensions import db
+    from godweb.models import (
+        Category, Notification, Order, Post, PostPurchase, Product, Topup, Transaction, User,
+    )
+    with app.app_context():
+        for i in range(start, start + count):
+            user = User(username=f'user{i}', email=f'user{i}@example.com', recovery_number='1')
+            user.set_password('pass-1234')
+            category = Category(name=f'Danh mục {i}')
+            product = Product(name=f'Sản phẩm {i}', price=10)
+            db.session.add_all([user, category, product])
+            db.session.flush()
+            premium = Post(title=f'Premium {i}', content='...', author_id=user.id,
+                           category_id=category.id, is_premium=True, premium_price=5)
+            db.session.add_all([
+                Post(title=f'Bài {i}', content='...', author_id=user.id, category_id=category.id),
+                premium,
+                Order(user_id=user.id, product_id=product.id, account_info='a|b', price=10),
+                Order(user_id=admin_id, product_id=product.id, account_info='a|b', price=10),
+                Transaction(user_id=user.id, type='topup', amount=10, description=f'tx {i}'),
+                Topup(user_id=user.id, amount=10000, godcoin_amount=10, method='bank'),
+                Notification(content=f'Thông báo {i}', created_by=user.id),
+            ])
+            db.session.flush()
+            db.session.add(PostPurchase(user_id=admin_id, post_id=premium.id, price=5))
+        db.session.commit()
+
+
+def _query_counts(app, client):
+    for url in PAGES:
+        client.get(url)  # warm the navbar/notification caches
+    counts = {}
+    for url in PAGES:
+        with query_budget(app, BUDGET) as statements:
+            assert client.get(url).status_code == 200, url
+        counts[url] = len(statements)
+    return counts
+
+
+def test_list_pages_do_not_query_per_row(app, client):
+    from godweb.extensions import db
+    from godweb.models import User
+    admin_id = _create_user(app, email='admin@example.com', username='admin')
+    with app.app_context():
+        db.session.get(User, admin_id).role = 'admin'
+        db.session.commit()
+    _login(client, 'admin@example.com', 'pass-1234')
+
+    _seed(app, admin_id, 0, 2)
+    few = _query_counts(app, client)
+    _seed(app, admin_id, 2, 18)
+    many = _query_counts(app, client)
+    assert many == few
@@ -0,0 +1,101 @@
+"""Daily sales/topup rollups and the admin analytics page."""
+from __future__ import annotations
+
+from datetime import date, datetime
+
+from tests.test_purchase import _create_user, _login
+
+DAY_1 = datetime(2024, 3, 1, 10, 0)
+DAY_2 = datetime(2024, 3, 2, 23, 30)
+
+
+def _seed(app, user_id):
+    from godweb.extensions import db
+    from godweb.models import Order, Post, PostPurchase, Product, Topup, Transaction
+    with app.app_context():
+        product_a = Product(name='Netflix', price=10)
+        product_b = Product(name='Spotify', price=25)
+        post = Post(title='Bí kíp', content='...', author_id=user_id, is_premium=True, premium_price=7)
+        db.session.add_all([product_a, product_b, post])
+        db.session.flush()
+        db.session.add_all(
+            [Order(user_id=user_id, product_id=product_a.id, account_info='x', price=10, created_at=DAY_1)
+             for _ in range(3)]
+            + [Order(user_id=user_id, product_id=product_b.id, account_info='x', price=25, created_at=DAY_2)
+               for _ in range(2)]
+            + [
+                PostPurchase(user_id=user_id, post_id=post.id, price=7, created_at=DAY_2),
+                Topup(user_id=user_id, amount=50000, godcoin_amount=50, method='bank', status='approved',
+                      created_at=DAY_1, processed_at=DAY_2),
+                Topup(user_id=user_id, amount=90000, godcoin_amount=90, method='bank', status='rejected',
+                      created_at=DAY_1, processed_at=DAY_1),
+                Topup(user_id=user_id, amount=10000, godcoin_amount=10, method='momo', created_at=DAY_1),
+                Transaction(user_id=user_id, type='admin_add', amount=30, created_at=DAY_1),
+                Transaction(user_id=user_id, type='admin_subtract', amount=-4, created_at=DAY_1),
+                Transaction(user_id=user_id, type='purchase', amount=-30, created_at=DAY_1),
+            ]
+        )
+        db.session.commit()
+        return product_a.id, product_b.id, post.id
+
+
+def _daily(app):
+    from godweb.models import DailyPostStats, DailyProductStats, DailyStats
+    with app.app_context():
+        daily = {
+            row.day: {name: getattr(row, name) for name in ('orders', 'sales_godcoin', 'post_sales', 'post_revenue',
+                                                           'topups', 'topup_vnd', 'admin_added', 'admin_removed')}
+            for row in DailyStats.query
+        }
+        products = {(row.day, row.product_id): (row.units, row.revenue) for row in DailyProductStats.query}
+        posts = {(row.day, row.post_id): (row.sales, row.revenue) for row in DailyPostStats.query}
+        return daily, products, posts
+
+
+def test_rollups_aggregate_incrementally_and_match_a_rebuild(app):
+    from godweb.extensions import db
+    from godweb.models import Order
+    from godweb.rollups import rebuild_rollups, refresh_rollups
+    user_id = _create_user(app)
+    product_a, product_b, post_id = _seed(app, user_id)
+
+    with app.app_context():
+        assert refresh_rollups(batch_size=2)['orders'] == 3  # 5 orders in batches of 2
+        assert refresh_rollups(batch_size=2) == {'orders': 0, 'post_purchases': 0, 'topups': 0, 'admin_adjustments': 0}
+
+    daily, products, posts = _daily(app)
+    d1, d2 = date(2024, 3, 1), date(2024, 3, 2)
+    assert daily[d1] == {'orders': 3, 'sales_godcoin': 30, 'post_sales': 0, 'post_revenue': 0,
+                         'topups': 0, 'topup_vnd': 0, 'admin_added': 30, 'admin_removed': 4}
+    assert daily[d2] == {'orders': 2, 'sales_godcoin': 50, 'post_sales': 1, 'post_revenue': 7,
+                         'topups': 1, 'topup_vnd': 50000, 'admin_added': 0, 'admin_removed': 0}
+    assert products == {(d1, product_a): (3, 30), (d2, product_b): (2, 50)}
+    assert posts == {(d2, post_id): (1, 7)}
+
+    with app.app_context():
+        db.session.add(Order(user_id=user_id, product_id=product_a, account_info='x', price=10, created_at=DAY_2))
+        db.session.commit()
+        refresh_rollups()
+    daily, products, _ = _daily(app)
+    assert daily[d2]['orders'] == 3 and products[(d2, product_a)] == (1, 10)
+
+    with app.app_context():
+        rebuild_rollups(batch_size=3)
+    assert _daily(app) == (daily, products, posts)
+
+
+def test_analytics_page_reads_rollups(app, client):
+    from godweb.extensions import db
+    from godweb.models import DailyProductStats, DailyStats, User
+    user_id = _create_user(app)
+    with app.app_context():
+        db.session.get(User, user_id).role = 'admin'
+        today = datetime.utcnow().date()
+        db.session.add(DailyStats(day=today, orders=4, sales_godcoin=1234, topup_vnd=200000))
+        db.session.add(DailyProductStats(day=today, product_id=999, units=4, revenue=1234))
+        db.session.commit()
+    _login(client, 'buyer@example.com', 'pass-1234')
+
+    page = client.get('/admin/analytics?days=7').data.decode('utf-8')
+    assert '1,234' in page and '200,000' in page
+    assert '#999 (đã xóa)' in page
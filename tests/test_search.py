@@ -0,0 +1,103 @@
+"""Full-text search for blog posts and store products."""
+from __future__ import annotations
+
+import pytest
+
+from tests.test_purchase import _create_user
+
+
+def test_fold_strips_vietnamese_diacritics():
+    from godweb.search import fold, tokenize
+    assert fold('Tài Khoản ĐẸP') == 'tai khoan dep'
+    assert tokenize('Mua tài-khoản, giá rẻ!') == ['mua', 'tai', 'khoan', 'gia', 're']
+
+
+def _use_backend(app, name):
+    from godweb.search import MemorySearchBackend
+    if name == 'memory':
+        app.extensions['search'] = MemorySearchBackend(app.extensions['cache'])
+    assert app.extensions['search'].name == name
+
+
+def _add_post(app, author_id, title, content):
+    from godweb.extensions import db
+    from godweb.models import Post
+    from godweb.search import index_post
+    with app.app_context():
+        post = Post(title=title, content=content, author_id=author_id)
+        db.session.add(post)
+        db.session.commit()
+        index_post(post)
+        return post.id
+
+
+@pytest.mark.parametrize('backend', ['fts5', 'memory'])
+def test_search_folds_ranks_and_updates_incrementally(app, backend):
+    from godweb.extensions import db
+    from godweb.models import Post
+    from godweb.search import index_post, remove_post, search_ids
+    _use_backend(app, backend)
+    author_id = _create_user(app)
+
+    body_hit = _add_post(app, author_id, 'Hướng dẫn', 'Cách bảo mật tài khoản của bạn')
+    title_hit = _add_post(app, author_id, 'Bán tài khoản game', 'Giá tốt')
+    _add_post(app, author_id, 'Tin tức', 'Không liên quan')
+
+    with app.app_context():
+        assert search_ids('post', 'tai khoan') == [title_hit, body_hit]
+        assert search_ids('post', 'TÀI KHO') == [title_hit, body_hit]  # prefix match
+        assert search_ids('post', 'tai khoan game') == [title_hit]
+        assert search_ids('post', '  ?! ') == []
+
+        post = db.session.get(Post, body_hit)
+        post.content = 'Nội dung mới'
+        db.session.commit()
+        index_post(post)
+        assert search_ids('post', 'tai khoan') == [title_hit]
+
+        remove_post(title_hit)
+        assert search_ids('post', 'tai khoan') == []
+
+
+def test_blog_and_store_search_use_index(app, client):
+    from godweb.extensions import db
+    from godweb.models import Product
+    from godweb.search import index_product
+    author_id = _create_user(app)
+    _add_post(app, author_id, 'Tài khoản Netflix', 'Xem phim')
+    _add_post(app, author_id, 'Khác', 'Bài khác')
+    with app.app_context():
+        product = Product(name='Tài khoản Spotify', description='Nghe nhạc', price=10)
+        db.session.add(product)
+        db.session.commit()
+        index_product(product)
+
+    page = client.get('/blog/?search=tai+khoan').data.decode('utf-8')
+    assert 'Tài khoản Netflix' in page and 'Bài khác' not in page
+
+    page = client.get('/store/?search=spotify').data.decode('utf-8')
+    assert 'Tài khoản Spotify' in page
+    assert 'Tài khoản Spotify' not in client.get('/store/?search=netflix').data.decode('utf-8')
+
+
+def test_migration_backfills_empty_index(app):
+    from godweb.app import create_app
+    from godweb.extensions import db
+    from godweb.migrations import latest_version, migrate
+    from godweb.models import Post, SchemaVersion
+    from godweb.search import search_ids
+    author_id = _create_user(app)
+    with app.app_context():
+        db.session.add(Post(title='Đã có từ trước', content='chưa index', author_id=author_id))
+        db.session.commit()
+        assert search_ids('post', 'da co') == []
+
+    # Booting alone never touches the index.
+    rebooted = create_app()
+    with rebooted.app_context():
+        assert search_ids('post', 'da co') == []
+        db.session.execute(db.text('DROP TABLE search_posts_fts'))
+        SchemaVersion.query.filter(SchemaVersion.version >= 9).delete()
+        db.session.commit()
+        assert migrate() == list(range(9, latest_version() + 1))
+        assert len(search_ids('post', 'da co')) == 1
@@ -0,0 +1,96 @@
+"""Incrementally maintained admin dashboard counters."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from tests.conftest import extract_csrf_token
+from tests.test_purchase import _create_product, _create_user, _login
+
+
+def _stats(app):
+    from godweb.stats import FIELDS, _read
+    with app.app_context():
+        row = _read()
+        return {name: row[name] for name in FIELDS}
+
+
+def test_counters_follow_purchases_topups_and_admin_changes(app, client):
+    from godweb.extensions import db
+    from godweb.models import User
+    from godweb.stats import reconcile_stats
+    admin_id = _create_user(app, email='admin@example.com', username='admin', godcoin_balance=0)
+    _create_user(app, godcoin_balance=200)
+    product_id = _create_product(app, app.config['UPLOAD_FOLDER'], ['a1|p', 'a2|p', 'a3|p'])
+    with app.app_context():
+        db.session.get(User, admin_id).role = 'admin'
+        db.session.commit()
+        reconcile_stats()  # the helpers above insert rows directly
+    before = _stats(app)
+
+    _login(client, 'buyer@example.com', 'pass-1234')
+    token = extract_csrf_token(client.get('/profile/edit').data.decode('utf-8'))
+    client.post(f'/store/{product_id}/buy', data={'csrf_token': token, 'quantity': 2})
+    client.post('/wallet/topup', data={'csrf_token': token, 'amount': 20000, 'method': 'bank'})
+    client.post('/wallet/topup', data={'csrf_token': token, 'amount': 10000, 'method': 'momo'})
+
+    admin = app.test_client()
+    _login(admin, 'admin@example.com', 'pass-1234')
+    token = extract_csrf_token(admin.get('/admin/users').data.decode('utf-8'))
+    admin.post('/admin/topups/1/approve', data={'csrf_token': token})
+    admin.post('/admin/topups/2/reject', data={'csrf_token': token})
+    admin.post('/admin/users/quick-add-coin', data={'csrf_token': token, 'user_id': admin_id, 'amount': 7})
+
+    after = _stats(app)
+    assert after['orders'] == before['orders'] + 2
+    assert after['pending_topups'] == before['pending_topups']
+    assert after['total_godcoin'] == before['total_godcoin'] - 100 + 20 + 7
+    with app.app_context():
+        assert reconcile_stats() == {}  # nothing drifted
+
+    page = admin.get('/admin/').data.decode('utf-8')
+    assert str(after['total_godcoin']) in page
+
+
+def test_stale_counters_are_reconciled(app):
+    from godweb.extensions import db
+    from godweb.models import SiteStats
+    from godweb.stats import STATS_ID, get_stats, reconcile_stats
+    _create_user(app)
+    with app.app_context():
+        assert reconcile_stats() == {'users': 1, 'total_godcoin': 100}
+
+        stats = db.session.get(SiteStats, STATS_ID)
+        stats.users = 42
+        db.session.commit()
+        assert get_stats()['users'] == 42  # recounted recently: served as stored
+
+        stats.reconciled_at = datetime.utcnow() - timedelta(hours=2)
+        db.session.commit()
+        assert get_stats()['users'] == 1
+
+
+def test_counter_update_is_the_last_statement_before_commit(app, client):
+    from sqlalchemy import event
+
+    from godweb.extensions import db
+    with app.app_context():
+        engine = db.engine
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(' '.join(statement.split()[:3]))
+
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        # Registration bumps the counter before the new user row is flushed.
+        token = extract_csrf_token(client.get('/auth/register').data.decode('utf-8'))
+        client.post('/auth/register', data={
+            'csrf_token': token, 'username': 'newbie', 'email': 'newbie@example.com',
+            'password': 'pass-1234', 'confirm_password': 'pass-1234', 'recovery_number': '1234',
+        })
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+    writes = [statement for statement in statements if statement.split()[0] in ('INSERT', 'UPDATE', 'DELETE')]
+    assert writes[-1] == 'UPDATE site_stats SET'
+    assert 'INSERT INTO users' in writes
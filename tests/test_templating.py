@@ -0,0 +1,48 @@
+"""Jinja bytecode cache and hot-page warmup."""
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+
+from tests.conftest import query_budget
+
+
+def test_bytecode_cache_is_shared_across_apps(app, tmp_path, monkeypatch):
+    from godweb.app import create_app
+    from godweb.templating import warm_templates
+
+    cache_dir = tmp_path / 'jinja'
+    monkeypatch.setenv('JINJA_CACHE_DIR', str(cache_dir))
+    first = create_app()
+    count = warm_templates(first)
+    assert len(list(cache_dir.glob('*.cache'))) == count
+
+    second = create_app()
+    compiled = []
+    monkeypatch.setattr(second.jinja_env, 'compile', lambda source, name=None, *args, **kwargs: compiled.append(name))
+    warm_templates(second)
+    assert compiled == []
+
+
+def test_cache_disabled_by_default_outside_production(app):
+    assert app.config['JINJA_CACHE_DIR'] == ''
+    assert app.jinja_env.bytecode_cache is None
+
+
+def test_warm_pages_renders_hot_pages_without_queries(app):
+    from godweb.templating import warm_pages
+
+    with query_budget(app, 0):
+        assert warm_pages(app) == 4
+
+
+def test_precompile_never_touches_the_configured_database(tmp_path):
+    # Build environments may carry the production URL; the command must not use it.
+    result = subprocess.run(
+        [sys.executable, '-m', 'godweb.templating', str(tmp_path / 'jinja')],
+        env=dict(os.environ, DATABASE_URL='postgresql://nobody@127.0.0.1:1/godweb', SECRET_KEY='test-secret-key'),
+        capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    assert list((tmp_path / 'jinja').glob('*.cache'))
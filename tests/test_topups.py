@@ -0,0 +1,95 @@
+"""Bulk topup approval and bank-statement matching."""
+from __future__ import annotations
+
+import io
+
+from tests.conftest import extract_csrf_token
+from tests.test_purchase import _create_user, _login
+
+
+def _admin_client(app, client):
+    from godweb.extensions import db
+    from godweb.models import User
+    admin_id = _create_user(app, email='admin@example.com', username='admin', godcoin_balance=0)
+    with app.app_context():
+        db.session.get(User, admin_id).role = 'admin'
+        db.session.commit()
+    _login(client, 'admin@example.com', 'pass-1234')
+    return extract_csrf_token(client.get('/profile/edit').data.decode('utf-8'))
+
+
+def _topups(app, user_id, amounts, method='bank'):
+    from godweb.extensions import db
+    from godweb.models import Topup
+    with app.app_context():
+        rows = [Topup(user_id=user_id, amount=amount, godcoin_amount=amount // 1000, method=method)
+                for amount in amounts]
+        db.session.add_all(rows)
+        db.session.commit()
+        return [row.id for row in rows]
+
+
+def test_bulk_approve_credits_once_with_running_balances(app, client):
+    from godweb.extensions import db
+    from godweb.models import Topup, Transaction, User
+    token = _admin_client(app, client)
+    user_id = _create_user(app, godcoin_balance=5)
+    approve_ids = _topups(app, user_id, [10000, 20000])
+    reject_ids = _topups(app, user_id, [30000])
+
+    client.post('/admin/topups/bulk', data={'csrf_token': token, 'action': 'approve', 'topup_ids': approve_ids})
+    client.post('/admin/topups/bulk', data={'csrf_token': token, 'action': 'approve', 'topup_ids': approve_ids})
+    client.post('/admin/topups/bulk', data={'csrf_token': token, 'action': 'reject', 'topup_ids': reject_ids})
+
+    with app.app_context():
+        assert db.session.get(User, user_id).godcoin_balance == 5 + 10 + 20
+        ledger = Transaction.query.filter_by(user_id=user_id).order_by(Transaction.id).all()
+        assert [(t.amount, t.balance_after) for t in ledger] == [(10, 15), (20, 35)]
+        assert {t.status for t in Topup.query.filter(Topup.id.in_(approve_ids))} == {'approved'}
+        assert db.session.get(Topup, reject_ids[0]).status == 'rejected'
+
+
+def test_statement_import_matches_user_amount_and_memo(app, client):
+    from godweb.extensions import db
+    from godweb.models import Topup, User
+    token = _admin_client(app, client)
+    alice = _create_user(app, email='alice@example.com', username='alice', godcoin_balance=0)
+    bob = _create_user(app, email='bob@example.com', username='bob', godcoin_balance=0)
+    alice_ids = _topups(app, alice, [50000, 50000])
+    bob_ids = _topups(app, bob, [20000])
+
+    csv_text = (
+        'Ngày,Mã GD,Số tiền,Nội dung\n'
+        f'01/03/2026,FT1,"50,000",MBVCB.1.GOD{alice} chuyen tien\n'
+        f'01/03/2026,FT1,"50,000",MBVCB.1.GOD{alice} chuyen tien\n'   # duplicate reference
+        f'01/03/2026,FT2,20.000,god {bob}\n'
+        f'01/03/2026,FT3,99000,GOD{bob}\n'                            # no such pending amount
+        f'01/03/2026,FT4,-10000,phi dich vu\n'
+    )
+
+    def upload(**extra):
+        data = {'csrf_token': token, 'statement': (io.BytesIO(csv_text.encode('utf-8')), 'sao-ke.csv'), **extra}
+        return client.post('/admin/topups/import', data=data, content_type='multipart/form-data')
+
+    dry = upload(dry_run='1')
+    assert dry.status_code == 200
+    with app.app_context():
+        assert Topup.query.filter_by(status='pending').count() == 3
+
+    response = upload()
+    assert response.status_code == 200
+    assert 'Trùng mã giao dịch' in response.data.decode('utf-8')
+    with app.app_context():
+        assert db.session.get(User, alice).godcoin_balance == 50
+        assert db.session.get(User, bob).godcoin_balance == 20
+        assert [db.session.get(Topup, i).status for i in alice_ids + bob_ids] == ['approved', 'pending', 'approved']
+
+    # Re-uploading the statement approves nothing twice, even with a new
+    # pending topup of the same user and amount waiting.
+    _topups(app, alice, [50000])
+    response = upload()
+    assert 'Mã giao dịch đã được duyệt trước đó' in response.data.decode('utf-8')
+    with app.app_context():
+        assert db.session.get(User, alice).godcoin_balance == 50
+        assert db.session.get(User, bob).godcoin_balance == 20
+        assert Topup.query.filter_by(bank_reference='FT1').count() == 1
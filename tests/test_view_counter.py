@@ -0,0 +1,72 @@
+"""Write-behind blog view counter."""
+from __future__ import annotations
+
+from sqlalchemy import event
+
+
+def _create_post(app):
+    from godweb.extensions import db
+    from godweb.models import Post, User
+    with app.app_context():
+        author = User(username='author', email='author@example.com', recovery_number='0000')
+        author.set_password('pass-1234')
+        db.session.add(author)
+        db.session.flush()
+        post = Post(title='Popular', content='<p>body</p>', author_id=author.id, views=7)
+        db.session.add(post)
+        db.session.commit()
+        return post.id
+
+
+def test_detail_view_is_read_only_and_buffered(app, client):
+    from godweb.extensions import db
+    from godweb.models import Post
+    from godweb.view_counter import get_view_counter
+
+    post_id = _create_post(app)
+    counter = get_view_counter(app)
+    counter.flush_threshold = 1000
+    counter.flush_interval = 3600
+
+    writes = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith('SELECT'):
+            writes.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        for _ in range(3):
+            resp = client.get(f'/blog/{post_id}')
+            assert resp.status_code == 200
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    assert writes == []
+    assert '10 lượt xem' in resp.data.decode('utf-8')
+    assert counter.pending(post_id) == 3
+
+    assert counter.flush() == 1
+    with app.app_context():
+        assert db.session.get(Post, post_id).views == 10
+    assert counter.pending(post_id) == 0
+
+
+def test_counter_flushes_at_threshold(app, client):
+    from godweb.extensions import db
+    from godweb.models import Post
+    from godweb.view_counter import get_view_counter
+
+    post_id = _create_post(app)
+    counter = get_view_counter(app)
+    counter.flush_threshold = 2
+    counter.flush_interval = 3600
+
+    client.get(f'/blog/{post_id}')
+    with app.app_context():
+        assert db.session.get(Post, post_id).views == 7
+    client.get(f'/blog/{post_id}')
+    with app.app_context():
+        assert db.session.get(Post, post_id).views == 9
@@ -0,0 +1,128 @@
+"""Atomic GodCoin debits/credits shared by every money path."""
+from __future__ import annotations
+
+import os
+import threading
+
+import pytest
+
+from tests.conftest import extract_csrf_token
+from tests.test_purchase import _create_user, _login
+
+POSTGRES_URL = os.environ.get('GODWEB_TEST_POSTGRES_URL')
+
+
+@pytest.fixture(params=['sqlite', 'postgres'])
+def any_db_app(request, app, monkeypatch):
+    if request.param == 'sqlite':
+        yield app
+        return
+    if not POSTGRES_URL:
+        pytest.skip('set GODWEB_TEST_POSTGRES_URL to run against Postgres')
+    from godweb.app import create_app
+    from godweb.extensions import db
+    monkeypatch.setenv('DATABASE_URL', POSTGRES_URL)
+    pg_app = create_app()
+    yield pg_app
+    with pg_app.app_context():
+        db.drop_all()
+
+
+def test_concurrent_debits_never_overdraw(any_db_app):
+    from godweb.extensions import db
+    from godweb.models import Transaction, User
+    from godweb.wallet import debit
+    app = any_db_app
+    user_id = _create_user(app, godcoin_balance=100)
+    workers = 20
+    barrier = threading.Barrier(workers)
+    results = []
+
+    def buyer():
+        with app.app_context():
+            barrier.wait()
+            balance = debit(user_id, 10, 'purchase', 'stress')
+            db.session.commit()
+            results.append(balance)
+
+    threads = [threading.Thread(target=buyer) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    successes = sorted(balance for balance in results if balance is not None)
+    assert len(results) == workers
+    assert successes == list(range(0, 100, 10))  # every balance seen exactly once
+    with app.app_context():
+        assert db.session.get(User, user_id).godcoin_balance == 0
+        assert Transaction.query.filter_by(user_id=user_id, description='stress').count() == 10
+
+
+def test_premium_purchase_and_topup_approval_go_through_wallet(app, client):
+    from godweb.extensions import db
+    from godweb.models import Post, Topup, Transaction, User
+    admin_id = _create_user(app, email='admin@example.com', username='admin', godcoin_balance=5)
+    with app.app_context():
+        db.session.get(User, admin_id).role = 'admin'
+        post = Post(title='Premium', content='...', author_id=admin_id, is_premium=True, premium_price=8)
+        topup = Topup(user_id=admin_id, amount=10000, godcoin_amount=10, method='bank')
+        db.session.add_all([post, topup])
+        db.session.commit()
+        post_id, topup_id = post.id, topup.id
+    _login(client, 'admin@example.com', 'pass-1234')
+    token = extract_csrf_token(client.get('/profile/edit').data.decode('utf-8'))
+
+    # 5 GC < 8 GC: refused without touching the balance.
+    resp = client.post(f'/blog/{post_id}/purchase', data={'csrf_token': token})
+    assert '/wallet/topup' in resp.headers['Location']
+
+    # Approving twice credits once.
+    client.post(f'/admin/topups/{topup_id}/approve', data={'csrf_token': token})
+    client.post(f'/admin/topups/{topup_id}/approve', data={'csrf_token': token})
+    client.post(f'/blog/{post_id}/purchase', data={'csrf_token': token})
+
+    with app.app_context():
+        assert db.session.get(User, admin_id).godcoin_balance == 5 + 10 - 8
+        assert [t.amount for t in Transaction.query.order_by(Transaction.id)] == [10, -8]
+
+
+def test_stats_counter_is_written_once_at_commit(app):
+    from sqlalchemy import event
+
+    from godweb.extensions import db
+    from godweb.models import SiteStats
+    from godweb.stats import STATS_ID, ensure_stats
+    from godweb.wallet import credit, debit
+    user_id = _create_user(app, godcoin_balance=100)
+    with app.app_context():
+        ensure_stats()
+        before = db.session.get(SiteStats, STATS_ID).total_godcoin
+        db.session.commit()
+
+        statements = []
+        engine = db.engine
+
+        def listener(conn, cursor, statement, *args):
+            statements.append(statement.split()[:3])
+
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            debit(user_id, 30, 'purchase', 'first')
+            credit(user_id, 5, 'refund', 'second')
+            assert not any('site_stats' in words for words in statements)
+            db.session.commit()
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+
+        updates = [index for index, words in enumerate(statements) if words[:2] == ['UPDATE', 'site_stats']]
+        assert len(updates) == 1
+        assert ['INSERT', 'INTO', 'transactions'] in statements[:updates[0]]
+        db.session.expire_all()
+        assert db.session.get(SiteStats, STATS_ID).total_godcoin == before - 25
+
+        # A rolled-back transaction leaves the counter alone.
+        debit(user_id, 10, 'purchase', 'undone')
+        db.session.rollback()
+        db.session.commit()
+        assert db.session.get(SiteStats, STATS_ID).total_godcoin == before - 25